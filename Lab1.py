@@ -1,88 +1,4154 @@
-import tkinter as tk
-from tkinter import ttk, messagebox
-from datetime import datetime
+from datetime import datetime, date
+from array import array
+from collections import OrderedDict
+from collections.abc import Sequence
+import argparse
+import asyncio
+import bisect
+import contextlib
+import cProfile
+import csv
+import functools
+import gzip
+import heapq
+import itertools
 import json
+import lzma
+import mmap
+import os
+import pstats
+import socket
+import struct
+import sys
+import threading
+import time
+import tracemalloc
+import weakref
+import zlib
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import shared_memory
+
+try:
+    import tkinter as tk
+    from tkinter import ttk, messagebox
+except ImportError:
+    # Без Tk доступні лише рушій бази та консольні команди
+    tk = ttk = messagebox = None
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+# Метрики вимкнені за замовчуванням: обгортка лише перевіряє прапорець
+class Histogram:
+    bounds = [base * 10 ** power for power in range(-6, 2) for base in (1, 2.5, 5)]
+
+    def __init__(self):
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative(self):
+        total = 0
+        buckets = []
+        for bound, count in zip(self.bounds + [float("inf")], self.counts):
+            total += count
+            buckets.append((bound, total))
+        return buckets
+
+
+class Metrics:
+    def __init__(self):
+        self.enabled = False
+        self.lock = threading.Lock()
+        self.tracing = False
+        self.profilers = None
+        self.reset()
+
+    def enable(self, trace_memory=False):
+        self.enabled = True
+        if trace_memory:
+            self.start_tracing()
+
+    def disable(self):
+        self.enabled = False
+        self.stop_tracing()
+
+    def start_tracing(self):
+        # Знімок пам'яті бачить лише виділення після старту трасування, тому воно вмикається заздалегідь
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.tracing = True
+
+    def stop_tracing(self):
+        if self.tracing:
+            tracemalloc.stop()
+            self.tracing = False
+
+    def reset(self):
+        with self.lock:
+            self.counters = {}
+            self.histograms = {}
+
+    def count(self, name, amount=1):
+        if self.enabled:
+            with self.lock:
+                self.counters[name] = self.counters.get(name, 0) + amount
+
+    def observe(self, name, seconds):
+        with self.lock:
+            if name not in self.histograms:
+                self.histograms[name] = Histogram()
+            self.histograms[name].observe(seconds)
+            self.counters[f"{name}.calls"] = self.counters.get(f"{name}.calls", 0) + 1
+
+    def timed(self, name):
+        def decorator(function):
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return function(*args, **kwargs)
+                started = time.perf_counter()
+                try:
+                    return function(*args, **kwargs)
+                finally:
+                    self.observe(name, time.perf_counter() - started)
+            return wrapper
+        return decorator
+
+    def file_size(self, name, filename):
+        if self.enabled and os.path.exists(filename):
+            self.count(name, os.path.getsize(filename))
+
+    def to_json(self):
+        with self.lock:
+            return {
+                "counters": dict(self.counters),
+                "histograms": {
+                    name: {
+                        "count": histogram.count,
+                        "sum": histogram.sum,
+                        "buckets": [["+Inf" if bound == float("inf") else bound, count]
+                                    for bound, count in histogram.cumulative()],
+                    }
+                    for name, histogram in self.histograms.items()
+                },
+            }
+
+    def to_prometheus(self, prefix="labinform"):
+        def metric_name(name):
+            return f"{prefix}_" + "".join(c if c.isalnum() else "_" for c in name)
+
+        lines = []
+        with self.lock:
+            for name, value in sorted(self.counters.items()):
+                lines.append(f"# TYPE {metric_name(name)}_total counter")
+                lines.append(f"{metric_name(name)}_total {value}")
+            for name, histogram in sorted(self.histograms.items()):
+                base = f"{metric_name(name)}_seconds"
+                lines.append(f"# TYPE {base} histogram")
+                for bound, count in histogram.cumulative():
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f'{base}_bucket{{le="{le}"}} {count}')
+                lines.append(f"{base}_sum {histogram.sum}")
+                lines.append(f"{base}_count {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def dump(self, filename):
+        # Формат визначається розширенням: .prom для Prometheus, інакше JSON
+        with open(filename, 'w', encoding='utf-8') as f:
+            if filename.endswith(".prom"):
+                f.write(self.to_prometheus())
+            else:
+                json.dump(self.to_json(), f, ensure_ascii=False, indent=4)
+
+    @property
+    def profiling(self):
+        return self.profilers is not None
+
+    def start_profiling(self):
+        # Профілюється потік, що ввімкнув профілювання, і задачі, запущені всередині profiled()
+        profiler = cProfile.Profile()
+        with self.lock:
+            if self.profilers is not None:
+                return
+            self.profilers = [profiler]
+        profiler.enable()
+
+    def stop_profiling(self, filename):
+        with self.lock:
+            profilers, self.profilers = self.profilers, None
+        if profilers is None:
+            return
+        profilers[0].disable()
+        stats = pstats.Stats(*profilers)
+        stats.dump_stats(filename)
+
+    @contextlib.contextmanager
+    def profiled(self):
+        # Профілювальник cProfile до Python 3.12 стежить лише за своїм потоком, тому задача у фоновому
+        # потоці отримує власний. У новіших версіях він один на процес, і повторне ввімкнення відхиляється
+        profilers = self.profilers
+        profiler = None
+        if profilers is not None:
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:
+                profiler = None
+        try:
+            yield
+        finally:
+            if profiler is not None:
+                profiler.disable()
+                with self.lock:
+                    profilers.append(profiler)
+
+    @contextlib.contextmanager
+    def profile(self, filename):
+        self.start_profiling()
+        try:
+            yield
+        finally:
+            self.stop_profiling(filename)
+
+    def memory_snapshot(self, filename=None, limit=20):
+        if not tracemalloc.is_tracing():
+            raise RuntimeError("Трасування пам'яті не ввімкнено")
+        snapshot = tracemalloc.take_snapshot()
+        if filename:
+            snapshot.dump(filename)
+        return [str(stat) for stat in snapshot.statistics("lineno")[:limit]]
+
+
+metrics = Metrics()
+
+
+
+# Кеш декодованих рядків сегментів, згрупованих у сторінки; найдавніше використані сторінки
+# витісняються в межах бюджету пам'яті
+PAGE_ROWS = 1024
+
+class PageCache:
+    def __init__(self, capacity=64 * 1024 * 1024):
+        self.capacity = capacity
+        self.lock = threading.Lock()
+        # (слабке посилання на власника, номер сторінки) -> [рядки сторінки, розмір, розмір рядка]
+        # у порядку використання; кеш не тримає закриті чи покинуті сегменти відкритими
+        self.pages = OrderedDict()
+        self.used = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def resize(self, capacity):
+        with self.lock:
+            self.capacity = capacity
+            self.evict()
+
+    def get(self, owner, index, load):
+        # Рядок index власника; під час промаху load(index) декодує лише цей рядок. Нульовий бюджет вимикає кеш
+        if not self.capacity:
+            return load(index)
+        key = (weakref.ref(owner), index // PAGE_ROWS)
+        with self.lock:
+            entry = self.pages.get(key)
+            if entry is None:
+                entry = self.pages[key] = [{}, 0, 0]
+            else:
+                self.pages.move_to_end(key)
+            rows = entry[0]
+            row = rows.get(index)
+            if row is not None:
+                self.hits += 1
+                hit = True
+            else:
+                self.misses += 1
+                hit = False
+                row = rows[index] = load(index)
+                if not entry[2]:
+                    # Приблизний розмір рядка сторінки: кортеж, значення і запис словника
+                    entry[2] = sys.getsizeof(row) + sum(map(sys.getsizeof, row)) + 100
+                entry[1] += entry[2]
+                self.used += entry[2]
+                self.evict()
+        metrics.count("page_cache.hits" if hit else "page_cache.misses")
+        return row
+
+    def evict(self):
+        # Викликається під lock; сторінки лише читаються, тож витіснення не потребує запису,
+        # а власник звільняє відповідні сторінки файлу
+        while self.used > self.capacity and self.pages:
+            key, (rows, size, row_size) = self.pages.popitem(last=False)
+            self.used -= size
+            self.evictions += 1
+            metrics.count("page_cache.evictions")
+            owner, number = key[0](), key[1]
+            if owner is not None:
+                owner.release_page(number)
+
+    def discard(self, owner):
+        with self.lock:
+            for key in [key for key in self.pages if key[0]() is owner]:
+                self.used -= self.pages.pop(key)[1]
+
+    def clear(self):
+        with self.lock:
+            self.pages = OrderedDict()
+            self.used = 0
+
+    def stats(self):
+        with self.lock:
+            requests = self.hits + self.misses
+            return {
+                "capacity": self.capacity,
+                "used": self.used,
+                "pages": len(self.pages),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / requests if requests else 0.0,
+            }
+
+
+page_cache = PageCache()
+
+
+def date_to_ordinal(value):
+    return date.fromisoformat(str(value)).toordinal()
+
+def ordinal_to_date(ordinal):
+    return date.fromordinal(ordinal).isoformat()
+
+def split_interval(value):
+    start, end = str(value).split(' - ')
+    return date_to_ordinal(start), date_to_ordinal(end)
+
+
+# Колонки колонкового сховища: одна типізована колекція на поле схеми
+class ObjectColumn:
+    def __init__(self):
+        self.data = []
+
+    def __len__(self):
+        return len(self.data)
+
+    def encode(self, value):
+        return value
+
+    def append(self, value):
+        self.data.append(self.encode(value))
+
+    def get(self, index):
+        return self.data[index]
+
+    def set(self, index, value):
+        self.data[index] = self.encode(value)
+
+    def pop(self):
+        self.data.pop()
+
+    def extend(self, values):
+        self.data.extend(map(self.encode, values))
+
+    def truncate(self, length):
+        del self.data[length:]
+
+    def copy(self, length):
+        column = type(self).__new__(type(self))
+        column.data = self.data[:length]
+        return column
+
+    def values(self):
+        return iter(self.data)
+
+    def keys(self):
+        return iter(self.data)
+
+
+class IntegerColumn(ObjectColumn):
+    def __init__(self):
+        self.data = array('q')
+
+    def encode(self, value):
+        return int(value)
+
+
+class RealColumn(ObjectColumn):
+    def __init__(self):
+        self.data = array('d')
+
+    def encode(self, value):
+        return float(value)
+
+
+# Найбільша кількість різних значень, які ще кодуються словником (номери займають 2 байти)
+DICTIONARY_LIMIT = 1 << 16
+
+class StringColumn(ObjectColumn):
+    # Повторювані рядки зберігаються один раз у словнику, колонка містить лише їхні номери.
+    # Коли різних значень стає більше за DICTIONARY_LIMIT, колонка переходить на список рядків
+    def __init__(self):
+        self.data = array('H')
+        self.dictionary = []
+        self.codes = {}
+
+    def encode(self, value):
+        value = sys.intern(str(value))
+        if self.codes is None:
+            return value
+        code = self.codes.get(value)
+        if code is None:
+            if len(self.dictionary) == DICTIONARY_LIMIT:
+                self.expand()
+                return value
+            code = self.codes[value] = len(self.dictionary)
+            self.dictionary.append(value)
+        return code
+
+    def expand(self):
+        self.data = list(map(self.dictionary.__getitem__, self.data))
+        self.codes = None
+        self.dictionary = None
+
+    def append(self, value):
+        value = self.encode(value)
+        self.data.append(value)
+
+    def set(self, index, value):
+        value = self.encode(value)
+        self.data[index] = value
+
+    def extend(self, values):
+        dictionary = self.dictionary
+        encoded = [self.encode(value) for value in values]
+        if dictionary is not None and self.codes is None:
+            # Словник переповнився посеред пакета: перші значення вже закодовані номерами
+            encoded = [dictionary[value] if isinstance(value, int) else value for value in encoded]
+        self.data.extend(encoded)
+
+    def get(self, index):
+        # Словник читаємо до колонки: після переходу на список рядків значення вже не є номерами
+        dictionary = self.dictionary
+        value = self.data[index]
+        return dictionary[value] if isinstance(value, int) else value
+
+    def copy(self, length):
+        column = StringColumn.__new__(StringColumn)
+        dictionary = self.dictionary
+        column.data = self.data[:length]
+        if isinstance(column.data, array):
+            column.dictionary = list(dictionary)
+            column.codes = {value: code for code, value in enumerate(column.dictionary)}
+        else:
+            column.dictionary = column.codes = None
+        return column
+
+    def values(self):
+        dictionary = self.dictionary
+        data = self.data
+        return map(dictionary.__getitem__, data) if isinstance(data, array) else iter(data)
+
+    def keys(self):
+        return self.values()
+
+    def mask(self, test):
+        # Умова перевіряється один раз для кожного значення словника, а не для кожного рядка
+        dictionary = self.dictionary
+        data = self.data[:]
+        if not isinstance(data, array):
+            return None
+        flags = bytes(map(test, dictionary))
+        return bytes(map(flags.__getitem__, data))
+
+
+class DateColumn(ObjectColumn):
+    def __init__(self):
+        self.data = array('i')
+
+    def encode(self, value):
+        return date_to_ordinal(value)
+
+    def get(self, index):
+        return ordinal_to_date(self.data[index])
+
+    def values(self):
+        return map(ordinal_to_date, self.data)
+
+    def keys(self):
+        return iter(self.data)
+
+
+class DateIntervalColumn(ObjectColumn):
+    def __init__(self):
+        self.starts = array('i')
+        self.ends = array('i')
+
+    def __len__(self):
+        return len(self.starts)
+
+    def append(self, value):
+        start, end = split_interval(value)
+        self.starts.append(start)
+        self.ends.append(end)
+
+    def get(self, index):
+        return f"{ordinal_to_date(self.starts[index])} - {ordinal_to_date(self.ends[index])}"
+
+    def set(self, index, value):
+        self.starts[index], self.ends[index] = split_interval(value)
+
+    def pop(self):
+        self.starts.pop()
+        self.ends.pop()
+
+    def extend(self, values):
+        for value in values:
+            self.append(value)
+
+    def truncate(self, length):
+        del self.starts[length:]
+        del self.ends[length:]
+
+    def copy(self, length):
+        column = DateIntervalColumn()
+        column.starts = self.starts[:length]
+        column.ends = self.ends[:length]
+        return column
+
+    def values(self):
+        return (self.get(i) for i in range(len(self.starts)))
+
+    def keys(self):
+        return zip(self.starts, self.ends)
+
+
+COLUMN_TYPES = {
+    "integer": IntegerColumn,
+    "real": RealColumn,
+    "char": StringColumn,
+    "string": StringColumn,
+    "date": DateColumn,
+    "dateInvl": DateIntervalColumn,
+}
+
+
+class RowsView(Sequence):
+    # Рядки матеріалізуються лише під час звернення до них
+    def __init__(self, store):
+        self.store = store
+
+    def __len__(self):
+        return len(self.store)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.store.get(i) for i in range(*index.indices(len(self.store)))]
+        if index < 0:
+            index += len(self.store)
+        if index < 0 or index >= len(self.store):
+            raise IndexError("Невірний індекс рядка")
+        return self.store.get(index)
+
+    def __iter__(self):
+        for i in range(len(self.store)):
+            yield self.store.get(i)
+
+    def __eq__(self, other):
+        return list(self) == list(other)
+
+
+class TableRowsView(RowsView):
+    # Рядки поточного сховища таблиці: після checkpoint вигляд читає новий сегмент, а не тримає старий
+    def __init__(self, table):
+        self.table = table
+
+    @property
+    def store(self):
+        return self.table.store
+
+    def __iter__(self):
+        return iter(self.table.store.view())
+
+
+class RowStore:
+    def __init__(self, schema, rows=None):
+        self.schema = schema
+        self.data = rows if rows is not None else []
+
+    def __len__(self):
+        return len(self.data)
+
+    def view(self):
+        return self.data
+
+    def append(self, row):
+        self.data.append(row)
+
+    def extend(self, rows):
+        self.data.extend(rows)
+
+    def get(self, index):
+        return self.data[index]
+
+    def set(self, index, row):
+        self.data[index] = row
+
+    def truncate(self, length):
+        del self.data[length:]
+
+    def column(self, field_index):
+        return (row[field_index] for row in self.data)
+
+    def keys(self, field_index):
+        return map(field_key(list(self.schema.values())[field_index]), self.column(field_index))
+
+
+class ColumnStore:
+    def __init__(self, schema, rows=None):
+        self.schema = schema
+        self.columns = [COLUMN_TYPES.get(field_type, ObjectColumn)() for field_type in schema.values()]
+        self.count = 0
+        for row in rows or []:
+            self.append(row)
+
+    def __len__(self):
+        return self.count
+
+    def view(self):
+        return RowsView(self)
+
+    def append(self, row):
+        done = []
+        try:
+            for column, value in zip(self.columns, row):
+                column.append(value)
+                done.append(column)
+        except (ValueError, TypeError, OverflowError):
+            # Відкочуємо частково доданий рядок, щоб колонки лишились однакової довжини
+            for column in done:
+                column.pop()
+            raise ValueError("Невірний формат")
+        self.count += 1
+
+    def extend(self, rows):
+        rows = rows if isinstance(rows, list) else list(rows)
+        try:
+            for field_index, column in enumerate(self.columns):
+                column.extend([row[field_index] for row in rows])
+        except (ValueError, TypeError, OverflowError):
+            for column in self.columns:
+                column.truncate(self.count)
+            raise ValueError("Невірний формат")
+        self.count += len(rows)
+
+    def get(self, index):
+        return [column.get(index) for column in self.columns]
+
+    def set(self, index, row):
+        old_row = self.get(index)
+        try:
+            for column, value in zip(self.columns, row):
+                column.set(index, value)
+        except (ValueError, TypeError, OverflowError):
+            for column, value in zip(self.columns, old_row):
+                column.set(index, value)
+            raise ValueError("Невірний формат")
+
+    def truncate(self, length):
+        self.count = length
+        for column in self.columns:
+            column.truncate(length)
+
+    def column(self, field_index):
+        return self.columns[field_index].values()
+
+    def keys(self, field_index):
+        return self.columns[field_index].keys()
+
+    def mask(self, field_index, test):
+        # Прапорці test(значення) для всіх рядків; None, якщо колонка не закодована словником
+        column = self.columns[field_index]
+        return column.mask(test) if isinstance(column, StringColumn) else None
+
+
+STORAGE_TYPES = {
+    "rows": RowStore,
+    "columnar": ColumnStore,
+}
+
+
+# Бінарний сегмент: буфери колонок (вирівняні по 8 байт), JSON-опис і трейлер
+SEGMENT_MAGIC = b"LABSEG01"
+SEGMENT_TRAILER = struct.Struct("<Q8s")
+
+def encode_text_column(values, encode):
+    offsets = array('q', [0])
+    parts = []
+    size = 0
+    for value in values:
+        data = encode(value).encode('utf-8')
+        parts.append(data)
+        size += len(data)
+        offsets.append(size)
+    return [offsets.tobytes(), b"".join(parts)]
+
+def frame_of_reference(*columns):
+    # Цілі числа зберігаються як зсуви від найменшого значення найвужчим беззнаковим типом
+    if len(columns[0]):
+        base = min(map(min, columns))
+        span = max(map(max, columns)) - base
+        for format in ("B", "H", "I"):
+            size = array(format).itemsize
+            if size < columns[0].itemsize and span < 1 << (8 * size):
+                shift = (-base).__add__
+                return [array(format, map(shift, column)).tobytes() for column in columns], {"base": base, "format": format}
+    return [column.tobytes() for column in columns], {}
+
+def encode_strings(column):
+    # Словник окупається, коли значення повторюються: номер займає 2 байти замість 8 байт зсуву
+    if isinstance(column, StringColumn):
+        dictionary = column.dictionary
+        codes = column.data[:]
+        if not isinstance(codes, array):
+            return None
+    else:
+        positions = {}
+        codes = array('H')
+        for value in column.values():
+            value = str(value)
+            code = positions.get(value)
+            if code is None:
+                if len(positions) == DICTIONARY_LIMIT:
+                    return None
+                code = positions[value] = len(positions)
+            codes.append(code)
+        dictionary = list(positions)
+        if len(dictionary) * 4 > len(codes) * 3:
+            return None
+    return [codes.tobytes()] + encode_text_column(dictionary, str)
+
+def encode_column(field_type, column):
+    # Повертає вид колонки, буфери і додаткові поля опису колонки в сегменті
+    try:
+        if field_type == "integer":
+            data = column.data if isinstance(column, IntegerColumn) else array('q', column.values())
+            return ("int64", *frame_of_reference(data))
+        if field_type == "real":
+            data = column.data if isinstance(column, RealColumn) else array('d', column.values())
+            return "float64", [data.tobytes()], {}
+        if field_type == "date":
+            data = column.data if isinstance(column, DateColumn) else array('i', map(date_to_ordinal, column.values()))
+            return ("date32", *frame_of_reference(data))
+        if field_type == "dateInvl":
+            if isinstance(column, DateIntervalColumn):
+                return ("interval32", *frame_of_reference(column.starts, column.ends))
+            starts, ends = array('i'), array('i')
+            for value in column.values():
+                start, end = split_interval(value)
+                starts.append(start)
+                ends.append(end)
+            return ("interval32", *frame_of_reference(starts, ends))
+        if field_type in ("string", "char"):
+            buffers = encode_strings(column)
+            if buffers is not None:
+                return "dict", buffers, {}
+            return "text", encode_text_column(column.values(), str), {}
+    except (ValueError, TypeError, OverflowError):
+        # Значення не відповідають типу поля (рядкове сховище без перевірки)
+        pass
+    return "json", encode_text_column(column.values(), lambda value: json.dumps(value, ensure_ascii=False)), {}
+
+
+class StoreColumn:
+    def __init__(self, store, field_index):
+        self.store = store
+        self.field_index = field_index
+
+    def values(self):
+        return self.store.column(self.field_index)
+
+
+def write_segment(f, schema, store):
+    columns = store.columns if isinstance(store, ColumnStore) else [StoreColumn(store, i) for i in range(len(schema))]
+    f.write(SEGMENT_MAGIC)
+    position = len(SEGMENT_MAGIC)
+    footer = {"count": len(store), "columns": []}
+    for field_type, column in zip(schema.values(), columns):
+        kind, buffers, options = encode_column(field_type, column)
+        entry = dict(options, kind=kind, buffers=[])
+        for buffer in buffers:
+            entry["buffers"].append([position, len(buffer)])
+            padding = -len(buffer) % 8
+            f.write(buffer + b"\0" * padding)
+            position += len(buffer) + padding
+        footer["columns"].append(entry)
+    footer_data = json.dumps(footer).encode('utf-8')
+    f.write(footer_data)
+    f.write(SEGMENT_TRAILER.pack(position, SEGMENT_MAGIC))
+
+
+class SegmentColumn:
+    formats = {"int64": "q", "float64": "d", "date32": "i", "interval32": "i", "text": "q", "json": "q", "dict": "H"}
+
+    def __init__(self, view, kind, buffers, base=0, format=None):
+        self.kind = kind
+        self.buffers = buffers
+        # Цілі та дати можуть зберігатися зсувами від base у вужчому форматі
+        self.base = base
+        self.format = format
+        (offset, length), *rest = buffers
+        # memoryview поверх mmap: значення читаються без копіювання сегмента
+        self.data = view[offset:offset + length].cast(format or self.formats[kind])
+        self.extra = [view[o:o + n] for o, n in rest]
+        if kind == "interval32":
+            self.extra = [self.extra[0].cast(format or 'i')]
+        elif kind == "dict":
+            self.extra = [self.extra[0].cast('q'), self.extra[1]]
+        self._dictionary = None
+        self.count = len(self.data) - (kind in ("text", "json"))
+
+    @property
+    def dictionary(self):
+        if self._dictionary is None:
+            offsets, text = self.extra
+            self._dictionary = [str(text[offsets[i]:offsets[i + 1]], 'utf-8') for i in range(len(offsets) - 1)]
+        return self._dictionary
+
+    def shift(self, values):
+        return map(self.base.__add__, values) if self.base else iter(values)
+
+    def get(self, index):
+        if self.kind == "int64":
+            return self.data[index] + self.base
+        if self.kind == "float64":
+            return self.data[index]
+        if self.kind == "date32":
+            return ordinal_to_date(self.data[index] + self.base)
+        if self.kind == "interval32":
+            return f"{ordinal_to_date(self.data[index] + self.base)} - {ordinal_to_date(self.extra[0][index] + self.base)}"
+        if self.kind == "dict":
+            return self.dictionary[self.data[index]]
+        text = str(self.extra[0][self.data[index]:self.data[index + 1]], 'utf-8')
+        return text if self.kind == "text" else json.loads(text)
+
+    def values(self, start=0, end=None):
+        end = self.count if end is None else end
+        if self.kind in ("int64", "float64"):
+            return self.shift(self.data[start:end])
+        if self.kind == "date32":
+            return map(ordinal_to_date, self.shift(self.data[start:end]))
+        if self.kind == "dict":
+            return map(self.dictionary.__getitem__, self.data[start:end])
+        return (self.get(i) for i in range(start, end))
+
+    def keys(self, key, start=0, end=None):
+        end = self.count if end is None else end
+        if self.kind in ("int64", "float64", "date32"):
+            return self.shift(self.data[start:end])
+        if self.kind == "interval32":
+            return zip(self.shift(self.data[start:end]), self.shift(self.extra[0][start:end]))
+        if self.kind == "dict":
+            return self.values(start, end)
+        return map(key, self.values(start, end))
+
+    def mask(self, test, start=0, end=None):
+        # Прапорці рядків за номерами словника: умова перевіряється один раз для кожного значення
+        if self.kind != "dict":
+            return None
+        end = self.count if end is None else end
+        flags = bytes(map(test, self.dictionary))
+        return bytes(map(flags.__getitem__, self.data[start:end]))
+
+    def spans(self, start, end):
+        # Діапазони байтів файлу, у яких лежать значення рядків [start, end)
+        (offset, length), *rest = self.buffers
+        width = self.data.itemsize
+        if self.kind in ("text", "json"):
+            data_offset = rest[0][0]
+            return [(offset + start * 8, (end - start + 1) * 8),
+                    (data_offset + self.data[start], self.data[end] - self.data[start])]
+        if self.kind == "dict":
+            return [(offset + start * width, (end - start) * width)]
+        return [(buffer_offset + start * width, (end - start) * width) for buffer_offset, length in self.buffers]
+
+    def release(self):
+        self.data.release()
+        for view in self.extra:
+            view.release()
+
+
+# Відкриті сегменти: файл, який ще відображено в пам'ять, не видаляється (Windows цього не дозволяє),
+# а сегмент закривається, щойно його перестають читати знімки та видані раніше вигляди
+open_segments = weakref.WeakSet()
+
+class Segment:
+    def __init__(self, filename):
+        self.filename = filename
+        # Відображення тримає файл само, тож дескриптор файлу закривається одразу
+        with open(filename, 'rb') as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        metrics.count("database.bytes_mapped", len(self.map))
+        self.view = memoryview(self.map)
+        footer_offset, magic = SEGMENT_TRAILER.unpack_from(self.map, len(self.map) - SEGMENT_TRAILER.size)
+        if magic != SEGMENT_MAGIC or self.map[:len(SEGMENT_MAGIC)] != SEGMENT_MAGIC:
+            raise ValueError(f"Файл '{filename}' не є сегментом таблиці")
+        footer = json.loads(self.map[footer_offset:len(self.map) - SEGMENT_TRAILER.size])
+        self.count = footer["count"]
+        self.columns = [SegmentColumn(self.view, column["kind"], column["buffers"], column.get("base", 0), column.get("format"))
+                        for column in footer["columns"]]
+        open_segments.add(self)
+
+    def row(self, index):
+        return tuple(column.get(index) for column in self.columns)
+
+    def release_page(self, number):
+        self.release(number * PAGE_ROWS, min((number + 1) * PAGE_ROWS, self.count))
+
+    def scan(self, field_index, read):
+        # Колонка читається частинами; прочитані сторінки файлу звільняються, тож сканування
+        # не тримає сегмент у пам'яті процесу і не витісняє сторінки з кешу
+        column = self.columns[field_index]
+        for start in range(0, self.count, PAGE_ROWS * 64):
+            end = min(start + PAGE_ROWS * 64, self.count)
+            yield from read(start, end)
+            self.release(start, end, [column])
+
+    def release(self, start, end, columns=None):
+        # Без бюджету кешу сторінками файлу керує лише система
+        if not page_cache.capacity or not hasattr(mmap, "MADV_DONTNEED") or self.map.closed:
+            return
+        for column in columns or self.columns:
+            for offset, length in column.spans(start, end):
+                # madvise приймає лише межі сторінок пам'яті; сусідні значення за потреби прочитаються знову
+                aligned = offset - offset % mmap.PAGESIZE
+                if length > 0:
+                    self.map.madvise(mmap.MADV_DONTNEED, aligned, length + offset - aligned)
+
+    def close(self):
+        open_segments.discard(self)
+        page_cache.discard(self)
+        for column in self.columns:
+            column.release()
+        self.view.release()
+        self.map.close()
+
+
+class SegmentStore:
+    # Незмінний сегмент на диску плюс зміни в пам'яті: відредаговані й нові рядки
+    def __init__(self, schema, filename, storage="rows"):
+        self.schema = schema
+        self.segment = Segment(filename)
+        self.base_count = self.segment.count
+        self.edits = {}
+        self.tail = STORAGE_TYPES[storage](schema)
+        self.storage = storage
+
+    def __len__(self):
+        return self.base_count + len(self.tail)
+
+    def view(self):
+        return RowsView(self)
+
+    def append(self, row):
+        self.tail.append(row)
+
+    def extend(self, rows):
+        self.tail.extend(rows)
+
+    def get(self, index):
+        if index >= self.base_count:
+            return self.tail.get(index - self.base_count)
+        if index in self.edits:
+            return list(self.edits[index])
+        return list(page_cache.get(self.segment, index, self.segment.row))
+
+    def set(self, index, row):
+        if index >= self.base_count:
+            self.tail.set(index - self.base_count, row)
+            return
+        if self.storage == "columnar":
+            # Перевіряємо типи так само, як колонкове сховище
+            row = ColumnStore(self.schema, [row]).get(0)
+        self.edits[index] = row
+
+    def truncate(self, length):
+        # Відкотити можна лише рядки, додані після відкриття сегмента
+        self.tail.truncate(length - self.base_count)
+
+    def column(self, field_index):
+        values = self.segment.scan(field_index, self.segment.columns[field_index].values)
+        if self.edits:
+            values = (self.edits[i][field_index] if i in self.edits else value for i, value in enumerate(values))
+        return itertools.chain(values, self.tail.column(field_index))
+
+    def keys(self, field_index):
+        key = field_key(list(self.schema.values())[field_index])
+        keys = self.segment.scan(field_index, lambda start, end: self.segment.columns[field_index].keys(key, start, end))
+        if self.edits:
+            keys = (key(self.edits[i][field_index]) if i in self.edits else value for i, value in enumerate(keys))
+        return itertools.chain(keys, self.tail.keys(field_index))
+
+    def mask(self, field_index, test):
+        base = self.segment.columns[field_index].mask(test)
+        if base is None:
+            return None
+        tail = self.tail.mask(field_index, test) if isinstance(self.tail, ColumnStore) else None
+        if tail is None:
+            tail = bytes(map(test, self.tail.column(field_index)))
+        mask = bytearray(base)
+        for index, row in list(self.edits.items()):
+            mask[index] = test(row[field_index])
+        return mask + tail
+
+    def close(self):
+        self.segment.close()
+
+
+SORTABLE_TYPES = {
+    "integer": int,
+    "real": float,
+    "date": date_to_ordinal,
+}
+
+# Ключі порівняння: дати як порядкові номери днів, інтервали як пари номерів
+FIELD_KEYS = dict(SORTABLE_TYPES, dateInvl=split_interval)
+
+def field_key(field_type):
+    return FIELD_KEYS.get(field_type, lambda value: value)
+
+def decode_key(field_type, key):
+    if field_type == "date":
+        return ordinal_to_date(key)
+    if field_type == "dateInvl":
+        return f"{ordinal_to_date(key[0])} - {ordinal_to_date(key[1])}"
+    return key
+
+def cell_value(field_type, value):
+    # Значення з запиту у тому вигляді, в якому воно лежить у рядку та хеш-індексі ("5" -> 5 для цілого поля)
+    return decode_key(field_type, field_key(field_type)(value))
+
+
+def stat_key(field_type):
+    # Межі частини для поля: інтервал дає найменший початок і найбільший кінець
+    if field_type == "dateInvl":
+        return split_interval
+    key = field_key(field_type)
+    return lambda value: (key(value), key(value))
+
+def stats_overlap(stats, low, high):
+    # Чи можуть у частині бути ключі з [low, high]; None на межі означає відсутність обмеження
+    if stats is None:
+        return False
+    if stats[0] is None:
+        return True
+    try:
+        return (high is None or stats[0] <= high) and (low is None or stats[1] >= low)
+    except TypeError:
+        return True
+
+
+class Partition:
+    # Частина розбитої таблиці: сховище (або файл сегмента), номери рядків таблиці і межі значень полів
+    def __init__(self, schema, storage, filename=None, row_ids=None, stats=None):
+        self.schema = schema
+        self.storage = storage
+        self.filename = filename
+        self._store = None if filename else STORAGE_TYPES[storage](schema)
+        self.row_ids = row_ids if row_ids is not None else array('q')
+        self.stats = stats if stats is not None else [None] * len(schema)
+        # Чиста частина збігається зі своїм файлом і може бути вивантажена
+        self.dirty = filename is None
+        self.changes = 0
+        self.info = None
+
+    def __len__(self):
+        return len(self.row_ids)
+
+    @property
+    def loaded(self):
+        return self._store is not None
+
+    @property
+    def store(self):
+        if self._store is None:
+            self._store = SegmentStore(self.schema, self.filename, self.storage)
+        return self._store
+
+    def touch(self):
+        self.dirty = True
+        self.changes += 1
+
+    def evict(self):
+        # Сховище не закриваємо: його ще можуть читати знімки
+        if self.dirty:
+            raise ValueError("Частина має незбережені зміни")
+        self._store = None
+
+    def observe(self, row, stat_keys):
+        for i, (key, value) in enumerate(zip(stat_keys, row)):
+            stats = self.stats[i]
+            if stats is not None and stats[0] is None:
+                continue
+            try:
+                low, high = key(value)
+                if stats is None:
+                    self.stats[i] = [low, high]
+                else:
+                    if low < stats[0]:
+                        stats[0] = low
+                    if high > stats[1]:
+                        stats[1] = high
+            except (ValueError, TypeError):
+                # Значення не відповідає типу поля: межі невідомі, частину не відкидаємо
+                self.stats[i] = [None, None]
+
+
+class PartitionedRowsView(RowsView):
+    def __iter__(self):
+        return self.store.rows()
+
+
+class PartitionedStore:
+    # Рядки розкладені по частинах за значенням поля; кожна частина пам'ятає номери своїх рядків у таблиці,
+    # тож порядок рядків і індекси таблиці не залежать від розбиття
+    def __init__(self, schema, storage, partitioning, rows=None, partitions=None):
+        self.schema = schema
+        self.storage = storage
+        field_name, kind = partitioning["field"], partitioning["kind"]
+        if field_name not in schema:
+            raise ValueError(f"Поле '{field_name}' не знайдено")
+        field_type = schema[field_name]
+        self.field_index = list(schema).index(field_name)
+        self.key = field_key(field_type)
+        if kind == "range":
+            if field_type == "dateInvl":
+                raise ValueError("Інтервали не можна розбивати за діапазонами")
+            bounds = partitioning.get("bounds")
+            if not bounds or isinstance(bounds, (str, bytes)):
+                raise ValueError("Для розбиття за діапазонами потрібен список меж")
+            try:
+                self.bounds = [self.key(bound) for bound in bounds]
+            except (ValueError, TypeError):
+                raise ValueError(f"Невірні межі діапазонів для поля '{field_name}'")
+            if self.bounds != sorted(self.bounds):
+                raise ValueError("Межі діапазонів мають бути впорядковані")
+            self.partitioning = {"field": field_name, "kind": kind, "bounds": list(bounds)}
+            count = len(bounds) + 1
+        elif kind == "hash":
+            count = partitioning.get("count")
+            if not isinstance(count, int) or count < 1:
+                raise ValueError("Кількість частин має бути додатною")
+            self.partitioning = {"field": field_name, "kind": kind, "count": count}
+        else:
+            raise ValueError(f"Невідомий тип розбиття '{kind}'")
+        self.stat_keys = [stat_key(field_type) for field_type in schema.values()]
+        self.partitions = partitions if partitions is not None else [Partition(schema, storage) for _ in range(count)]
+        self.count = sum(map(len, self.partitions))
+        if rows:
+            self.extend(rows)
+
+    @classmethod
+    def open(cls, schema, storage, table_data, file_path):
+        partitions = []
+        for entry in table_data["partitions"]:
+            row_ids = array('q')
+            with open(file_path(entry["ids"]), 'rb') as f:
+                row_ids.frombytes(f.read())
+            partition = Partition(schema, storage, file_path(entry["segment"]), row_ids, entry["stats"])
+            partition.info = entry
+            partitions.append(partition)
+        return cls(schema, storage, table_data["partitioning"], partitions=partitions)
+
+    def route(self, row):
+        try:
+            key = self.key(row[self.field_index])
+        except (ValueError, TypeError):
+            raise ValueError("Невірний формат")
+        if self.partitioning["kind"] == "range":
+            return bisect.bisect_right(self.bounds, key)
+        if isinstance(key, int):
+            return key % len(self.partitions)
+        # Стабільний між запусками хеш, на відміну від hash() для рядків
+        return zlib.crc32(str(key).encode('utf-8')) % len(self.partitions)
+
+    def __len__(self):
+        return self.count
+
+    def view(self):
+        return PartitionedRowsView(self)
+
+    def locate(self, index):
+        for partition in self.partitions:
+            row_ids = partition.row_ids
+            position = bisect.bisect_left(row_ids, index)
+            if position < len(row_ids) and row_ids[position] == index:
+                return partition, position
+        raise IndexError("Невірний індекс рядка")
+
+    def append(self, row):
+        partition = self.partitions[self.route(row)]
+        partition.store.append(row)
+        partition.row_ids.append(self.count)
+        partition.observe(row, self.stat_keys)
+        partition.touch()
+        self.count += 1
+
+    def extend(self, rows):
+        rows = rows if isinstance(rows, list) else list(rows)
+        groups = {}
+        for offset, row in enumerate(rows):
+            groups.setdefault(self.route(row), []).append(offset)
+        done = []
+        try:
+            for number, offsets in groups.items():
+                partition = self.partitions[number]
+                done.append((partition, len(partition)))
+                partition.store.extend([rows[offset] for offset in offsets])
+        except ValueError:
+            for partition, length in done:
+                partition.store.truncate(length)
+            raise
+        for number, offsets in groups.items():
+            partition = self.partitions[number]
+            partition.row_ids.extend(self.count + offset for offset in offsets)
+            for offset in offsets:
+                partition.observe(rows[offset], self.stat_keys)
+            partition.touch()
+        self.count += len(rows)
+
+    def get(self, index):
+        partition, position = self.locate(index)
+        return partition.store.get(position)
+
+    def set(self, index, row):
+        partition, position = self.locate(index)
+        if self.partitions[self.route(row)] is not partition:
+            raise ValueError("Зміна поля розбиття перенесла б рядок в іншу частину")
+        partition.store.set(position, row)
+        partition.observe(row, self.stat_keys)
+        partition.touch()
+
+    def truncate(self, length):
+        for partition in self.partitions:
+            position = bisect.bisect_left(partition.row_ids, length)
+            if position < len(partition):
+                partition.store.truncate(position)
+                del partition.row_ids[position:]
+                partition.touch()
+        self.count = sum(map(len, self.partitions))
+
+    def scan(self, field_indexes, keys=False, keep=None):
+        # Потік (номер рядка, значення полів) у порядку рядків; частини, які keep(stats) відкидає, не відкриваються
+        streams = []
+        for partition in self.partitions:
+            if not len(partition) or (keep is not None and not keep(partition.stats)):
+                continue
+            read = partition.store.keys if keys else partition.store.column
+            values = zip(*[read(i) for i in field_indexes]) if field_indexes else itertools.repeat((), len(partition))
+            streams.append(zip(partition.row_ids, values))
+        return heapq.merge(*streams)
+
+    def rows(self):
+        streams = [zip(partition.row_ids, partition.store.view()) for partition in self.partitions if len(partition)]
+        return (row for row_id, row in heapq.merge(*streams, key=lambda item: item[0]))
+
+    def column(self, field_index):
+        return (values[0] for row_id, values in self.scan([field_index]))
+
+    def keys(self, field_index):
+        return (values[0] for row_id, values in self.scan([field_index], keys=True))
+
+    def freeze(self, count, old_row, changed):
+        # Копія на момент знімка з count рядками: чисті частини лишаються посиланнями на свої файли.
+        # Лічильник змін дозволяє після запису визначити, які частини живої таблиці збігаються з файлами
+        partitions = []
+        for partition in self.partitions:
+            changes = partition.changes
+            length = bisect.bisect_left(partition.row_ids, count)
+            if partition.dirty:
+                stats = [None if stats is None else list(stats) for stats in partition.stats]
+                frozen = Partition(self.schema, self.storage, row_ids=partition.row_ids[:length], stats=stats)
+                frozen._store = copy_store(partition.store, length)
+            else:
+                frozen = Partition(self.schema, self.storage, partition.filename, partition.row_ids[:length], partition.stats)
+                frozen.info = partition.info
+            frozen.changes = changes
+            partitions.append(frozen)
+        store = PartitionedStore(self.schema, self.storage, self.partitioning, partitions=partitions)
+        for index in changed:
+            old = old_row(index) if index < count else None
+            if old is not None:
+                partition, position = store.locate(index)
+                partition.store.set(position, old)
+                partition.dirty = True
+                partition.changes = None
+        return store
+
+    def adopt(self, frozen):
+        # Після checkpoint: частини, не змінені з моменту копіювання, тепер збігаються з записаними файлами
+        for partition, written in zip(self.partitions, frozen.partitions):
+            if partition.dirty and partition.changes == written.changes and len(partition) == len(written):
+                partition.filename = written.filename
+                partition.info = written.info
+                partition.dirty = False
+
+    def evict(self):
+        evicted = 0
+        for partition in self.partitions:
+            if partition.loaded and not partition.dirty:
+                partition.evict()
+                evicted += 1
+        return evicted
+
+    def close(self):
+        for partition in self.partitions:
+            if isinstance(partition._store, SegmentStore):
+                partition._store.close()
+
+
+def parse_date(value):
+    text = str(value)
+    if len(text) == 10 and text[4] == '-' and text[7] == '-':
+        return date.fromisoformat(text).isoformat()
+    # Повільний шлях для дат без нулів попереду, наприклад 1999-9-3
+    return datetime.strptime(text, "%Y-%m-%d").date().isoformat()
+
+def parse_interval(value):
+    start, end = str(value).split(' - ')
+    return f"{parse_date(start)} - {parse_date(end)}"
+
+
+def parse_window(text):
+    # "дата" або "дата - дата" у вигляді пари ISO-дат; None, якщо це не дата
+    try:
+        if ' - ' in text:
+            return tuple(parse_interval(text).split(' - '))
+        return parse_date(text), parse_date(text)
+    except ValueError:
+        return None
+
+
+def intern_text(value):
+    return sys.intern(str(value))
+
+FIELD_CONVERTERS = {
+    "integer": int,
+    "real": float,
+    "char": intern_text,
+    "string": intern_text,
+    "date": parse_date,
+    "dateInvl": parse_interval,
+}
+
+
+class RowFormatError(ValueError):
+    def __init__(self, errors):
+        # errors: список (номер рядка, назва поля, значення)
+        super().__init__("Невірний формат")
+        self.errors = errors
+
+
+class RowConverter:
+    # Перетворювачі полів збираються один раз для схеми
+    def __init__(self, schema):
+        self.fields = list(schema)
+        self.types = list(schema.values())
+        self.converters = [FIELD_CONVERTERS.get(field_type, lambda value: value) for field_type in self.types]
+
+    def check_length(self, row):
+        if len(row) != len(self.fields):
+            raise ValueError("Кількість значень не відповідає кількості полів")
+
+    def convert(self, row):
+        self.check_length(row)
+        result = []
+        errors = []
+        for field_name, convert, value in zip(self.fields, self.converters, row):
+            try:
+                result.append(convert(value))
+            except (ValueError, TypeError, OverflowError):
+                errors.append((0, field_name, value))
+        if errors:
+            raise RowFormatError(errors)
+        return result
+
+    def convert_many(self, rows):
+        rows = list(rows)
+        if any(len(row) != len(self.fields) for row in rows):
+            raise ValueError("Кількість значень не відповідає кількості полів")
+        if not rows:
+            return []
+        columns = []
+        errors = []
+        for field_name, field_type, convert, values in zip(self.fields, self.types, self.converters, zip(*rows)):
+            converted = self.convert_column(field_type, convert, values)
+            if converted is None:
+                converted = []
+                for row_number, value in enumerate(values):
+                    try:
+                        converted.append(convert(value))
+                    except (ValueError, TypeError, OverflowError):
+                        errors.append((row_number, field_name, value))
+                        converted.append(value)
+            columns.append(converted)
+        if errors:
+            errors.sort(key=lambda error: (error[0], self.fields.index(error[1])))
+            raise RowFormatError(errors)
+        return [list(row) for row in zip(*columns)]
+
+    def convert_column(self, field_type, convert, values):
+        # Швидкий шлях для цілої колонки; None означає перевірку кожної клітинки окремо
+        try:
+            if numpy is not None and field_type in ("integer", "real"):
+                return numpy.asarray(values).astype(numpy.int64 if field_type == "integer" else numpy.float64).tolist()
+            if numpy is not None and field_type == "date":
+                text = numpy.asarray(values, dtype=str)
+                iso = (numpy.char.str_len(text) == 10) & (numpy.char.find(text, '-') == 4) & (numpy.char.rfind(text, '-') == 7)
+                if iso.all():
+                    return numpy.datetime_as_string(text.astype('datetime64[D]')).tolist()
+                return None
+            return list(map(convert, values))
+        except (ValueError, TypeError, OverflowError):
+            return None
+
+
+# Вторинні індекси; зберігають номери рядків у порядку зростання
+class HashIndex:
+    kind = "hash"
+
+    def __init__(self, field_type):
+        self.entries = {}
+
+    def add(self, row_id, value):
+        self.entries.setdefault(value, []).append(row_id)
+
+    def extend(self, entries):
+        for row_id, value in entries:
+            self.add(row_id, value)
+
+    def remove(self, row_id, value):
+        row_ids = self.entries.get(value)
+        if row_ids is None:
+            return
+        row_ids.remove(row_id)
+        if not row_ids:
+            del self.entries[value]
+
+    def lookup(self, value):
+        return sorted(self.entries.get(value, ()))
+
+
+class SortedIndex:
+    kind = "sorted"
+
+    def __init__(self, field_type):
+        if field_type not in SORTABLE_TYPES:
+            raise ValueError(f"Впорядкований індекс не підтримує тип '{field_type}'")
+        self.key = SORTABLE_TYPES[field_type]
+        self.keys = []
+        self.row_ids = []
+
+    def add(self, row_id, value):
+        key = self.key(value)
+        if not self.keys or (key, row_id) > (self.keys[-1], self.row_ids[-1]):
+            self.keys.append(key)
+            self.row_ids.append(row_id)
+            return
+        position = bisect.bisect_right(self.keys, key)
+        # Для однакових ключів зберігаємо порядок номерів рядків
+        while position > 0 and self.keys[position - 1] == key and self.row_ids[position - 1] > row_id:
+            position -= 1
+        self.keys.insert(position, key)
+        self.row_ids.insert(position, row_id)
+
+    def extend(self, entries):
+        # Пакет сортується один раз і зливається з індексом зрізами, без вставки кожного ключа окремо
+        added = sorted((self.key(value), row_id) for row_id, value in entries)
+        if not added:
+            return
+        if self.keys and added[0] < (self.keys[-1], self.row_ids[-1]):
+            keys, row_ids = [], []
+            previous = 0
+            for key, row_id in added:
+                position = bisect.bisect_right(self.keys, key, previous)
+                while position > previous and self.keys[position - 1] == key and self.row_ids[position - 1] > row_id:
+                    position -= 1
+                keys += self.keys[previous:position]
+                row_ids += self.row_ids[previous:position]
+                keys.append(key)
+                row_ids.append(row_id)
+                previous = position
+            self.keys = keys + self.keys[previous:]
+            self.row_ids = row_ids + self.row_ids[previous:]
+        else:
+            keys, row_ids = zip(*added)
+            self.keys.extend(keys)
+            self.row_ids.extend(row_ids)
+
+    def remove(self, row_id, value):
+        key = self.key(value)
+        position = bisect.bisect_left(self.keys, key)
+        while position < len(self.keys) and self.keys[position] == key:
+            if self.row_ids[position] == row_id:
+                del self.keys[position]
+                del self.row_ids[position]
+                return
+            position += 1
+
+    def lookup(self, value):
+        return self.range(value, value)
+
+    def range(self, low=None, high=None):
+        first = 0 if low is None else bisect.bisect_left(self.keys, self.key(low))
+        last = len(self.keys) if high is None else bisect.bisect_right(self.keys, self.key(high))
+        return sorted(self.row_ids[first:last])
+
+
+class IntervalRun:
+    # Незмінний набір інтервалів, впорядкованих за початком, з деревом відрізків, що зберігає
+    # найпізніший кінець у кожному піддереві: пошук перетинів обходить лише гілки з результатами
+    def __init__(self, entries, seq):
+        starts, ends, row_ids = zip(*entries)
+        self.starts = array('i', starts)
+        self.ends = array('i', ends)
+        self.row_ids = array('q', row_ids)
+        self.seq = seq
+        size = 1
+        while size < len(entries):
+            size *= 2
+        tree = array('i', [-1]) * (2 * size)
+        tree[size:size + len(entries)] = self.ends
+        # Дерево будується рівнями від листків: вузли [width, 2 * width) — максимуми пар нижнього рівня
+        width = size // 2
+        while width:
+            tree[width:2 * width] = array('i', map(max, tree[2 * width:4 * width:2], tree[2 * width + 1:4 * width:2]))
+            width //= 2
+        self.tree = tree
+        self.size = size
+
+    def __len__(self):
+        return len(self.row_ids)
+
+    def entries(self, removed):
+        # Записи без видалених після створення цього набору
+        seq = self.seq
+        entries = zip(self.starts, self.ends, self.row_ids)
+        if not removed:
+            return list(entries)
+        return [entry for entry in entries if removed.get(entry[2], 0) <= seq]
+
+    def overlapping(self, low, high, removed, result):
+        tree, size, seq = self.tree, self.size, self.seq
+        limit = bisect.bisect_right(self.starts, high)
+        stack = [(1, 0, size)] if limit else []
+        while stack:
+            node, left, width = stack.pop()
+            if left >= limit or tree[node] < low:
+                continue
+            if node >= size:
+                row_id = self.row_ids[node - size]
+                if removed.get(row_id, 0) <= seq:
+                    result.append(row_id)
+                continue
+            width //= 2
+            stack.append((2 * node + 1, left + width, width))
+            stack.append((2 * node, left, width))
+
+
+class IntervalIndex:
+    # Інтервали лежать у кількох незмінних наборах IntervalRun, розміри яких зростають геометрично:
+    # нові записи спершу потрапляють у маленький буфер, повний буфер стає набором, а fanout останніх
+    # наборів одного рівня зливаються в один. Запит перевіряє буфер і O(log n) наборів, тож коштує O(log² n + k).
+    # Видалений рядок позначається номером наступного набору: записи старших наборів для нього недійсні.
+    # Уся перебудова відбувається під час запису, під тим самим замком, що й запити
+    kind = "interval"
+    buffer_size = 256
+    fanout = 4
+    min_rebuild = 1024
+
+    def __init__(self, field_type):
+        if field_type != "dateInvl":
+            raise ValueError(f"Інтервальний індекс не підтримує тип '{field_type}'")
+        self.lock = threading.Lock()
+        self.runs = []
+        self.stored = 0
+        self.seq = 0
+        self.added = {}
+        self.removed = {}
+
+    def add(self, row_id, value):
+        interval = split_interval(value)
+        with self.lock:
+            self.added[row_id] = interval
+            if len(self.added) >= self.buffer_size:
+                self.flush()
+
+    def extend(self, entries):
+        entries = [(*split_interval(value), row_id) for row_id, value in entries]
+        with self.lock:
+            entries.extend((start, end, row_id) for row_id, (start, end) in self.added.items())
+            self.added = {}
+            entries.sort()
+            self.push(entries)
+
+    def remove(self, row_id, value):
+        with self.lock:
+            if self.added.pop(row_id, None) is None:
+                self.removed[row_id] = self.seq
+                if len(self.removed) > max(self.min_rebuild, self.stored // 4):
+                    self.compact()
+
+    def flush(self):
+        entries = sorted((start, end, row_id) for row_id, (start, end) in self.added.items())
+        self.added = {}
+        self.push(entries)
+
+    def push(self, entries):
+        if not entries:
+            return
+        self.runs.append(IntervalRun(entries, self.seq))
+        self.stored += len(entries)
+        self.seq += 1
+        while len(self.runs) >= self.fanout and len(set(map(self.level, self.runs[-self.fanout:]))) == 1:
+            runs = self.runs[-self.fanout:]
+            del self.runs[-self.fanout:]
+            # Відсортовані шматки timsort зливає за один прохід
+            merged = [entry for run in runs for entry in run.entries(self.removed)]
+            merged.sort()
+            self.stored -= sum(map(len, runs)) - len(merged)
+            if merged:
+                self.runs.append(IntervalRun(merged, runs[-1].seq))
+
+    def level(self, run):
+        level = 0
+        size = self.buffer_size * self.fanout
+        while len(run) >= size:
+            level += 1
+            size *= self.fanout
+        return level
+
+    def compact(self):
+        # Усі набори зливаються в один, і позначки видалених рядків більше не потрібні
+        entries = [entry for run in self.runs for entry in run.entries(self.removed)]
+        entries.extend((start, end, row_id) for row_id, (start, end) in self.added.items())
+        entries.sort()
+        self.runs = [IntervalRun(entries, self.seq)] if entries else []
+        self.stored = len(entries)
+        self.seq += 1
+        self.added = {}
+        self.removed = {}
+
+    def rebuild(self):
+        with self.lock:
+            self.compact()
+
+    def overlapping(self, low, high):
+        # Номери рядків з інтервалами, що перетинають [low, high] (порядкові номери днів)
+        with self.lock:
+            result = [row_id for row_id, (start, end) in self.added.items() if start <= high and end >= low]
+            for run in self.runs:
+                run.overlapping(low, high, self.removed, result)
+        return sorted(result)
+
+
+class NgramIndex:
+    kind = "ngram"
+    size = 3
+
+    def __init__(self, field_type):
+        self.grams = {}
+
+    def split(self, text):
+        return {text[i:i + self.size] for i in range(len(text) - self.size + 1)}
+
+    def add(self, row_id, value):
+        for gram in self.split(str(value)):
+            self.grams.setdefault(gram, set()).add(row_id)
+
+    def extend(self, entries):
+        for row_id, value in entries:
+            self.add(row_id, value)
+
+    def remove(self, row_id, value):
+        for gram in self.split(str(value)):
+            row_ids = self.grams.get(gram)
+            if row_ids is not None:
+                row_ids.discard(row_id)
+                if not row_ids:
+                    del self.grams[gram]
+
+    def candidates(self, pattern):
+        # None означає, що шаблон закороткий і потрібне повне сканування
+        if len(pattern) < self.size:
+            return None
+        result = None
+        for gram in sorted(self.split(pattern), key=lambda g: len(self.grams.get(g, ()))):
+            row_ids = self.grams.get(gram)
+            if not row_ids:
+                return []
+            result = set(row_ids) if result is None else result & row_ids
+            if not result:
+                return []
+        return sorted(result)
+
+
+INDEX_TYPES = {
+    "hash": HashIndex,
+    "sorted": SortedIndex,
+    "ngram": NgramIndex,
+    "interval": IntervalIndex,
+}
+
+
+# Менші таблиці скануються в одному процесі
+PARALLEL_THRESHOLD = 200000
+
+
+# Спільний лічильник версій бази: записувач один, а читачі працюють зі знімками і не чекають на нього
+class VersionClock:
+    def __init__(self):
+        self.version = 0
+        self.writer = threading.RLock()
+        # Коротке блокування для публікації версії та відкриття знімків
+        self.lock = threading.Lock()
+        self.readers = {}
+        self.transaction = None
+        self.tables = weakref.WeakSet()
+
+    def acquire(self):
+        # Викликається під self.lock
+        self.readers[self.version] = self.readers.get(self.version, 0) + 1
+        return self.version
+
+    def release(self, version):
+        with self.lock:
+            self.readers[version] -= 1
+            if not self.readers[version]:
+                del self.readers[version]
+        # Якщо записувач зайнятий, історію почистить він сам
+        if self.writer.acquire(blocking=False):
+            try:
+                self.prune()
+            finally:
+                self.writer.release()
+
+    def prune(self, discard=None):
+        # Лише під self.writer: старі версії рядків потрібні тільки відкритим знімкам;
+        # discard — версія відкоченої транзакції
+        with self.lock:
+            oldest = min(self.readers, default=self.version)
+        for table in list(self.tables):
+            history = table.history
+            for row_index, entries in list(history.items()):
+                kept = [entry for entry in entries if entry[0] > oldest and entry[0] != discard]
+                if kept:
+                    history[row_index] = kept
+                else:
+                    del history[row_index]
+
+
+class Transaction:
+    # Зміни застосовуються до таблиць одразу, але знімки не бачать їх до commit;
+    # rollback виконує записи журналу відкату у зворотному порядку
+    def __init__(self, clock, database=None):
+        clock.writer.acquire()
+        if clock.transaction is not None:
+            clock.writer.release()
+            raise ValueError("Транзакція вже розпочата")
+        self.clock = clock
+        self.database = database
+        self.version = clock.version + 1
+        self.undo = []
+        self.records = []
+        self.tables = set()
+        self.created = set()
+        self.deleted = {}
+        self.active = True
+        clock.transaction = self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if not self.active:
+            return
+        if exc_type is None:
+            self.commit()
+        else:
+            self.rollback()
+
+    def touch(self, table):
+        if table not in self.tables:
+            # Знімки бачать лише рядки, що були до початку транзакції
+            with self.clock.lock:
+                table.tx_base = len(table.store)
+            self.tables.add(table)
+
+    def check_active(self):
+        if not self.active:
+            raise ValueError("Транзакція вже завершена")
+
+    def commit(self):
+        self.check_active()
+        journal = self.database.journal if self.database else None
+        if journal and self.records:
+            try:
+                journal.append({"op": "transaction", "records": self.records})
+            except OSError:
+                self.rollback()
+                raise
+        self.publish(self.version)
+        self.finish()
+        if journal:
+            journal.maybe_checkpoint()
+
+    def rollback(self):
+        self.check_active()
+        for undo in reversed(self.undo):
+            undo()
+        self.publish(self.clock.version)
+        self.finish(self.version)
+
+    def publish(self, version):
+        with self.clock.lock:
+            for table in self.tables:
+                table.tx_base = None
+            self.clock.version = version
+            self.clock.transaction = None
+
+    def finish(self, discard=None):
+        self.active = False
+        try:
+            self.clock.prune(discard)
+        finally:
+            self.clock.writer.release()
+
+
+def copy_store(store, count):
+    # Перші count рядків сховища; сегмент на диску незмінний, тож копія ділить його з оригіналом
+    if isinstance(store, ColumnStore):
+        frozen = ColumnStore(store.schema)
+        frozen.columns = [column.copy(count) for column in store.columns]
+        frozen.count = count
+    elif isinstance(store, RowStore):
+        frozen = RowStore(store.schema, store.data[:count])
+    else:
+        frozen = SegmentStore.__new__(SegmentStore)
+        frozen.__dict__.update(store.__dict__)
+        frozen.edits = dict(store.edits)
+        frozen.tail = copy_store(store.tail, count - store.base_count)
+    return frozen
+
+
+class SnapshotStore:
+    # Рядки таблиці на момент версії version: пізніші зміни підміняються старими значеннями з історії.
+    # Записувач заносить старий рядок в історію до зміни, тож після читання історію перевіряємо ще раз
+    def __init__(self, table, version, count):
+        self.table = table
+        self.store = table.store
+        self.schema = table.schema
+        self.version = version
+        self.count = count
+
+    def __len__(self):
+        return self.count
+
+    def view(self):
+        return RowsView(self)
+
+    def old_row(self, index):
+        for version, row in self.table.history.get(index, ()):
+            if version > self.version:
+                return row
+        return None
+
+    def get(self, index):
+        row = self.old_row(index)
+        if row is None:
+            row = self.store.get(index)
+            old = self.old_row(index)
+            if old is not None:
+                row = old
+        return row
+
+    def column(self, field_index):
+        history = self.table.history
+        for i, value in enumerate(itertools.islice(self.store.column(field_index), self.count)):
+            if history and i in history:
+                old = self.old_row(i)
+                if old is not None:
+                    value = old[field_index]
+            yield value
+
+    def keys(self, field_index):
+        key = field_key(list(self.schema.values())[field_index])
+        history = self.table.history
+        for i, value in enumerate(itertools.islice(self.store.keys(field_index), self.count)):
+            if history and i in history:
+                old = self.old_row(i)
+                if old is not None:
+                    value = key(old[field_index])
+            yield value
+
+    def freeze(self):
+        # Копія знімка для збереження: зріз масиву чи списку береться за один крок,
+        # а рядки, змінені під час копіювання, відновлюються з історії
+        if isinstance(self.store, PartitionedStore):
+            return self.store.freeze(self.count, self.old_row, list(self.table.history))
+        if isinstance(self.store, SegmentStore):
+            return self
+        frozen = copy_store(self.store, self.count)
+        for index in list(self.table.history):
+            old = self.old_row(index) if index < self.count else None
+            if old is not None:
+                frozen.set(index, old)
+        return frozen
+
+    def unchanged(self):
+        return self.table._store is self.store and len(self.store) == self.count and not any(
+            version > self.version for entries in list(self.table.history.values()) for version, row in entries)
+
 
 class Table:
-    def __init__(self, name, schema):
+    # Налаштування паралельного сканування; None означає всі ядра
+    parallel_workers = None
+    parallel_threshold = PARALLEL_THRESHOLD
+
+    def __init__(self, name, schema, storage="rows", clock=None):
+        if storage not in STORAGE_TYPES:
+            raise ValueError(f"Невідомий тип сховища '{storage}'")
         self.name = name
         self.schema = schema 
-        self.rows = []
+        self.storage = storage
+        self._store = STORAGE_TYPES[storage](schema)
+        self.open_store = None
+        self.pending_indexes = {}
+        self.segment_info = None
+        self.field_positions = {field_name: i for i, field_name in enumerate(schema)}
+        self.indexes = {}
+        self.listeners = []
+        self._converter = None
+        # Старі версії змінених рядків для відкритих знімків: номер рядка -> [(версія, рядок)]
+        self.history = {}
+        self.tx_base = None
+        self.clock = clock or VersionClock()
+        # Лічильник змін рядків: кеш результатів пошуку вважає свої записи дійсними лише для тієї ж ревізії
+        self.revision = 0
+        self.clock.tables.add(self)
+
+    @property
+    def converter(self):
+        if self._converter is None or self._converter.fields != list(self.schema):
+            self._converter = RowConverter(self.schema)
+        return self._converter
+
+    @property
+    def loaded(self):
+        return self._store is not None
+
+    @property
+    def store(self):
+        if self._store is None:
+            # Таблиця відкривається лише під час першого звернення до рядків
+            self._store = self.open_store()
+            for field_name, kind in self.pending_indexes.items():
+                self.build_index(field_name, kind)
+            self.pending_indexes = {}
+        return self._store
+
+    @store.setter
+    def store(self, store):
+        self._store = store
+
+    def load_lazily(self, open_store, indexes=None):
+        # Попереднє сховище не закриваємо явно: його ще можуть читати знімки та пошук в іншому потоці.
+        # Вигляди рядків таблиці його не тримають, тож сегмент закриється разом з останнім читачем
+        self._store = None
+        self.open_store = open_store
+        if indexes is not None:
+            self.indexes = {}
+            self.pending_indexes = dict(indexes)
+
+    def close(self):
+        if isinstance(self._store, (SegmentStore, PartitionedStore)):
+            self._store.close()
+
+    @property
+    def partitioning(self):
+        if self._store is None:
+            return self.segment_info.get("partitioning")
+        store = self._store.store if isinstance(self._store, SnapshotStore) else self._store
+        return store.partitioning if isinstance(store, PartitionedStore) else None
+
+    def index_kinds(self):
+        kinds = {field_name: index.kind for field_name, index in self.indexes.items()}
+        kinds.update(self.pending_indexes)
+        return kinds
+
+    def notify(self, op, *args):
+        for listener in self.listeners:
+            listener(self, op, *args)
+
+    @property
+    def rows(self):
+        return TableRowsView(self)
+
+    @rows.setter
+    def rows(self, rows):
+        partitioning = self.partitioning
+        if partitioning:
+            self.store = PartitionedStore(self.schema, self.storage, partitioning, rows)
+        else:
+            self.store = STORAGE_TYPES[self.storage](self.schema, rows)
+        for field_name, index in list(self.indexes.items()):
+            self.build_index(field_name, index.kind)
+        self.revision += 1
 
+    def field_names(self):
+        return list(self.schema)
+
+    def query(self):
+        return Query(self)
+
+    def snapshot(self):
+        self.store
+        with self.clock.lock:
+            return self.locked_snapshot()
+
+    def locked_snapshot(self):
+        # Викликається під clock.lock, щоб версія і кількість рядків відповідали одна одній
+        count = self.tx_base if self.tx_base is not None else len(self.store)
+        return TableSnapshot(self, self.clock.acquire(), count)
+
+    def transaction(self):
+        # Викликається під clock.writer; запис поза транзакцією змінює таблицю одразу
+        transaction = self.clock.transaction
+        if transaction is not None:
+            transaction.touch(self)
+        return transaction
+
+    def field_index(self, field_name):
+        if field_name not in self.field_positions:
+            raise ValueError(f"Поле '{field_name}' не знайдено")
+        return self.field_positions[field_name]
+
+    def build_index(self, field_name, kind):
+        if kind not in INDEX_TYPES:
+            raise ValueError(f"Невідомий тип індексу '{kind}'")
+        field_index = self.field_index(field_name)
+        index = INDEX_TYPES[kind](self.schema[field_name])
+        index.extend(enumerate(self.store.column(field_index)))
+        self.indexes[field_name] = index
+        return index
+
+    @metrics.timed("table.create_index")
+    def create_index(self, field_name, kind="hash"):
+        with self.clock.writer:
+            previous = self.indexes.get(field_name)
+            index = self.build_index(field_name, kind)
+            transaction = self.transaction()
+            if transaction is not None:
+                transaction.undo.append(lambda: self.restore_index(field_name, previous))
+            self.notify("create_index", field_name, kind)
+            return index
+
+    def partition_by(self, field_name, kind="hash", count=4, bounds=None):
+        # Рядки розкладаються по частинах за значенням поля; номери рядків та індекси не змінюються
+        partitioning = {"field": field_name, "kind": kind, "count": count, "bounds": bounds}
+        with self.clock.writer:
+            previous = self.store
+            store = PartitionedStore(self.schema, self.storage, partitioning, list(previous.view()))
+            self.store = store
+            transaction = self.transaction()
+            if transaction is not None:
+                transaction.undo.append(lambda: setattr(self, "store", previous))
+            self.notify("partition_by", store.partitioning)
+
+    def evict_partitions(self):
+        # Збережені частини звільняють пам'ять і відкриються з файлів під час наступного звернення
+        if not isinstance(self._store, PartitionedStore):
+            return 0
+        with self.clock.writer:
+            return self._store.evict()
+
+    def restore_index(self, field_name, index=None, kind=None):
+        self.indexes.pop(field_name, None)
+        self.pending_indexes.pop(field_name, None)
+        if index is not None:
+            self.indexes[field_name] = index
+        elif kind is not None:
+            self.pending_indexes[field_name] = kind
+
+    def drop_index(self, field_name):
+        with self.clock.writer:
+            if field_name in self.pending_indexes:
+                kind = self.pending_indexes.pop(field_name)
+                undo = lambda: self.restore_index(field_name, kind=kind)
+            elif field_name in self.indexes:
+                index = self.indexes.pop(field_name)
+                undo = lambda: self.restore_index(field_name, index)
+            else:
+                raise ValueError(f"Індекс для поля '{field_name}' не знайдено")
+            transaction = self.transaction()
+            if transaction is not None:
+                transaction.undo.append(undo)
+            self.notify("drop_index", field_name)
+
+    @metrics.timed("table.add_row")
     def add_row(self, row_data):
         if len(row_data) != len(self.schema):
             raise ValueError("Кількість значень не відповідає кількості полів")
-        self.rows.append(row_data)
+        with self.clock.writer:
+            row_id = len(self.store)
+            transaction = self.transaction()
+            if transaction is not None:
+                transaction.undo.append(lambda: self.truncate_rows(row_id))
+            self.store.append(row_data)
+            for field_name, index in self.indexes.items():
+                index.add(row_id, row_data[self.field_positions[field_name]])
+            self.revision += 1
+            self.notify("add_row", row_id, row_data)
+
+    @metrics.timed("table.add_rows")
+    def add_rows(self, rows, chunk_size=10000):
+        # Рядки приводяться до типів пакетами; вже додані пакети лишаються в таблиці при помилці
+        with self.clock.writer:
+            transaction = self.transaction()
+            if transaction is not None:
+                start = len(self.store)
+                transaction.undo.append(lambda: self.truncate_rows(start))
+            return self.append_chunks(rows, chunk_size)
+
+    def append_chunks(self, rows, chunk_size):
+        added = 0
+        rows = iter(rows)
+        while True:
+            chunk = list(itertools.islice(rows, chunk_size))
+            if not chunk:
+                return added
+            try:
+                converted = self.converter.convert_many(chunk)
+            except RowFormatError as e:
+                raise RowFormatError([(added + row_number, field_name, value) for row_number, field_name, value in e.errors])
+            start = len(self.store)
+            self.store.extend(converted)
+            for field_name, index in self.indexes.items():
+                position = self.field_positions[field_name]
+                index.extend((row_id, row[position]) for row_id, row in enumerate(converted, start))
+            self.revision += 1
+            self.notify("add_rows", start, converted)
+            added += len(converted)
+
+    def get_rows(self):
+        return self.rows
+    
+    def get_schema(self):
+        return self.schema
+
+    def worker_count(self):
+        return self.parallel_workers or os.cpu_count() or 1
+
+    def use_parallel(self):
+        if isinstance(self.store, PartitionedStore):
+            return False
+        return self.worker_count() > 1 and len(self.store) >= self.parallel_threshold
+
+    def scan_fields(self, field_indexes, keys=False, keep=None):
+        # Потік (номер рядка, значення полів); розбите сховище не читає частини, які відкидає keep(межі полів)
+        if isinstance(self.store, PartitionedStore):
+            return self.store.scan(field_indexes, keys, keep)
+        read = self.store.keys if keys else self.store.column
+        values = zip(*[read(i) for i in field_indexes]) if field_indexes else itertools.repeat((), len(self.store))
+        return enumerate(values)
+
+    def dictionary_mask(self, field_index, test):
+        # Прапорці test(значення) для всіх рядків, якщо колонка закодована словником; інакше None
+        if isinstance(self.store, (ColumnStore, SegmentStore)):
+            return self.store.mask(field_index, test)
+        return None
+
+    @metrics.timed("table.search_rows")
+    def search_rows(self, field_name, pattern):
+        return list(self.iter_search(field_name, pattern))
+
+    def iter_search(self, field_name, pattern, progress=None, progress_step=10000):
+        # progress(переглянуто, всього) викликається кожні progress_step рядків
+        for i in self.search_ids(field_name, pattern, progress, progress_step):
+            yield self.store.get(i)
+
+    def search_ids(self, field_name, pattern, progress=None, progress_step=10000):
+        field_index = self.field_index(field_name)
+        index = self.indexes.get(field_name)
+        candidates = index.candidates(pattern) if isinstance(index, NgramIndex) else None
+        mask = None
+        if candidates is None and self.schema[field_name] in ("string", "char"):
+            if progress:
+                progress(0, len(self.store))
+            mask = self.dictionary_mask(field_index, lambda value: pattern in str(value))
+        returned = 0
+        if candidates is not None:
+            for i in candidates:
+                row = self.store.get(i)
+                if pattern in str(row[field_index]):
+                    returned += 1
+                    yield i
+            scanned = len(candidates)
+        elif mask is not None:
+            total = len(self.store)
+            for i in itertools.compress(range(total), mask):
+                if progress and returned % progress_step == 0:
+                    progress(i, total)
+                returned += 1
+                yield i
+            scanned = len(mask)
+        elif self.use_parallel():
+            for i in parallel_search(self, field_index, pattern, progress):
+                returned += 1
+                yield i
+            scanned = len(self.store)
+        else:
+            total = len(self.store)
+            field_type = self.schema[field_name]
+
+            def keep(stats):
+                # Частина з єдиним значенням поля без шуканого фрагмента не читається
+                low, high = stats[field_index] or (None, None)
+                return low is None or low != high or field_type == "dateInvl" or pattern in str(decode_key(field_type, low))
+            position = -1
+            for position, (i, (value,)) in enumerate(self.scan_fields([field_index], keep=keep)):
+                if progress and position % progress_step == 0:
+                    progress(position, total)
+                if pattern in str(value):
+                    returned += 1
+                    yield i
+            scanned = position + 1
+        metrics.count("table.search_rows.rows_scanned", scanned)
+        metrics.count("table.search_rows.rows_returned", returned)
+
+    @metrics.timed("table.find_rows")
+    def find_rows(self, field_name, value):
+        field_index = self.field_index(field_name)
+        field_type = self.schema[field_name]
+        # Значення приводиться до вигляду клітинки, як у запитах; таке, що не приводиться, не збігається ні з чим
+        try:
+            value = cell_value(field_type, value)
+            low, high = stat_key(field_type)(value)
+        except (ValueError, TypeError):
+            return []
+        index = self.indexes.get(field_name)
+        if isinstance(index, (HashIndex, SortedIndex)):
+            return [self.store.get(i) for i in index.lookup(value)]
+        keep = lambda stats: stats_overlap(stats[field_index], low, high)
+        return [self.store.get(i) for i, (cell,) in self.scan_fields([field_index], keep=keep) if cell == value]
+
+    @metrics.timed("table.range_rows")
+    def range_rows(self, field_name, low=None, high=None):
+        return [self.store.get(i) for i in self.range_ids(field_name, low, high)]
+
+    def range_ids(self, field_name, low=None, high=None):
+        field_index = self.field_index(field_name)
+        field_type = self.schema[field_name]
+        if field_type not in SORTABLE_TYPES:
+            raise ValueError(f"Поле '{field_name}' не підтримує пошук за діапазоном")
+        index = self.indexes.get(field_name)
+        if isinstance(index, SortedIndex):
+            return list(index.range(low, high))
+        key = SORTABLE_TYPES[field_type]
+        low = None if low is None else key(low)
+        high = None if high is None else key(high)
+        keep = lambda stats: stats_overlap(stats[field_index], low, high)
+        return [i for i, (value,) in self.scan_fields([field_index], keys=True, keep=keep)
+                if (low is None or value >= low) and (high is None or value <= high)]
+    
+    @metrics.timed("table.overlap_rows")
+    def overlap_rows(self, field_name, low, high=None):
+        # Рядки, інтервал яких перетинає [low, high]; без high — містить дату low
+        return [self.store.get(i) for i in self.overlap_ids(field_name, low, high)]
+
+    def overlap_ids(self, field_name, low, high=None):
+        field_index = self.field_index(field_name)
+        if self.schema[field_name] != "dateInvl":
+            raise ValueError(f"Поле '{field_name}' не є інтервалом дат")
+        low = date_to_ordinal(low)
+        high = low if high is None else date_to_ordinal(high)
+        index = self.indexes.get(field_name)
+        if isinstance(index, IntervalIndex):
+            return list(index.overlapping(low, high))
+        keep = lambda stats: stats_overlap(stats[field_index], low, high)
+        return [i for i, ((start, end),) in self.scan_fields([field_index], keys=True, keep=keep)
+                if start <= high and end >= low]
+
+    @metrics.timed("table.edit_row")
+    def edit_row(self, row_index, new_row_data):
+        if len(new_row_data) != len(self.schema):
+            raise ValueError("Кількість значень не відповідає кількості полів")
+        with self.clock.writer:
+            if row_index < 0 or row_index >= len(self.store):
+                raise ValueError("Невірний індекс рядка")
+            clock = self.clock
+            transaction = self.transaction()
+            if transaction is not None:
+                old_row = self.store.get(row_index)
+                self.history.setdefault(row_index, []).append((transaction.version, old_row))
+                self.replace_row(row_index, new_row_data)
+                transaction.undo.append(lambda: self.replace_row(row_index, old_row))
+            else:
+                with clock.lock:
+                    # Старий рядок потрібен лише відкритим знімкам
+                    if clock.readers:
+                        self.history.setdefault(row_index, []).append((clock.version + 1, self.store.get(row_index)))
+                    self.replace_row(row_index, new_row_data)
+                    clock.version += 1
+                if self.history and not clock.readers:
+                    clock.prune()
+            self.notify("edit_row", row_index, new_row_data)
+
+    def replace_row(self, row_index, row):
+        old_row = self.store.get(row_index) if self.indexes else None
+        self.store.set(row_index, row)
+        for field_name, index in self.indexes.items():
+            position = self.field_positions[field_name]
+            index.remove(row_index, old_row[position])
+            index.add(row_index, row[position])
+        self.revision += 1
+
+    def truncate_rows(self, length):
+        # Відкат доданих у транзакції рядків
+        for field_name, index in self.indexes.items():
+            position = self.field_positions[field_name]
+            for row_id in range(length, len(self.store)):
+                index.remove(row_id, self.store.get(row_id)[position])
+        self.store.truncate(length)
+        self.revision += 1
+
+class TableSnapshot(Table):
+    # Незмінний вигляд таблиці для читання; індекси описують останню версію, тож знімок їх не використовує
+    parallel_workers = 1
+
+    def __init__(self, table, version, count):
+        super().__init__(table.name, table.schema, table.storage)
+        self.store = SnapshotStore(table, version, count)
+        self.version = version
+        self.kinds = table.index_kinds()
+        self.release = weakref.finalize(self, table.clock.release, version)
+
+    def read_only(self, *args, **kwargs):
+        raise ValueError("Знімок таблиці доступний лише для читання")
+
+    add_row = add_rows = edit_row = create_index = drop_index = read_only
+
+    def index_kinds(self):
+        return dict(self.kinds)
+
+    def close(self):
+        self.release()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.close()
+
+
+def fsync_directory(path):
+    if hasattr(os, "O_DIRECTORY"):
+        fd = os.open(path, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+def atomic_write(filename, write):
+    # Пишемо у тимчасовий файл і атомарно підміняємо ним цільовий
+    temp_name = f"{filename}.tmp"
+    with open(temp_name, 'wb') as f:
+        write(f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_name, filename)
+    fsync_directory(os.path.dirname(os.path.abspath(filename)))
+
+
+# Каталог бази: manifest.json, сегменти таблиць і журнал операцій (WAL)
+class DatabaseStore:
+    manifest_name = "manifest.json"
+
+    def __init__(self, path, compact_every=100000, durable=False, dirty_limit=64 * 1024 * 1024):
+        self.path = path
+        self.compact_every = compact_every
+        self.durable = durable
+        self.generation = 0
+        self.wal = None
+        self.pending = 0
+        # Розмір змін, що живуть лише в пам'яті до наступного checkpoint, і межа, після якої вони записуються
+        self.dirty_bytes = 0
+        self.dirty_limit = dirty_limit
+        self.database = None
+        self.checkpoint_lock = threading.Lock()
+        # Автоматичний checkpoint іде у власному потоці; його помилка повідомляється наступному записувачу
+        self.checkpointer = None
+        self.checkpoint_error = None
+
+    def file_path(self, name):
+        return os.path.join(self.path, name)
+
+    def read_manifest(self):
+        metrics.file_size("database.bytes_read", self.file_path(self.manifest_name))
+        with open(self.file_path(self.manifest_name), 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    @metrics.timed("database.open")
+    def load(self, storage="rows"):
+        manifest = self.read_manifest()
+        self.generation = manifest["generation"]
+        database = Database(manifest["name"], storage)
+        for table_name, table_data in manifest["tables"].items():
+            table = Table(table_name, table_data["schema"], storage, database.clock)
+            self.open_segment(table, table_data, table_data.get("indexes", {}))
+            database.tables[table_name] = table
+        wal_name = manifest["wal"]
+        self.replay(database, self.file_path(wal_name))
+        # Збій посеред checkpoint: журнали наступних поколінь уже містять нові записи
+        recovered = False
+        while os.path.exists(self.file_path(f"wal.{self.generation + 1}.log")):
+            self.generation += 1
+            wal_name = f"wal.{self.generation}.log"
+            self.replay(database, self.file_path(wal_name))
+            recovered = True
+        self.attach(database, wal_name)
+        if recovered:
+            # Відновлені журнали видаляє сам checkpoint, коли новий маніфест уже записано
+            self.checkpoint(database)
+        else:
+            self.remove_stale_files(manifest)
+        return database
+
+    def open_segment(self, table, table_data, indexes=None):
+        table.segment_info = table_data
+        if "partitions" in table_data:
+            open_store = lambda: PartitionedStore.open(table.schema, table.storage, table_data, self.file_path)
+        else:
+            filename = self.file_path(table_data["segment"])
+            open_store = lambda: SegmentStore(table.schema, filename, table.storage)
+        table.load_lazily(open_store, indexes)
+
+    def replay(self, database, filename):
+        if not os.path.exists(filename):
+            return
+        metrics.file_size("database.bytes_read", filename)
+        valid = 0
+        with open(filename, 'rb') as f:
+            for line in f:
+                try:
+                    if not line.endswith(b"\n"):
+                        raise ValueError("Запис без кінця рядка")
+                    record = json.loads(line)
+                except ValueError:
+                    # Обірваний останній запис після збою
+                    break
+                self.apply(database, record)
+                self.pending += 1
+                valid += len(line)
+        if valid < os.path.getsize(filename):
+            # Інакше наступний запис допишеться до обірваного рядка і пропаде під час наступного відкриття
+            with open(filename, 'r+b') as f:
+                f.truncate(valid)
+                os.fsync(f.fileno())
+
+    def apply(self, database, record):
+        op = record["op"]
+        if op == "create_table":
+            database.create_table(record["table"], record["schema"])
+        elif op == "delete_table":
+            database.delete_table(record["table"])
+        elif op == "add_row":
+            database.get_table(record["table"]).add_row(record["row"])
+        elif op == "add_rows":
+            database.get_table(record["table"]).add_rows(record["rows"])
+        elif op == "edit_row":
+            database.get_table(record["table"]).edit_row(record["index"], record["row"])
+        elif op == "create_index":
+            database.get_table(record["table"]).create_index(record["field"], record["kind"])
+        elif op == "drop_index":
+            database.get_table(record["table"]).drop_index(record["field"])
+        elif op == "partition_by":
+            partitioning = record["partitioning"]
+            database.get_table(record["table"]).partition_by(partitioning["field"], partitioning["kind"],
+                                                             partitioning.get("count"), partitioning.get("bounds"))
+        elif op == "transaction":
+            for item in record["records"]:
+                self.apply(database, item)
+
+    def attach(self, database, wal_name):
+        self.database = database
+        database.journal = self
+        for table in database.tables.values():
+            self.watch(table)
+        self.wal = open(self.file_path(wal_name), 'a', encoding='utf-8')
+
+    def watch(self, table):
+        if self.on_table_change not in table.listeners:
+            table.listeners.append(self.on_table_change)
+
+    def on_table_change(self, table, op, *args):
+        record = {"op": op, "table": table.name}
+        if op in ("add_row", "edit_row"):
+            record["index"], record["row"] = args[0], list(args[1])
+        elif op == "add_rows":
+            record["index"], record["rows"] = args
+        elif op == "create_index":
+            record["field"], record["kind"] = args
+        elif op == "drop_index":
+            record["field"] = args[0]
+        elif op == "partition_by":
+            record["partitioning"] = args[0]
+        self.log(record)
+
+    def log(self, record):
+        # Записи транзакції потрапляють у журнал одним рядком під час commit
+        transaction = self.database.clock.transaction
+        if transaction is not None:
+            transaction.records.append(record)
+            return
+        self.append(record)
+        self.maybe_checkpoint()
+
+    def append(self, record):
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        self.wal.write(line)
+        if metrics.enabled:
+            metrics.count("database.bytes_written", len(line.encode('utf-8')))
+        self.wal.flush()
+        if self.durable:
+            os.fsync(self.wal.fileno())
+        self.pending += 1
+        self.dirty_bytes += len(line)
+
+    def maybe_checkpoint(self):
+        # Викликається записувачем, який ще тримає clock.writer, тому checkpoint лише запускається у фоні:
+        # потік дочекається блокування, зафіксує знімок і пише сегменти, поки записувачі продовжують.
+        # Змінені рядки записуються в сегменти і тоді, коли їхній обсяг перевищує dirty_limit
+        error, self.checkpoint_error = self.checkpoint_error, None
+        if error is not None:
+            raise error
+        if ((self.compact_every and self.pending >= self.compact_every)
+                or (self.dirty_limit and self.dirty_bytes > self.dirty_limit)):
+            if self.checkpointer is None or not self.checkpointer.is_alive():
+                self.checkpointer = threading.Thread(target=self.background_checkpoint, daemon=True)
+                self.checkpointer.start()
+
+    def background_checkpoint(self):
+        try:
+            self.checkpoint(wait=False)
+        except (ValueError, OSError) as e:
+            self.checkpoint_error = e
+
+    def wait(self):
+        # Дочекатися автоматичного checkpoint, що вже триває
+        checkpointer = self.checkpointer
+        if checkpointer is not None and checkpointer is not threading.current_thread():
+            checkpointer.join()
+        error, self.checkpoint_error = self.checkpoint_error, None
+        if error is not None:
+            raise error
+
+    @metrics.timed("database.checkpoint")
+    def checkpoint(self, database=None, wait=True):
+        # Під блокуванням записувача лише фіксуємо знімок і перемикаємо журнал;
+        # сегменти пишуться зі знімка, поки інші потоки продовжують додавати рядки
+        database = database or self.database
+        if not self.checkpoint_lock.acquire(blocking=wait):
+            return
+        try:
+            with database.clock.writer:
+                if database.clock.transaction is not None:
+                    raise ValueError("Неможливо зберегти базу під час транзакції")
+                os.makedirs(self.path, exist_ok=True)
+                generation = self.generation + 1
+                manifest = {
+                    "name": database.name,
+                    "generation": generation,
+                    "wal": f"wal.{generation}.log",
+                    "tables": {}
+                }
+                loaded = []
+                for table_name, table in database.tables.items():
+                    if not table.loaded and table.segment_info:
+                        # Невідкрита таблиця не змінювалась, її сегмент лишається чинним
+                        manifest["tables"][table_name] = dict(table.segment_info, indexes=table.index_kinds())
+                    else:
+                        manifest["tables"][table_name] = None
+                        loaded.append(table_name)
+                snapshot = database.snapshot(loaded)
+                # Нові записи йдуть уже в журнал наступного покоління
+                atomic_write(self.file_path(manifest["wal"]), lambda f: None)
+                if self.wal:
+                    self.wal.close()
+                self.pending = 0
+                self.dirty_bytes = 0
+                self.attach(database, manifest["wal"])
+            self.write_snapshot(database, snapshot, manifest, generation)
+            # Знімок відпущено: замінені сховища, яких ніхто більше не читає, вже закрито
+            snapshot = None
+            self.remove_stale_files(manifest)
+        finally:
+            self.checkpoint_lock.release()
+
+    def write_snapshot(self, database, snapshot, manifest, generation):
+        with snapshot:
+            partitioned = {}
+            for number, (table_name, table) in enumerate(snapshot.tables.items()):
+                frozen = table.store.freeze()
+                table_data = {
+                    "schema": table.schema,
+                    "indexes": table.index_kinds()
+                }
+                if isinstance(frozen, PartitionedStore):
+                    table_data["partitioning"] = frozen.partitioning
+                    table_data["partitions"] = self.write_partitions(frozen, f"segment.{generation}.{number}")
+                    partitioned[table_name] = frozen
+                else:
+                    segment = f"segment.{generation}.{number}.seg"
+                    atomic_write(self.file_path(segment), lambda f: write_segment(f, table.schema, frozen))
+                    metrics.file_size("database.bytes_written", self.file_path(segment))
+                    table_data["segment"] = segment
+                manifest["tables"][table_name] = table_data
+            with database.clock.writer:
+                atomic_write(self.file_path(self.manifest_name),
+                             lambda f: f.write(json.dumps(manifest, ensure_ascii=False, indent=4).encode('utf-8')))
+                # Незмінена після знімка таблиця читається з нового сегмента; індекси лишаються чинними
+                for table_name, table in snapshot.tables.items():
+                    current = database.tables.get(table_name)
+                    if current is not None and table.store.table is current and table.store.unchanged():
+                        self.open_segment(current, manifest["tables"][table_name])
+                    elif table_name in partitioned and current is not None and current._store is table.store.store:
+                        current._store.adopt(partitioned[table_name])
+                self.generation = generation
+
+    def write_partitions(self, frozen, prefix):
+        # Переписуються лише змінені частини; для решти в маніфесті лишаються попередні файли
+        entries = []
+        for number, partition in enumerate(frozen.partitions):
+            if partition.dirty:
+                segment, ids = f"{prefix}.{number}.seg", f"{prefix}.{number}.ids"
+                atomic_write(self.file_path(segment), lambda f: write_segment(f, frozen.schema, partition.store))
+                atomic_write(self.file_path(ids), lambda f: f.write(partition.row_ids.tobytes()))
+                metrics.file_size("database.bytes_written", self.file_path(segment))
+                partition.filename = self.file_path(segment)
+                partition.info = {"segment": segment, "ids": ids, "stats": partition.stats, "count": len(partition)}
+            entries.append(partition.info)
+        return entries
+
+    def remove_stale_files(self, manifest):
+        keep = {self.manifest_name, manifest["wal"]}
+        for table_data in manifest["tables"].values():
+            if "partitions" in table_data:
+                keep.update(name for entry in table_data["partitions"] for name in (entry["segment"], entry["ids"]))
+            else:
+                keep.add(table_data["segment"])
+        # Сегмент, який ще читає відкритий знімок, видалить наступний checkpoint або відкриття бази
+        mapped = {os.path.abspath(segment.filename) for segment in list(open_segments)}
+        for name in os.listdir(self.path):
+            if name not in keep and os.path.abspath(self.file_path(name)) not in mapped:
+                os.remove(self.file_path(name))
+
+    def close(self):
+        self.wait()
+        if self.wal:
+            self.wal.close()
+            self.wal = None
+
+
+class Descending:
+    __slots__ = ("key",)
+
+    def __init__(self, key):
+        self.key = key
+
+    def __lt__(self, other):
+        return other.key < self.key
+
+    def __eq__(self, other):
+        return self.key == other.key
+
+
+def compile_predicate(field_type, op, value):
+    # Предикат працює з ключами сховища, тож рядки не матеріалізуються
+    key = field_key(field_type)
+    if field_type == "dateInvl" and op in ("contains", "overlaps"):
+        if op == "contains":
+            day = date_to_ordinal(value)
+            return lambda interval: interval[0] <= day <= interval[1]
+        low, high = map(date_to_ordinal, value)
+        return lambda interval: interval[0] <= high and interval[1] >= low
+    if op == "contains":
+        pattern = str(value)
+        if field_type == "date":
+            return lambda cell: pattern in ordinal_to_date(cell)
+        return lambda cell: pattern in str(cell)
+    if op == "between":
+        low, high = map(key, value)
+        return lambda cell: low <= cell <= high
+    value = key(value)
+    comparisons = {
+        "=": lambda cell: cell == value,
+        "!=": lambda cell: cell != value,
+        "<": lambda cell: cell < value,
+        "<=": lambda cell: cell <= value,
+        ">": lambda cell: cell > value,
+        ">=": lambda cell: cell >= value,
+    }
+    if op not in comparisons:
+        raise ValueError(f"Невідомий оператор '{op}'")
+    return comparisons[op]
+
+
+AGGREGATES = ("count", "sum", "avg", "min", "max")
+
+
+class Query:
+    def __init__(self, table):
+        self.table = table
+        self.predicates = []
+        self.fields = None
+        self.ordering = []
+        self.limit_count = None
+        self.group_fields = []
+        self.aggregates = {}
+
+    def where(self, field_name, op, value):
+        self.table.field_index(field_name)
+        test = compile_predicate(self.table.schema[field_name], op, value)
+        self.predicates.append((field_name, op, value, test))
+        return self
+
+    def select(self, *field_names):
+        for field_name in field_names:
+            self.table.field_index(field_name)
+        self.fields = list(field_names)
+        return self
+
+    def order_by(self, field_name, descending=False):
+        self.ordering.append((field_name, descending))
+        return self
+
+    def limit(self, count):
+        self.limit_count = count
+        return self
+
+    def group_by(self, *field_names):
+        for field_name in field_names:
+            self.table.field_index(field_name)
+        self.group_fields = list(field_names)
+        return self
+
+    def aggregate(self, **aggregates):
+        # aggregate(total=("sum", "salary"), people=("count", "*"))
+        for name, (function, field_name) in aggregates.items():
+            if function not in AGGREGATES:
+                raise ValueError(f"Невідома агрегатна функція '{function}'")
+            if field_name != "*":
+                self.table.field_index(field_name)
+        self.aggregates.update(aggregates)
+        return self
+
+    def columns(self):
+        if self.group_fields or self.aggregates:
+            return self.group_fields + list(self.aggregates)
+        return self.fields or self.table.field_names()
+
+    def __iter__(self):
+        if self.group_fields or self.aggregates:
+            return self.run_grouped()
+        return self.run()
+
+    @metrics.timed("query.all")
+    def all(self):
+        return list(self)
+
+    def candidates(self):
+        # Індекс звужує множину рядків; всі предикати все одно перевіряються
+        for field_name, op, value, test in self.predicates:
+            index = self.table.indexes.get(field_name)
+            if isinstance(index, HashIndex) and op == "=":
+                return index.lookup(cell_value(self.table.schema[field_name], value))
+            if isinstance(index, SortedIndex) and op in ("=", "<", "<=", ">", ">=", "between"):
+                if op == "between":
+                    low, high = value
+                elif op in ("<", "<="):
+                    low, high = None, value
+                elif op in (">", ">="):
+                    low, high = value, None
+                else:
+                    low = high = value
+                return index.range(low, high)
+            if isinstance(index, NgramIndex) and op == "contains":
+                row_ids = index.candidates(str(value))
+                if row_ids is not None:
+                    return row_ids
+            if isinstance(index, IntervalIndex) and op in ("contains", "overlaps"):
+                low, high = (value, value) if op == "contains" else value
+                return index.overlapping(date_to_ordinal(low), date_to_ordinal(high))
+        return None
+
+    def partition_filter(self):
+        # Межі ключів з предикатів; частини розбитої таблиці поза ними не читаються
+        bounds = []
+        for field_name, op, value, test in self.predicates:
+            position = self.table.field_index(field_name)
+            field_type = self.table.schema[field_name]
+            if field_type == "dateInvl":
+                if op in ("contains", "overlaps"):
+                    low, high = (value, value) if op == "contains" else value
+                    bounds.append((position, date_to_ordinal(low), date_to_ordinal(high)))
+                continue
+            key = field_key(field_type)
+            if op == "=":
+                bounds.append((position, key(value), key(value)))
+            elif op == "between":
+                bounds.append((position, key(value[0]), key(value[1])))
+            elif op in ("<", "<="):
+                bounds.append((position, None, key(value)))
+            elif op in (">", ">="):
+                bounds.append((position, key(value), None))
+        if not bounds:
+            return None
+        return lambda stats: all(stats_overlap(stats[position], low, high) for position, low, high in bounds)
+
+    def scan(self, field_names, candidates=None):
+        # Потік (номер рядка, ключі потрібних полів) для рядків, що пройшли фільтр
+        table = self.table
+        positions = [table.field_index(field_name) for field_name in field_names]
+        tests = [(field_names.index(field_name), test) for field_name, op, value, test in self.predicates]
+        if candidates is None:
+            candidates = self.candidates()
+        if candidates is None:
+            rows = table.scan_fields(positions, keys=True, keep=self.partition_filter())
+            if not isinstance(table.store, PartitionedStore):
+                # Умови на колонках зі словником обчислюються за номерами значень до перебору рядків
+                mask = None
+                remaining = []
+                for i, test in tests:
+                    field_mask = table.dictionary_mask(positions[i], test)
+                    if field_mask is None:
+                        remaining.append((i, test))
+                    else:
+                        mask = field_mask if mask is None else bytes(map(min, mask, field_mask))
+                if mask is not None:
+                    rows = itertools.compress(rows, mask)
+                    tests = remaining
+        else:
+            types = [field_key(table.schema[field_name]) for field_name in field_names]
+            rows = ((row_id, tuple(key(row[position]) for key, position in zip(types, positions)))
+                    for row_id, row in ((row_id, table.store.get(row_id)) for row_id in candidates))
+        for row_id, keys in rows:
+            if all(test(keys[i]) for i, test in tests):
+                yield row_id, keys
+
+    def sort_key(self, keys, positions):
+        return tuple(Descending(keys[i]) if descending else keys[i] for i, descending in positions)
+
+    def run(self):
+        field_names = list(dict.fromkeys([predicate[0] for predicate in self.predicates] + [name for name, _ in self.ordering]))
+        matches = self.scan(field_names)
+        if self.ordering:
+            positions = [(field_names.index(name), descending) for name, descending in self.ordering]
+            key = lambda match: (self.sort_key(match[1], positions), match[0])
+            if self.limit_count is not None:
+                # Top-N без сортування всієї таблиці
+                matches = heapq.nsmallest(self.limit_count, matches, key=key)
+            else:
+                matches = sorted(matches, key=key)
+        elif self.limit_count is not None:
+            matches = itertools.islice(matches, self.limit_count)
+        projection = None if self.fields is None else [self.table.field_index(name) for name in self.fields]
+        for row_id, keys in matches:
+            row = self.table.store.get(row_id)
+            yield row if projection is None else [row[i] for i in projection]
+
+    def run_grouped(self):
+        value_fields = [field_name for function, field_name in self.aggregates.values() if field_name != "*"]
+        field_names = list(dict.fromkeys([predicate[0] for predicate in self.predicates] + self.group_fields + value_fields))
+        group_positions = [field_names.index(field_name) for field_name in self.group_fields]
+        aggregates = [(function, None if field_name == "*" else field_names.index(field_name))
+                      for function, field_name in self.aggregates.values()]
+        if self.candidates() is None and self.table.use_parallel():
+            groups = parallel_aggregate(self, field_names, group_positions, aggregates)
+        else:
+            groups = accumulate_groups(self.scan(field_names), group_positions, aggregates)
+        if not groups and not self.group_fields:
+            groups[()] = [[0, None] for _ in aggregates]
+        result = []
+        for group, state in groups.items():
+            row = [decode_key(self.table.schema[field_name], key) for field_name, key in zip(self.group_fields, group)]
+            for (count, total), (function, field_name) in zip(state, self.aggregates.values()):
+                if function == "count":
+                    row.append(count)
+                elif function == "avg":
+                    row.append(total / count if count else None)
+                elif function in ("min", "max") and total is not None:
+                    row.append(decode_key(self.table.schema[field_name], total))
+                else:
+                    row.append(total)
+            result.append(row)
+        columns = self.columns()
+        for field_name, descending in reversed(self.ordering):
+            position = columns.index(field_name)
+            result.sort(key=lambda row: (row[position] is None, row[position]), reverse=descending)
+        if self.limit_count is not None:
+            result = result[:self.limit_count]
+        return iter(result)
+
+
+def accumulate_groups(matches, group_positions, aggregates, groups=None):
+    # Стан агрегату: [кількість, сума або мінімум/максимум]
+    groups = {} if groups is None else groups
+    for row_id, keys in matches:
+        group = tuple(keys[i] for i in group_positions)
+        state = groups.get(group)
+        if state is None:
+            state = groups[group] = [[0, None] for _ in aggregates]
+        for accumulator, (function, position) in zip(state, aggregates):
+            value = None if position is None else keys[position]
+            accumulator[0] += 1
+            if function in ("sum", "avg"):
+                accumulator[1] = value if accumulator[1] is None else accumulator[1] + value
+            elif function == "min" and (accumulator[1] is None or value < accumulator[1]):
+                accumulator[1] = value
+            elif function == "max" and (accumulator[1] is None or value > accumulator[1]):
+                accumulator[1] = value
+    return groups
+
+def merge_groups(target, groups, aggregates):
+    for group, state in groups.items():
+        current = target.get(group)
+        if current is None:
+            target[group] = state
+            continue
+        for accumulator, (count, value), (function, position) in zip(current, state, aggregates):
+            accumulator[0] += count
+            if value is None:
+                continue
+            if accumulator[1] is None:
+                accumulator[1] = value
+            elif function in ("sum", "avg"):
+                accumulator[1] += value
+            elif function == "min":
+                accumulator[1] = min(accumulator[1], value)
+            elif function == "max":
+                accumulator[1] = max(accumulator[1], value)
+    return target
+
+
+# Паралельне сканування: колонки віддаються процесам через спільну пам'ять або mmap сегмента
+process_pool = None
+
+def get_process_pool(workers):
+    global process_pool
+    if process_pool is None or process_pool._max_workers != workers:
+        if process_pool is not None:
+            process_pool.shutdown(wait=False)
+        process_pool = ProcessPoolExecutor(max_workers=workers)
+    return process_pool
+
+def partition_rows(count, workers, min_chunk=10000):
+    size = max(min_chunk, -(-count // (workers * 4)))
+    return [(start, min(start + size, count)) for start in range(0, count, size)]
+
+
+def release_shared_memory(memory):
+    memory.close()
+    memory.unlink()
+
+
+class SharedColumn:
+    # Колонка таблиці в пам'яті, закодована у спільну пам'ять для процесів пошуку.
+    # Пам'ять звільняється, коли запис не потрібен ні кешу, ні пошуку, що ще триває
+    def __init__(self, table, position):
+        store = table.store
+        column = store.columns[position] if isinstance(store, ColumnStore) else StoreColumn(store, position)
+        kind, buffers, options = encode_column(list(table.schema.values())[position], column)
+        size = sum(len(buffer) + -len(buffer) % 8 for buffer in buffers)
+        self.memory = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        self.spec = dict(options, source="memory", name=self.memory.name, kind=kind, buffers=[])
+        offset = 0
+        for buffer in buffers:
+            self.memory.buf[offset:offset + len(buffer)] = buffer
+            self.spec["buffers"].append([offset, len(buffer)])
+            offset += len(buffer) + -len(buffer) % 8
+        self.count = len(store)
+        self.store = weakref.ref(store)
+        self.revision = table.revision
+        # Рядки, відредаговані після кодування: процеси їх пропускають, а перевіряє головний процес
+        self.skip = set()
+        weakref.finalize(self, release_shared_memory, self.memory)
+
+
+class SharedColumnCache:
+    # (таблиця, поле) -> SharedColumn. Повторний пошук не кодує колонку знову: додані рядки лежать
+    # за межею count, а відредаговані потрапляють у skip. Коли доданих рядків більше за parallel_threshold,
+    # їх уже варто сканувати процесами, і колонка кодується наново разом з ними. Так само після змін
+    # без сповіщення (відкат транзакції, нове сховище), які змінюють ревізію таблиці
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.tables = weakref.WeakKeyDictionary()
+
+    def get(self, table, position):
+        with self.lock:
+            columns = self.tables.setdefault(table, {})
+            column = columns.get(position)
+            if (column is None or column.revision != table.revision or column.store() is not table.store
+                    or len(table.store) - column.count > table.parallel_threshold):
+                column = columns[position] = SharedColumn(table, position)
+                if self.on_table_change not in table.listeners:
+                    table.listeners.append(self.on_table_change)
+            return column
+
+    def on_table_change(self, table, op, *args):
+        if op not in ("add_row", "add_rows", "edit_row"):
+            return
+        with self.lock:
+            for column in self.tables.get(table, {}).values():
+                if column.revision != table.revision - 1:
+                    continue
+                if op == "edit_row" and args[0] < column.count:
+                    column.skip.add(args[0])
+                column.revision = table.revision
+
+
+shared_columns = SharedColumnCache()
+
+
+class SharedColumns:
+    def __init__(self, table, positions):
+        store = table.store
+        self.columns = []
+        if isinstance(store, SegmentStore):
+            # Незмінна частина сегмента вже лежить у файлі, процеси відображають його самі
+            self.count = store.base_count
+            self.skip = sorted(store.edits)
+            self.rest = self.skip + list(range(store.base_count, len(store)))
+            self.specs = [{"source": "file", "name": store.segment.filename, "kind": column.kind, "buffers": column.buffers,
+                           "base": column.base, "format": column.format}
+                          for column in (store.segment.columns[position] for position in positions)]
+            return
+        # Колонки таблиці в пам'яті кодуються один раз і живуть у кеші; пошук тримає їх до завершення
+        with shared_columns.lock:
+            self.columns = [shared_columns.get(table, position) for position in positions]
+            self.count = min(column.count for column in self.columns)
+            self.skip = sorted(set().union(*[column.skip for column in self.columns]))
+            self.rest = self.skip + list(range(self.count, len(store)))
+        self.specs = [column.spec for column in self.columns]
+
+    def skipped(self, start, end):
+        return set(row_id for row_id in self.skip if start <= row_id < end)
+
+    def close(self):
+        self.columns = []
+
+
+def attach_columns(specs):
+    columns = []
+    handles = []
+    for spec in specs:
+        if spec["source"] == "file":
+            f = open(spec["name"], 'rb')
+            mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            view = memoryview(mapping)
+            handles.append((view, mapping, f))
+        else:
+            memory = shared_memory.SharedMemory(name=spec["name"])
+            view = memory.buf
+            handles.append((memory,))
+        columns.append(SegmentColumn(view, spec["kind"], spec["buffers"], spec.get("base", 0), spec.get("format")))
+    return columns, handles
+
+def detach_columns(columns, handles):
+    for column in columns:
+        column.release()
+    for handle in handles:
+        for resource in handle:
+            resource.release() if isinstance(resource, memoryview) else resource.close()
+
+def find_text(column, start, end, pattern):
+    # Пошук підрядка в упакованому UTF-8 блоці партиції без декодування кожного рядка
+    needle = pattern.encode('utf-8')
+    if not needle:
+        return list(range(start, end))
+    offsets = column.data
+    base = offsets[start]
+    data = bytes(column.extra[0][base:offsets[end]])
+    row_ids = []
+    position = data.find(needle)
+    while position != -1:
+        row_id = bisect.bisect_right(offsets, base + position, start, end + 1) - 1
+        row_end = offsets[row_id + 1] - base
+        if position + len(needle) <= row_end:
+            row_ids.append(row_id)
+            position = data.find(needle, row_end)
+        else:
+            position = data.find(needle, position + 1)
+    return row_ids
+
+def run_on_columns(specs, work, *args):
+    # Ітератори над зрізами мають зникнути до закриття спільної пам'яті, тому робота йде в окремій функції
+    columns, handles = attach_columns(specs)
+    try:
+        return work(columns, *args)
+    finally:
+        detach_columns(columns, handles)
+
+def search_columns(columns, start, end, pattern, skip):
+    column = columns[0]
+    if column.kind == "text":
+        row_ids = find_text(column, start, end, pattern)
+    elif column.kind == "dict":
+        row_ids = list(itertools.compress(itertools.count(start), column.mask(lambda value: pattern in value, start, end)))
+    else:
+        row_ids = [row_id for row_id, value in enumerate(column.values(start, end), start) if pattern in str(value)]
+    return [row_id for row_id in row_ids if row_id not in skip] if skip else row_ids
+
+def aggregate_columns(columns, field_types, start, end, predicates, group_positions, aggregates, skip):
+    keys = zip(*[column.keys(field_key(field_type), start, end) for column, field_type in zip(columns, field_types)])
+    tests = [(position, compile_predicate(field_types[position], op, value)) for position, op, value in predicates]
+    matches = ((row_id, row_keys) for row_id, row_keys in enumerate(keys, start)
+               if row_id not in skip and all(test(row_keys[position]) for position, test in tests))
+    return accumulate_groups(matches, group_positions, aggregates)
+
+def search_partition(spec, start, end, pattern, skip):
+    return run_on_columns([spec], search_columns, start, end, pattern, skip)
+
+def aggregate_partition(specs, field_types, start, end, predicates, group_positions, aggregates, skip):
+    return run_on_columns(specs, aggregate_columns, field_types, start, end, predicates, group_positions, aggregates, skip)
+
+def collect_in_order(futures, chunks, total, progress, merge):
+    # Результати партицій зливаються у вихідному порядку рядків
+    try:
+        for (start, end), future in zip(chunks, futures):
+            merge(future.result())
+            if progress:
+                progress(end, total)
+    except BaseException:
+        for future in futures:
+            future.cancel()
+        raise
+
+def parallel_search(table, field_index, pattern, progress=None):
+    shared = SharedColumns(table, [field_index])
+    row_ids = []
+    try:
+        workers = table.worker_count()
+        chunks = partition_rows(shared.count, workers)
+        pool = get_process_pool(workers)
+        futures = [pool.submit(search_partition, shared.specs[0], start, end, pattern, shared.skipped(start, end))
+                   for start, end in chunks]
+        collect_in_order(futures, chunks, shared.count, progress, row_ids.extend)
+    finally:
+        shared.close()
+    # Відредаговані та нові рядки поза сегментом перевіряються тут
+    rest = [row_id for row_id in shared.rest if pattern in str(table.store.get(row_id)[field_index])]
+    return sorted(row_ids + rest) if rest else row_ids
+
+def parallel_aggregate(query, field_names, group_positions, aggregates):
+    table = query.table
+    positions = [table.field_index(field_name) for field_name in field_names]
+    field_types = [table.schema[field_name] for field_name in field_names]
+    predicates = [(field_names.index(field_name), op, value) for field_name, op, value, test in query.predicates]
+    shared = SharedColumns(table, positions)
+    groups = {}
+    try:
+        workers = table.worker_count()
+        chunks = partition_rows(shared.count, workers)
+        pool = get_process_pool(workers)
+        futures = [pool.submit(aggregate_partition, shared.specs, field_types, start, end, predicates,
+                               group_positions, aggregates, shared.skipped(start, end))
+                   for start, end in chunks]
+        collect_in_order(futures, chunks, shared.count, None, lambda part: merge_groups(groups, part, aggregates))
+    finally:
+        shared.close()
+    if shared.rest:
+        rest = accumulate_groups(query.scan(field_names, shared.rest), group_positions, aggregates)
+        merge_groups(groups, rest, aggregates)
+    return groups
+
+
+def looks_like_header(schema, row):
+    # Без явного header= перший рядок вважається заголовком, якщо жодне числове чи датове поле в ньому
+    # не читається як значення; таблицю лише з текстових полів так не розпізнати
+    typed = [(FIELD_CONVERTERS[field_type], value) for field_type, value in zip(schema.values(), row)
+             if field_type not in ("string", "char") and field_type in FIELD_CONVERTERS]
+    for convert, value in typed:
+        try:
+            convert(value)
+            return False
+        except (ValueError, TypeError, OverflowError):
+            pass
+    return bool(typed)
+
+def read_csv(f, schema, delimiter=',', header=None):
+    # header: True — перший рядок заголовок, False — дані, None — визначити за вмістом
+    fields = list(schema)
+    rows = csv.reader(f, delimiter=delimiter)
+    first = next(rows, None)
+    if first is None:
+        return
+    if header is None:
+        header = sorted(first) == sorted(fields) or looks_like_header(schema, first)
+    if not header:
+        yield first
+        yield from rows
+    elif first == fields:
+        yield from rows
+    elif sorted(first) == sorted(fields):
+        # Заголовок може задавати інший порядок колонок
+        order = [first.index(field_name) for field_name in fields]
+        for row in rows:
+            yield [row[i] for i in order] if len(row) == len(order) else row
+    else:
+        raise ValueError(f"Заголовок CSV {first} не відповідає полям таблиці {fields}")
+
+def read_ndjson(f, fields):
+    for row_number, line in enumerate(line for line in f if line.strip()):
+        row = json.loads(line)
+        if isinstance(row, dict):
+            missing = [field_name for field_name in fields if field_name not in row]
+            if missing:
+                raise RowFormatError([(row_number, field_name, None) for field_name in missing])
+            row = [row[field_name] for field_name in fields]
+        yield row
+
+# JSON-файли бази можна стискати: кодек визначається розширенням (Base1.json.gz, Base1.json.xz)
+# gzip — швидкий варіант, xz — найменший файл ціною довшого запису
+COMPRESSED_OPENERS = {".gz": functools.partial(gzip.open, compresslevel=6), ".xz": lzma.open}
+JSON_EXTENSIONS = (".json", ".json.gz", ".json.xz")
 
-    def get_rows(self):
-        return self.rows
-    
-    def get_schema(self):
-        return self.schema
+def open_json(filename, mode):
+    opener = COMPRESSED_OPENERS.get(os.path.splitext(filename)[1], open)
+    return opener(filename, mode + 't', encoding='utf-8')
+
+def intern_strings(schema, rows):
+    # Однакові рядкові значення з JSON стають одним об'єктом у пам'яті
+    positions = [i for i, field_type in enumerate(schema.values()) if field_type in ("string", "char")]
+    for row in rows:
+        for i in positions:
+            if isinstance(row[i], str):
+                row[i] = sys.intern(row[i])
+    return rows
 
-    def search_rows(self, field_name, pattern):
-        field_index = list(self.schema.keys()).index(field_name)
-        matched_rows = []
-        for row in self.rows:
-            if pattern in str(row[field_index]):
-                matched_rows.append(row)
-        return matched_rows
-    
-    def edit_row(self, row_index, new_row_data):
-        if len(new_row_data) != len(self.schema):
-            raise ValueError("Кількість значень не відповідає кількості полів")
-        if row_index < 0 or row_index >= len(self.rows):
-            raise ValueError("Невірний індекс рядка")
-        self.rows[row_index] = new_row_data
 
 class Database:
-    def __init__(self, name):
+    def __init__(self, name, storage="rows"):
         self.name = name
+        self.storage = storage
         self.tables = {}
+        self.journal = None
+        self.clock = VersionClock()
+
+    def begin(self):
+        return Transaction(self.clock, self)
 
+    def snapshot(self, table_names=None):
+        for table_name in self.tables if table_names is None else table_names:
+            # Сховища відкриваємо заздалегідь, щоб не робити цього під блокуванням
+            self.get_table(table_name).store
+        with self.clock.lock:
+            tables = dict(self.tables)
+            transaction = self.clock.transaction
+            if transaction is not None:
+                # Таблиці, створені чи видалені незавершеною транзакцією, знімок бачить як до неї
+                for table_name in transaction.created:
+                    tables.pop(table_name, None)
+                tables.update(transaction.deleted)
+            snapshots = {}
+            for table_name in tables if table_names is None else table_names:
+                if table_name in tables:
+                    table = tables[table_name]
+                    # Таблиця, додана напряму в tables, має власний лічильник версій
+                    snapshots[table_name] = table.locked_snapshot() if table.clock is self.clock else table.snapshot()
+        return DatabaseSnapshot(self.name, snapshots)
+
+    @metrics.timed("database.create_table")
     def create_table(self, table_name, schema):
-        if table_name in self.tables:
-            raise ValueError(f"Таблиця '{table_name}' вже існує")
-        self.tables[table_name] = Table(table_name, schema)
+        with self.clock.writer:
+            if table_name in self.tables:
+                raise ValueError(f"Таблиця '{table_name}' вже існує")
+            table = Table(table_name, schema, self.storage, self.clock)
+            self.tables[table_name] = table
+            transaction = self.clock.transaction
+            if transaction is not None:
+                transaction.created.add(table_name)
+                transaction.undo.append(lambda: self.tables.pop(table_name))
+            if self.journal:
+                self.journal.log({"op": "create_table", "table": table_name, "schema": schema})
+                self.journal.watch(table)
 
+    @metrics.timed("database.get_table")
     def get_table(self, table_name):
         if table_name not in self.tables:
             raise ValueError(f"Таблиця '{table_name}' не знайдена")
         return self.tables[table_name]
     
+    def query(self, table_name):
+        return self.get_table(table_name).query()
+
+    @metrics.timed("database.import_file")
+    def import_file(self, table_name, filename, format=None, chunk_size=10000, delimiter=',', header=None):
+        table = self.get_table(table_name)
+        format = format or os.path.splitext(filename)[1].lstrip('.').lower()
+        if format in ("ndjson", "jsonl"):
+            reader = read_ndjson
+        elif format == "csv":
+            reader = lambda f, fields: read_csv(f, table.schema, delimiter, header)
+        else:
+            raise ValueError(f"Невідомий формат файлу '{format}'")
+        with open(filename, 'r', encoding='utf-8', newline='') as f:
+            return table.add_rows(reader(f, list(table.schema)), chunk_size)
+
+    @metrics.timed("database.delete_table")
     def delete_table(self, table_name):
-        if table_name not in self.tables:
-            raise ValueError(f"Таблиця '{table_name}' не існує")
-        del self.tables[table_name]
+        with self.clock.writer:
+            if table_name not in self.tables:
+                raise ValueError(f"Таблиця '{table_name}' не існує")
+            table = self.tables.pop(table_name)
+            transaction = self.clock.transaction
+            if transaction is not None:
+                if table_name not in transaction.created:
+                    transaction.deleted.setdefault(table_name, table)
+                transaction.undo.append(lambda: self.tables.__setitem__(table_name, table))
+            if self.journal:
+                self.journal.log({"op": "delete_table", "table": table_name})
 
+    @metrics.timed("database.save_to_file")
     def save_to_file(self, filename):
         data = {
             "name": self.name,
             "tables": {}
         }
-        for table_name, table in self.tables.items():
-            table_data = {
-                "schema": table.schema,
-                "rows": table.rows
-            }
-            data["tables"][table_name] = table_data
+        # Зберігаємо знімок, тож запис у таблиці може тривати паралельно
+        with self.snapshot() as snapshot:
+            for table_name, table in snapshot.tables.items():
+                table_data = {
+                    "schema": table.schema,
+                    "rows": list(table.store.freeze().view()),
+                    "indexes": table.index_kinds()
+                }
+                if table.partitioning:
+                    table_data["partitioning"] = table.partitioning
+                data["tables"][table_name] = table_data
 
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=4)
+        # Стиснений файл пишемо без відступів: вони лише збільшують обсяг роботи кодека
+        compressed = os.path.splitext(filename)[1] in COMPRESSED_OPENERS
+        with open_json(filename, 'w') as f:
+            json.dump(data, f, ensure_ascii=False, indent=None if compressed else 4)
+        metrics.file_size("database.bytes_written", filename)
 
     @staticmethod
-    def load_from_file(filename):
-        with open(filename, 'r', encoding='utf-8') as f:
+    @metrics.timed("database.load_from_file")
+    def load_from_file(filename, storage="rows"):
+        with open_json(filename, 'r') as f:
             data = json.load(f)
+        metrics.file_size("database.bytes_read", filename)
         
-        database = Database(data['name'])
+        database = Database(data['name'], storage)
         for table_name, table_data in data['tables'].items():
-            table = Table(table_name, table_data['schema'])
-            table.rows = table_data['rows']
+            table = Table(table_name, table_data['schema'], storage, database.clock)
+            partitioning = table_data.get('partitioning')
+            if partitioning:
+                table.partition_by(partitioning['field'], partitioning['kind'],
+                                   partitioning.get('count'), partitioning.get('bounds'))
+            rows = table_data['rows']
+            table.rows = intern_strings(table.schema, rows) if storage == "rows" else rows
+            for field_name, kind in table_data.get('indexes', {}).items():
+                table.create_index(field_name, kind)
             database.tables[table_name] = table
         
         return database
 
+    @staticmethod
+    def open(path, storage="rows", **options):
+        return DatabaseStore(path, **options).load(storage)
+
+    def attach(self, path, **options):
+        DatabaseStore(path, **options).checkpoint(self)
+
+    def checkpoint(self):
+        if not self.journal:
+            raise ValueError("База даних не прив'язана до каталогу")
+        self.journal.checkpoint()
+
+    def close(self):
+        if self.journal:
+            self.journal.close()
+        for table in self.tables.values():
+            table.close()
+
+
+class DatabaseSnapshot:
+    def __init__(self, name, tables):
+        self.name = name
+        self.tables = tables
+
+    def get_table(self, table_name):
+        if table_name not in self.tables:
+            raise ValueError(f"Таблиця '{table_name}' не знайдена")
+        return self.tables[table_name]
+
+    def query(self, table_name):
+        return self.get_table(table_name).query()
+
+    def close(self):
+        for table in self.tables.values():
+            table.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.close()
+
+
+def build_query(table, spec):
+    # Опис запиту у вигляді JSON: {"where": [[поле, оператор, значення]], "order_by": [[поле, спадання]], ...}
+    query = table.query()
+    for field_name, op, value in spec.get("where", []):
+        query.where(field_name, op, value)
+    if spec.get("select"):
+        query.select(*spec["select"])
+    for field_name, descending in spec.get("order_by", []):
+        query.order_by(field_name, descending)
+    if spec.get("group_by"):
+        query.group_by(*spec["group_by"])
+    if spec.get("aggregate"):
+        query.aggregate(**{name: tuple(aggregate) for name, aggregate in spec["aggregate"].items()})
+    if spec.get("limit") is not None:
+        query.limit(spec["limit"])
+    return query
+
+
+class DatabaseServer:
+    # Цикл подій лише читає та пише сокети, а запити виконуються в пулі потоків. Операції з однією базою
+    # йдуть по черзі під її замком, а створення й відкриття баз — під спільним замком сервера
+    def __init__(self, directory=".", storage="rows", workers=4):
+        self.directory = directory
+        self.storage = storage
+        self.databases = {}
+        self.server = None
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.lock = threading.RLock()
+        self.locks = {}
+
+    def path(self, name, extension=".db"):
+        # Назва бази від клієнта не може вивести шлях за межі каталогу сервера
+        if not isinstance(name, str) or name in ("", ".", "..") or any(c in name for c in "/\\:\0"):
+            raise ValueError(f"Недопустима назва бази даних '{name}'")
+        return os.path.join(self.directory, name + extension)
+
+    def lock_for(self, name):
+        with self.lock:
+            if name not in self.databases:
+                return self.lock
+            return self.locks.setdefault(name, threading.RLock())
+
+    def database(self, name):
+        if name not in self.databases:
+            raise ValueError(f"База даних '{name}' не відкрита")
+        return self.databases[name]
+
+    def table(self, database, table):
+        return self.database(database).get_table(table)
+
+    def call_ping(self):
+        return "pong"
+
+    def call_list_databases(self):
+        return sorted(self.databases)
+
+    def call_create_database(self, database):
+        if database in self.databases or os.path.exists(self.path(database)):
+            raise ValueError(f"База даних '{database}' вже існує")
+        hosted = Database(database, self.storage)
+        hosted.attach(self.path(database))
+        self.databases[database] = hosted
+
+    def call_open_database(self, database):
+        if database in self.databases:
+            return
+        json_file = self.path(database, ".json")
+        if os.path.isdir(self.path(database)):
+            hosted = Database.open(self.path(database), self.storage)
+        elif os.path.exists(json_file):
+            # Старий JSON-файл переводиться на журнал, щоб зміни клієнтів не губились
+            hosted = Database.load_from_file(json_file, self.storage)
+            hosted.attach(self.path(database))
+        else:
+            raise ValueError(f"База даних '{database}' не знайдена")
+        self.databases[database] = hosted
+
+    def call_checkpoint(self, database):
+        self.database(database).checkpoint()
+
+    def call_tables(self, database):
+        return {name: table.schema for name, table in self.database(database).tables.items()}
+
+    def call_create_table(self, database, table, schema):
+        self.database(database).create_table(table, schema)
+
+    def call_delete_table(self, database, table):
+        self.database(database).delete_table(table)
+
+    def call_schema(self, database, table):
+        return self.table(database, table).schema
+
+    def call_count(self, database, table):
+        return len(self.table(database, table).store)
+
+    def call_rows(self, database, table, start=0, stop=None):
+        return self.table(database, table).rows[start:stop]
+
+    def call_add_row(self, database, table, row):
+        hosted = self.table(database, table)
+        hosted.add_row(hosted.converter.convert(row))
+
+    def call_add_rows(self, database, table, rows):
+        return self.table(database, table).add_rows(rows)
+
+    def call_edit_row(self, database, table, index, row):
+        hosted = self.table(database, table)
+        hosted.edit_row(index, hosted.converter.convert(row))
+
+    def call_search_rows(self, database, table, field, pattern):
+        return self.table(database, table).search_rows(field, pattern)
+
+    def call_range_rows(self, database, table, field, low=None, high=None):
+        return self.table(database, table).range_rows(field, low, high)
+
+    def call_overlap_rows(self, database, table, field, low, high=None):
+        return self.table(database, table).overlap_rows(field, low, high)
+
+    def call_query(self, database, table, query):
+        return build_query(self.table(database, table), query).all()
+
+    def dispatch(self, request):
+        request_id = request.get("id") if isinstance(request, dict) else None
+        try:
+            handler = getattr(self, f"call_{request['method']}", None)
+            if handler is None:
+                raise ValueError(f"Невідомий метод '{request['method']}'")
+            metrics.count("server.requests")
+            params = request.get("params", {})
+            with self.lock_for(params.get("database") if isinstance(params, dict) else None):
+                return {"id": request_id, "result": handler(**params)}
+        except Exception as e:
+            # Будь-яка помилка операції повертається клієнту відповіддю, а з'єднання лишається відкритим
+            metrics.count("server.errors")
+            return {"id": request_id, "error": str(e), "type": type(e).__name__}
+
+    def respond(self, line):
+        # Рядок може містити один запит або пакет запитів у вигляді списку
+        try:
+            request = json.loads(line)
+        except ValueError as e:
+            response = {"id": None, "error": f"Невірний запит: {e}", "type": "ValueError"}
+        else:
+            response = [self.dispatch(item) for item in request] if isinstance(request, list) else self.dispatch(request)
+        return (json.dumps(response, ensure_ascii=False) + "\n").encode('utf-8')
+
+    def respond_lines(self, lines):
+        return b"".join(self.respond(line) for line in lines if line.strip())
+
+    async def handle(self, reader, writer):
+        # Усі повні рядки з прочитаного блоку обробляються разом, а відповіді йдуть одним записом
+        pending = []
+        try:
+            while True:
+                data = await reader.read(1 << 16)
+                if not data:
+                    break
+                pending.append(data)
+                if b"\n" not in data:
+                    continue
+                *lines, rest = b"".join(pending).split(b"\n")
+                pending = [rest]
+                # Пошук чи контрольна точка не зупиняють цикл подій для інших клієнтів;
+                # запити одного з'єднання виконуються по черзі
+                loop = asyncio.get_running_loop()
+                writer.write(await loop.run_in_executor(self.executor, self.respond_lines, lines))
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host="127.0.0.1", port=7878, path=None):
+        if path:
+            self.server = await asyncio.start_unix_server(self.handle, path)
+        else:
+            self.server = await asyncio.start_server(self.handle, host, port)
+        return self.server
+
+    def address(self):
+        return self.server.sockets[0].getsockname()
+
+    async def serve_forever(self, host="127.0.0.1", port=7878, path=None):
+        server = await self.start(host, port, path)
+        async with server:
+            await server.serve_forever()
+
+    def close(self):
+        self.executor.shutdown()
+        with self.lock:
+            for database in self.databases.values():
+                database.close()
+            self.databases = {}
+            self.locks = {}
+
+
+def parse_address(text):
+    # "host:port" для TCP, інакше шлях до Unix-сокета
+    host, _, port = text.rpartition(':')
+    if host and port.isdigit():
+        return host, int(port)
+    return text
+
+
+class RemoteError(ValueError):
+    def __init__(self, message, kind=None):
+        super().__init__(message)
+        self.kind = kind
+
+
+class Connection:
+    def __init__(self, address, timeout=None):
+        if isinstance(address, tuple):
+            self.socket = socket.create_connection(address, timeout)
+            self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        else:
+            self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.socket.settimeout(timeout)
+            self.socket.connect(address)
+        self.reader = self.socket.makefile('rb')
+        self.next_id = 0
+
+    def message(self, method, params):
+        self.next_id += 1
+        return {"id": self.next_id, "method": method, "params": params}
+
+    def receive(self):
+        line = self.reader.readline()
+        if not line:
+            raise ConnectionError("З'єднання з сервером закрито")
+        return json.loads(line)
+
+    def pipeline(self, calls):
+        # Усі запити надсилаються одразу, відповіді читаються по порядку
+        lines = [json.dumps(self.message(method, params), ensure_ascii=False) for method, params in calls]
+        self.socket.sendall(("\n".join(lines) + "\n").encode('utf-8'))
+        return [self.receive() for _ in lines]
+
+    def batch(self, calls):
+        messages = [self.message(method, params) for method, params in calls]
+        self.socket.sendall((json.dumps(messages, ensure_ascii=False) + "\n").encode('utf-8'))
+        return self.receive()
+
+    def close(self):
+        self.reader.close()
+        self.socket.close()
+
+
+class ConnectionPool:
+    def __init__(self, address, size=4, timeout=None):
+        self.address = parse_address(address) if isinstance(address, str) else address
+        self.timeout = timeout
+        self.idle = []
+        self.lock = threading.Lock()
+        self.available = threading.BoundedSemaphore(size)
+
+    @contextlib.contextmanager
+    def connection(self):
+        self.available.acquire()
+        try:
+            with self.lock:
+                connection = self.idle.pop() if self.idle else None
+            if connection is None:
+                connection = Connection(self.address, self.timeout)
+            try:
+                yield connection
+            except BaseException:
+                # Після збою стан потоку невідомий, тож з'єднання не повертається в пул
+                connection.close()
+                raise
+            with self.lock:
+                self.idle.append(connection)
+        finally:
+            self.available.release()
+
+    def close(self):
+        with self.lock:
+            for connection in self.idle:
+                connection.close()
+            self.idle = []
+
+
+def unwrap(response):
+    if "error" in response:
+        raise RemoteError(response["error"], response.get("type"))
+    return response["result"]
+
+
+class DatabaseClient:
+    def __init__(self, address, pool_size=4, timeout=None):
+        self.pool = ConnectionPool(address, pool_size, timeout)
+
+    def call(self, method, **params):
+        with self.pool.connection() as connection:
+            response, = connection.pipeline([(method, params)])
+        return unwrap(response)
+
+    def pipeline(self, calls):
+        # calls: список (метод, параметри)
+        with self.pool.connection() as connection:
+            responses = connection.pipeline(calls)
+        return [unwrap(response) for response in responses]
+
+    def batch(self, calls):
+        with self.pool.connection() as connection:
+            responses = connection.batch(calls)
+        return [unwrap(response) for response in responses]
+
+    def create_database(self, name):
+        self.call("create_database", database=name)
+        return RemoteDatabase(self, name)
+
+    def open_database(self, name):
+        self.call("open_database", database=name)
+        return RemoteDatabase(self, name)
+
+    def close(self):
+        self.pool.close()
+
+
+class RemoteDatabase:
+    # Той самий інтерфейс, що й у Database, для використання в DatabaseApp
+    def __init__(self, client, name):
+        self.client = client
+        self.name = name
+        self.journal = None
+
+    def call(self, method, **params):
+        return self.client.call(method, database=self.name, **params)
+
+    @property
+    def tables(self):
+        return {name: RemoteTable(self, name, schema) for name, schema in self.call("tables").items()}
+
+    def create_table(self, table_name, schema):
+        self.call("create_table", table=table_name, schema=schema)
+
+    def get_table(self, table_name):
+        return RemoteTable(self, table_name, self.call("schema", table=table_name))
+
+    def query(self, table_name):
+        return self.get_table(table_name).query()
+
+    def delete_table(self, table_name):
+        self.call("delete_table", table=table_name)
+
+    def checkpoint(self):
+        self.call("checkpoint")
+
+    def attach(self, path=None):
+        # Сервер уже веде журнал бази у своєму каталозі
+        self.checkpoint()
+
+    def close(self):
+        pass
+
+
+class RemoteRows(Sequence):
+    def __init__(self, table):
+        self.table = table
+        self.count = table.call("count")
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self.count)
+            if step != 1:
+                return [self[i] for i in range(start, stop, step)]
+            return self.table.call("rows", start=start, stop=max(start, stop))
+        if index < 0:
+            index += self.count
+        if index < 0 or index >= self.count:
+            raise IndexError("Невірний індекс рядка")
+        return self.table.call("rows", start=index, stop=index + 1)[0]
+
+
+class RemoteTable:
+    def __init__(self, database, name, schema):
+        self.database = database
+        self.name = name
+        self.schema = schema
+        self.converter = RowConverter(schema)
+
+    def call(self, method, **params):
+        return self.database.call(method, table=self.name, **params)
+
+    @property
+    def rows(self):
+        return RemoteRows(self)
+
+    def get_rows(self):
+        return self.rows
+
+    def get_schema(self):
+        return self.schema
+
+    def field_names(self):
+        return list(self.schema)
+
+    def add_row(self, row_data):
+        self.call("add_row", row=row_data)
+
+    def add_rows(self, rows, chunk_size=10000):
+        added = 0
+        rows = iter(rows)
+        while True:
+            chunk = list(itertools.islice(rows, chunk_size))
+            if not chunk:
+                return added
+            added += self.call("add_rows", rows=chunk)
+
+    def edit_row(self, row_index, new_row_data):
+        self.call("edit_row", index=row_index, row=new_row_data)
+
+    def search_rows(self, field_name, pattern):
+        return self.call("search_rows", field=field_name, pattern=pattern)
+
+    def range_rows(self, field_name, low=None, high=None):
+        return self.call("range_rows", field=field_name, low=low, high=high)
+
+    def overlap_rows(self, field_name, low, high=None):
+        return self.call("overlap_rows", field=field_name, low=low, high=high)
+
+    def iter_search(self, field_name, pattern, progress=None, progress_step=10000):
+        return iter(self.search_rows(field_name, pattern))
+
+    def query(self):
+        return RemoteQuery(self)
+
+
+class RemoteQuery:
+    # Збирає опис запиту для build_query на сервері
+    def __init__(self, table):
+        self.table = table
+        self.spec = {"where": [], "order_by": []}
+
+    def where(self, field_name, op, value):
+        self.spec["where"].append([field_name, op, value])
+        return self
+
+    def select(self, *field_names):
+        self.spec["select"] = list(field_names)
+        return self
+
+    def order_by(self, field_name, descending=False):
+        self.spec["order_by"].append([field_name, descending])
+        return self
+
+    def limit(self, count):
+        self.spec["limit"] = count
+        return self
+
+    def group_by(self, *field_names):
+        self.spec["group_by"] = list(field_names)
+        return self
+
+    def aggregate(self, **aggregates):
+        self.spec.setdefault("aggregate", {}).update({name: list(aggregate) for name, aggregate in aggregates.items()})
+        return self
+
+    def all(self):
+        return self.table.call("query", query=self.spec)
+
+    def __iter__(self):
+        return iter(self.all())
+
+
+class TaskCancelled(Exception):
+    pass
+
+
+class Task:
+    def __init__(self):
+        self.cancelled = False
+        self.progress = None
+
+    def cancel(self):
+        self.cancelled = True
+
+    def report(self, done, total=None):
+        self.progress = (done, total)
+        if self.cancelled:
+            raise TaskCancelled()
+
+
+class TaskRunner:
+    # Виконує операції з базою у пулі потоків; результати повертаються в потік Tk через root.after
+    def __init__(self, root=None, workers=2, poll_interval=50):
+        self.root = root
+        self.poll_interval = poll_interval
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.locks = weakref.WeakKeyDictionary()
+        self.locks_guard = threading.Lock()
+        self.active = []
+        self.polling = False
+
+    def lock_for(self, resource):
+        with self.locks_guard:
+            if resource not in self.locks:
+                self.locks[resource] = threading.RLock()
+            return self.locks[resource]
+
+    def submit(self, work, on_done=None, on_error=None, on_progress=None, exclusive=None):
+        # exclusive: об'єкт (зазвичай Database), записи до якого виконуються по черзі
+        task = Task()
+        lock = self.lock_for(exclusive) if exclusive is not None else None
+
+        def run():
+            with metrics.profiled():
+                if lock is None:
+                    return work(task)
+                with lock:
+                    if task.cancelled:
+                        raise TaskCancelled()
+                    return work(task)
+
+        future = self.executor.submit(run)
+        self.active.append((task, future, on_done, on_error, on_progress, [None]))
+        self.schedule_poll()
+        return task
+
+    def schedule_poll(self):
+        if self.root is not None and not self.polling:
+            self.polling = True
+            self.root.after(self.poll_interval, self.poll)
+
+    def poll(self):
+        self.polling = False
+        active = []
+        for entry in self.active:
+            task, future, on_done, on_error, on_progress, last_progress = entry
+            if on_progress and task.progress != last_progress[0]:
+                last_progress[0] = task.progress
+                on_progress(*task.progress)
+            if not future.done():
+                active.append(entry)
+                continue
+            error = future.exception()
+            if isinstance(error, TaskCancelled):
+                continue
+            if error is not None:
+                if on_error:
+                    on_error(error)
+                continue
+            if on_done:
+                on_done(future.result())
+        self.active = active
+        if self.active:
+            self.schedule_poll()
+
+    def wait(self):
+        # Для консольного використання і тестів: дочекатися завершення та викликати обробники
+        while self.active:
+            for entry in self.active:
+                try:
+                    entry[1].result()
+                except BaseException:
+                    pass
+            self.poll()
+
+    def shutdown(self):
+        for task, *_ in self.active:
+            task.cancel()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+def pattern_window(table, field_name, pattern):
+    # Для дат шаблон "рррр-мм-дд" або "дата - дата" означає часове вікно, а не підрядок
+    return parse_window(pattern) if table.get_schema().get(field_name) in ("date", "dateInvl") else None
+
+def overlaps(interval, low, high):
+    start, end = interval
+    return start <= high and end >= low
+
+def pattern_search(table, field_name, pattern, progress=None):
+    # Номери рядків за шаблоном кнопки «Шукати» і перевірка одного рядка тією ж умовою
+    field_index = table.field_index(field_name)
+    window = pattern_window(table, field_name, pattern)
+    if window is None:
+        return table.search_ids(field_name, pattern, progress), lambda row: pattern in str(row[field_index])
+    low, high = map(date_to_ordinal, window)
+    if table.schema[field_name] == "date":
+        return table.range_ids(field_name, *window), lambda row: low <= date_to_ordinal(row[field_index]) <= high
+    return table.overlap_ids(field_name, *window), lambda row: overlaps(split_interval(row[field_index]), low, high)
+
+# Кеш результатів пошуку: (таблиця, поле, шаблон) -> номери знайдених рядків за ревізією таблиці.
+# Додані й відредаговані рядки перевіряються умовою пошуку і латають готові результати,
+# тож повторний пошук після запису не сканує таблицю знову
+class ResultCache:
+    def __init__(self, capacity=1_000_000, max_entries=64):
+        # capacity — загальна кількість збережених номерів рядків
+        self.capacity = capacity
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        # ключ -> [відсортовані номери рядків, ревізія таблиці, умова для рядка] у порядку використання
+        self.entries = OrderedDict()
+        self.used = 0
+        self.hits = 0
+        self.misses = 0
+        self.updates = 0
+        self.evictions = 0
+
+    def lookup(self, table, field_name, pattern, progress=None):
+        key = (table, field_name, pattern)
+        with self.lock:
+            entry = self.entries.get(key)
+            hit = entry is not None and entry[1] == table.revision
+            if hit:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                row_ids = array('q', entry[0])
+            else:
+                self.misses += 1
+        metrics.count("result_cache.hits" if hit else "result_cache.misses")
+        if hit:
+            return row_ids
+        # Запис під час пошуку змінить ревізію, і такий результат не буде використано повторно
+        revision = table.revision
+        found, test = pattern_search(table, field_name, pattern, progress)
+        row_ids = array('q', sorted(found))
+        if self.on_table_change not in table.listeners:
+            table.listeners.append(self.on_table_change)
+        with self.lock:
+            previous = self.entries.pop(key, None)
+            if previous is not None:
+                self.used -= len(previous[0])
+            if len(row_ids) <= self.capacity:
+                self.entries[key] = [array('q', row_ids), revision, test]
+                self.used += len(row_ids)
+                self.evict()
+        return row_ids
+
+    def on_table_change(self, table, op, *args):
+        # Викликається записувачем після зміни; записи попередньої ревізії оновлюються на місці,
+        # решта лишається застарілою до наступного пошуку. Повторне застосування зміни нічого не змінює
+        if op not in ("add_row", "add_rows", "edit_row"):
+            return
+        start, rows = (args[0], args[1]) if op == "add_rows" else (args[0], [args[1]])
+        with self.lock:
+            for key, entry in self.entries.items():
+                row_ids, revision, test = entry
+                if key[0] is not table or revision != table.revision - 1:
+                    continue
+                if op == "edit_row":
+                    position = bisect.bisect_left(row_ids, start)
+                    found = position < len(row_ids) and row_ids[position] == start
+                    if test(rows[0]) != found:
+                        if found:
+                            del row_ids[position]
+                            self.used -= 1
+                        else:
+                            row_ids.insert(position, start)
+                            self.used += 1
+                else:
+                    last = row_ids[-1] if row_ids else -1
+                    added = [row_id for row_id, row in enumerate(rows, start) if row_id > last and test(row)]
+                    row_ids.extend(added)
+                    self.used += len(added)
+                entry[1] = table.revision
+                self.updates += 1
+            self.evict()
+
+    def evict(self):
+        # Викликається під lock
+        while self.entries and (self.used > self.capacity or len(self.entries) > self.max_entries):
+            key, entry = self.entries.popitem(last=False)
+            self.used -= len(entry[0])
+            self.evictions += 1
+            metrics.count("result_cache.evictions")
+
+    def clear(self):
+        with self.lock:
+            self.entries = OrderedDict()
+            self.used = 0
+
+    def stats(self):
+        with self.lock:
+            requests = self.hits + self.misses
+            return {
+                "capacity": self.capacity,
+                "used": self.used,
+                "entries": len(self.entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "updates": self.updates,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / requests if requests else 0.0,
+            }
+
+
+class ResultRows(Sequence):
+    # Рядки результату пошуку за номерами; значення читаються з таблиці під час показу
+    def __init__(self, table, row_ids):
+        self.table = table
+        self.row_ids = row_ids
+
+    def __len__(self):
+        return len(self.row_ids)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.table.store.get(i) for i in self.row_ids[index]]
+        return self.table.store.get(self.row_ids[index])
+
+
+class RowPager:
+    # Видає вікна рядків з послідовності або ітератора; ітератор читається лише до кінця запитаного вікна
+    def __init__(self, rows, page_size=200):
+        self.page_size = page_size
+        if isinstance(rows, Sequence):
+            self.rows = rows
+            self.iterator = None
+        else:
+            self.rows = []
+            self.iterator = iter(rows)
+
+    def fetch(self, start, count):
+        while self.iterator is not None and len(self.rows) < start + count:
+            chunk = list(itertools.islice(self.iterator, start + count - len(self.rows)))
+            self.rows.extend(chunk)
+            if not chunk:
+                self.iterator = None
+        return self.rows[start:start + count]
+
+    @property
+    def total(self):
+        # Для ітератора відома лише прочитана частина; ще одна сторінка лишає місце для прокрутки далі
+        if self.iterator is None:
+            return len(self.rows)
+        return len(self.rows) + self.page_size
+
+
 class DatabaseApp:
     def __init__(self, root):
         self.root = root
@@ -148,8 +4214,20 @@ class DatabaseApp:
         self.edit_row_button.grid(row=11, column=1)
         
         # Поле для перегляду рядків таблиці
-        self.table_view = tk.Text(main_frame, height=10, width=100)
-        self.table_view.grid(row=5, column=0, columnspan=3, sticky=(tk.W, tk.E))
+        view_frame = ttk.Frame(main_frame)
+        view_frame.grid(row=5, column=0, columnspan=3, sticky=(tk.W, tk.E))
+        view_frame.columnconfigure(0, weight=1)
+        self.view_rows = 10
+        self.table_view = ttk.Treeview(view_frame, show="headings", height=self.view_rows)
+        self.table_view.grid(row=0, column=0, sticky=(tk.W, tk.E))
+        # Віртуальна прокрутка: у таблиці лише видимі рядки, а смуга прокрутки відповідає всім рядкам результату
+        self.view_scrollbar = ttk.Scrollbar(view_frame, orient=tk.VERTICAL, command=self.on_scrollbar)
+        self.view_scrollbar.grid(row=0, column=1, sticky=(tk.N, tk.S))
+        self.table_view.bind("<MouseWheel>", lambda event: self.scroll_view(-3 if event.delta > 0 else 3))
+        self.table_view.bind("<Button-4>", lambda event: self.scroll_view(-3))
+        self.table_view.bind("<Button-5>", lambda event: self.scroll_view(3))
+        self.pager = None
+        self.view_start = 0
         
         # Поле для пошуку за шаблоном
         ttk.Label(main_frame, text="Поле пошуку:").grid(row=6, column=0, sticky=tk.W)
@@ -172,12 +4250,92 @@ class DatabaseApp:
         self.save_button = ttk.Button(main_frame, text="Зберегти базу", command=self.save_database)
         self.save_button.grid(row=9, column=0, columnspan=3)
 
+        # Кнопка скасування пошуку
+        self.cancel_button = ttk.Button(main_frame, text="Скасувати", command=self.cancel_search)
+        self.cancel_button.grid(row=8, column=2, sticky=tk.W)
+
+        # Рядок стану фонових операцій
+        self.status_label = ttk.Label(main_frame, text="")
+        self.status_label.grid(row=12, column=0, columnspan=3, sticky=tk.W)
+
+        # Довгі операції виконуються у фоні, щоб вікно не зависало
+        self.runner = TaskRunner(self.root)
+        self.search_task = None
+        self.root.protocol("WM_DELETE_WINDOW", self.close)
+        # Повторний пошук за тим самим шаблоном береться з кешу; показаний результат без змін не перемальовується
+        self.results = ResultCache()
+        self.shown = None
+
+        # Метрики вмикаються змінною оточення LAB1_METRICS=<файл>: F12 записує лічильники,
+        # F11 вмикає і вимикає профілювання (<файл>.prof), F10 записує знімок пам'яті (<файл>.tracemalloc)
+        self.metrics_file = os.environ.get("LAB1_METRICS")
+        if self.metrics_file:
+            metrics.enable(trace_memory=True)
+            self.root.bind("<F12>", lambda event: self.dump_metrics())
+            self.root.bind("<F11>", lambda event: self.toggle_profiling())
+            self.root.bind("<F10>", lambda event: self.dump_memory())
+
+        # LAB1_CACHE_MB обмежує пам'ять під сторінки сегментів відкритих баз
+        cache_mb = os.environ.get("LAB1_CACHE_MB")
+        if cache_mb:
+            page_cache.resize(int(cache_mb) * 1024 * 1024)
+
+        # LAB1_SERVER=host:port або шлях до сокета: бази зберігаються на спільному сервері
+        server = os.environ.get("LAB1_SERVER")
+        self.client = DatabaseClient(server) if server else None
+
+    def dump_metrics(self):
+        metrics.dump(self.metrics_file)
+        self.set_status(f"Метрики записано у {self.metrics_file}")
+
+    def toggle_profiling(self):
+        filename = os.path.splitext(self.metrics_file)[0] + ".prof"
+        if metrics.profiling:
+            metrics.stop_profiling(filename)
+            self.set_status(f"Профіль записано у {filename}")
+        else:
+            metrics.start_profiling()
+            self.set_status("Профілювання ввімкнено, F11 — зупинити й записати")
+
+    def dump_memory(self):
+        filename = os.path.splitext(self.metrics_file)[0] + ".tracemalloc"
+        top = metrics.memory_snapshot(filename, limit=1)
+        self.set_status(f"Знімок пам'яті записано у {filename}" + (f"; найбільше: {top[0]}" if top else ""))
+
+    def close(self):
+        self.runner.shutdown()
+        if self.client:
+            self.client.close()
+        if self.metrics_file:
+            if metrics.profiling:
+                metrics.stop_profiling(os.path.splitext(self.metrics_file)[0] + ".prof")
+            metrics.dump(self.metrics_file)
+        self.root.destroy()
+
+    def set_status(self, text):
+        self.status_label.configure(text=text)
+
+    def show_task_error(self, error):
+        self.set_status("")
+        messagebox.showerror("Помилка", str(error))
+
+    def run_task(self, work, on_done=None, on_error=None, on_progress=None, exclusive=None):
+        return self.runner.submit(work, on_done, on_error or self.show_task_error, on_progress, exclusive)
+
     def create_database(self):
         db_name = self.db_name_entry.get()
         if not db_name:
             messagebox.showerror("Помилка", "Введіть назву бази даних")
             return
-        self.database = Database(db_name)
+        if self.client:
+            try:
+                self.database = self.client.create_database(db_name)
+            except (ValueError, OSError) as e:
+                messagebox.showerror("Помилка", str(e))
+                return
+        else:
+            self.database = Database(db_name)
+        self.results.clear()
         messagebox.showinfo("Успіх", f"База даних '{db_name}' створена")
 
     def load_database(self):
@@ -186,11 +4344,30 @@ class DatabaseApp:
             messagebox.showerror("Помилка", "Введіть назву бази для завантаження")
             return
         filename = f"{db_name}.json"
-        try:
-            self.database = Database.load_from_file(filename)
+
+        def load(task):
+            if self.client:
+                return self.client.open_database(db_name)
+            # Каталог з журналом має перевагу над старим JSON-файлом
+            if os.path.isdir(f"{db_name}.db"):
+                return Database.open(f"{db_name}.db")
+            return Database.load_from_file(filename)
+
+        def done(database):
+            self.database = database
+            self.results.clear()
+            self.set_status("")
             messagebox.showinfo("Успіх", f"База даних '{db_name}' завантажена")
-        except FileNotFoundError:
-            messagebox.showerror("Помилка", f"Файл '{filename}' не знайдено")
+
+        def failed(error):
+            if isinstance(error, FileNotFoundError):
+                self.set_status("")
+                messagebox.showerror("Помилка", f"Файл '{filename}' не знайдено")
+            else:
+                self.show_task_error(error)
+
+        self.set_status(f"Завантаження '{db_name}'...")
+        self.run_task(load, done, failed)
 
     def add_fields(self):
         try:
@@ -241,14 +4418,12 @@ class DatabaseApp:
                 return
             schema[field_name] = field_type
 
-        try:
-            self.database.create_table(table_name, schema)
-            messagebox.showinfo("Успіх", f"Таблиця '{table_name}' створена")
-        except ValueError as e:
-            messagebox.showerror("Помилка", str(e))
+        database = self.database
+        self.run_task(lambda task: database.create_table(table_name, schema),
+                      lambda result: messagebox.showinfo("Успіх", f"Таблиця '{table_name}' створена"),
+                      exclusive=database)
 
     def add_row(self):
-        helper = False
         if not self.database:
             messagebox.showerror("Помилка", "Спочатку створіть або завантажте базу даних")
             return
@@ -268,44 +4443,15 @@ class DatabaseApp:
             return
         
         # Приведення типів
-        for i, (key, field_type) in enumerate(table.schema.items()):
-            if field_type == "integer":
-                try:
-                    row_data[i] = int(row_data[i])
-                except ValueError as e:
-                    helper = True
-                    messagebox.showerror("Помилка", "Невірний формат")
-            elif field_type == "real":
-                try:
-                    row_data[i] = float(row_data[i])
-                except ValueError as e:
-                    helper = True
-                    messagebox.showerror("Помилка", "Невірний формат")
-            elif field_type == "date":
-                try:
-                    date = f"{datetime.strptime(row_data[i], "%Y-%m-%d").date()}"
-                    row_data[i] = date
-                    #row_data[i] = datetime.strptime(row_data[i], "%Y-%m-%d").date()
-                except ValueError as e:
-                    helper = True
-                    messagebox.showerror("Помилка", "Невірний формат")
-            elif field_type == "dateInvl":
-                try:
-                    start_date, end_date = row_data[i].split(' - ')
-                    date_row = f"{datetime.strptime(start_date, "%Y-%m-%d").date()} - {datetime.strptime(end_date, "%Y-%m-%d").date()}"
-                    row_data[i] = date_row
-                    #row_data[i] = (datetime.strptime(start_date, "%Y-%m-%d").date(), datetime.strptime(end_date, "%Y-%m-%d").date())
-                    print(row_data[i])
-                except ValueError as e:
-                    helper = True
-                    messagebox.showerror("Помилка", "Невірний формат")       
-
         try:
-            if not helper:
-                table.add_row(row_data)
-                messagebox.showinfo("Успіх", "Рядок додано")
-        except ValueError as e:
-            messagebox.showerror("Помилка", str(e))
+            row_data = table.converter.convert(row_data)
+        except RowFormatError:
+            messagebox.showerror("Помилка", "Невірний формат")
+            return
+
+        self.run_task(lambda task: table.add_row(row_data),
+                      lambda result: messagebox.showinfo("Успіх", "Рядок додано"),
+                      exclusive=self.database)
 
     def show_rows(self):
         if not self.database:
@@ -317,15 +4463,10 @@ class DatabaseApp:
             return
         
         table = self.database.get_table(table_name)
-        rows = table.get_rows()
-        schema = table.get_schema()
-        print(schema)
-        self.table_view.delete(1.0, tk.END)
-        self.table_view.insert(tk.END, f"{schema}\n")
-        i = 0
-        for row in rows:
-            self.table_view.insert(tk.END, f"{i}. {row}\n")
-            i += 1
+        # Перше звернення може відкривати сегмент і будувати індекси
+        key = (table, None, None, table.revision) if isinstance(table, Table) else None
+        self.run_task(lambda task: table.get_rows(),
+                      lambda rows: self.show_result(table.get_schema(), rows, key))
 
     def search(self):
         if not self.database:
@@ -339,22 +4480,114 @@ class DatabaseApp:
             return
 
         table = self.database.get_table(table_name)
-        matched_rows = table.search_rows(field_name, pattern)
-        schema = table.get_schema()
-        self.table_view.delete(1.0, tk.END)
-        self.table_view.insert(tk.END, f"{schema}\n")
-        i = 0
-        for row in matched_rows:
-            self.table_view.insert(tk.END, f"{i}. {row}\n")
-            i+=1
+        self.cancel_search()
+
+        # Ревізія до пошуку: якщо таблиця не змінилась, показаний результат лишається на місці
+        key = (table, field_name, pattern, table.revision) if isinstance(table, Table) else None
+
+        def run(task):
+            if key:
+                return ResultRows(table, self.results.lookup(table, field_name, pattern, task.report))
+            window = pattern_window(table, field_name, pattern)
+            if window and table.get_schema()[field_name] == "date":
+                return table.range_rows(field_name, *window)
+            if window:
+                return table.overlap_rows(field_name, *window)
+            return list(table.iter_search(field_name, pattern, progress=task.report))
+
+        def done(rows):
+            status = f"Знайдено рядків: {len(rows)}"
+            if key:
+                stats = self.results.stats()
+                status += f" (кеш: {stats['hits']} з {stats['hits'] + stats['misses']} пошуків, {stats['hit_rate']:.0%})"
+            self.set_status(status)
+            self.show_result(table.get_schema(), rows, key)
+
+        def progress(scanned, total):
+            self.set_status(f"Пошук... переглянуто {scanned} з {total}")
+
+        self.set_status("Пошук...")
+        self.search_task = self.run_task(run, done, on_progress=progress)
+
+    def cancel_search(self):
+        if self.search_task:
+            self.search_task.cancel()
+            self.search_task = None
+            self.set_status("")
+
+    @metrics.timed("gui.show_result")
+    def show_result(self, schema, rows, key=None):
+        if key is not None and key == self.shown:
+            return
+        self.shown = key
+        columns = ["#"] + list(schema)
+        self.table_view.delete(*self.table_view.get_children())
+        self.table_view["columns"] = columns
+        self.table_view.heading("#", text="#")
+        self.table_view.column("#", width=60, stretch=False)
+        for field_name, field_type in schema.items():
+            self.table_view.heading(field_name, text=f"{field_name} ({field_type})")
+        self.pager = RowPager(rows)
+        self.view_start = 0
+        self.render_view()
+
+    @metrics.timed("gui.render_page")
+    def render_view(self):
+        # Наявні елементи таблиці отримують нові значення, тож їх кількість не більша за view_rows
+        start = self.view_start
+        rows = self.pager.fetch(start, self.view_rows)
+        items = self.table_view.get_children()
+        for i, row in enumerate(rows):
+            values = [start + i] + [str(value) for value in row]
+            if i < len(items):
+                self.table_view.item(items[i], values=values)
+            else:
+                self.table_view.insert("", tk.END, values=values)
+        if len(items) > len(rows):
+            self.table_view.delete(*items[len(rows):])
+        total = max(self.pager.total, 1)
+        self.view_scrollbar.set(start / total, min(1.0, (start + self.view_rows) / total))
+
+    def scroll_view(self, delta):
+        self.scroll_to(self.view_start + delta)
+
+    def scroll_to(self, start):
+        if not self.pager:
+            return
+        # Ітератор дочитується до потрібного місця, після чого межа прокрутки вже відома точніше
+        self.pager.fetch(start, self.view_rows)
+        start = max(0, min(start, self.pager.total - self.view_rows))
+        if start != self.view_start:
+            self.view_start = start
+            self.render_view()
+
+    def on_scrollbar(self, action, amount, unit=None):
+        if not self.pager:
+            return
+        if action == "moveto":
+            self.scroll_to(int(float(amount) * self.pager.total))
+        else:
+            self.scroll_view(int(amount) * (self.view_rows if unit == "pages" else 1))
 
     def save_database(self):
         if not self.database:
             messagebox.showerror("Помилка", "Спочатку створіть базу даних")
             return
-        filename = f"{self.database.name}.json"
-        self.database.save_to_file(filename)
-        messagebox.showinfo("Успіх", f"База даних збережена у файл '{filename}'")
+        database = self.database
+        filename = f"{database.name}.db"
+
+        def save(task):
+            if database.journal:
+                database.checkpoint()
+            else:
+                database.attach(filename)
+
+        def done(result):
+            self.set_status("")
+            messagebox.showinfo("Успіх", f"База даних збережена у каталог '{filename}'")
+
+        self.set_status("Збереження...")
+        self.run_task(save, done, exclusive=database)
 
     def edit_row(self):
         if not self.database:
@@ -377,31 +4610,20 @@ class DatabaseApp:
                     return
                 
                 # Приведення типів
-                for i, (key, field_type) in enumerate(table.schema.items()):
-                    if field_type == "integer":
-                        new_data[i] = int(new_data[i])
-                    elif field_type == "real":
-                        new_data[i] = float(new_data[i])
-                    elif field_type == "date":
-                        date = f"{datetime.strptime(new_data[i], "%Y-%m-%d").date()}"
-                        new_data[i] = date
-                        #row_data[i] = datetime.strptime(row_data[i], "%Y-%m-%d").date()
-                    elif field_type == "dateInvl":
-                        start_date, end_date = new_data[i].split(' - ')
-                        date_row = f"{datetime.strptime(start_date, "%Y-%m-%d").date()} - {datetime.strptime(end_date, "%Y-%m-%d").date()}"
-                        new_data[i] = date_row
-                        #row_data[i] = (datetime.strptime(start_date, "%Y-%m-%d").date(), datetime.strptime(end_date, "%Y-%m-%d").date())
-                        #print(row_data[i])
+                new_data = table.converter.convert(new_data)
 
-                # Оновлюємо рядок
-                table.edit_row(row_index, new_data)
-                self.show_rows()
+                def done(result):
+                    self.show_rows()
+                    self.row_entry.delete(0, tk.END)
+                    self.row_index_entry.delete(0, tk.END)
+                    messagebox.showinfo("Успіх", f"Рядок {row_index} відредаговано")
 
-                self.row_entry.delete(0, tk.END)
-                self.row_index_entry.delete(0, tk.END)
-                messagebox.showinfo("Успіх", f"Рядок {row_index} відредаговано")
+                # Оновлюємо рядок
+                self.run_task(lambda task: table.edit_row(row_index, new_data), done, exclusive=self.database)
             else:
                 messagebox.showerror("Помилка", "Неправильний індекс рядка")
+        except RowFormatError:
+            messagebox.showerror("Помилка", "Невірний формат")
         except ValueError:
             messagebox.showerror("Помилка", "Будь ласка, введіть коректний індекс")
     def delete_table(self):
@@ -414,14 +4636,112 @@ class DatabaseApp:
             messagebox.showerror("Помилка", "Введіть назву таблиці для видалення")
             return
 
-        try:
-            self.database.delete_table(table_name)
-            messagebox.showinfo("Успіх", f"Таблиця '{table_name}' видалена")
-        except ValueError as e:
-            messagebox.showerror("Помилка", str(e))
+        database = self.database
+        self.run_task(lambda task: database.delete_table(table_name),
+                      lambda result: messagebox.showinfo("Успіх", f"Таблиця '{table_name}' видалена"),
+                      exclusive=database)
+
+
+def parse_schema(text):
+    schema = {}
+    for field in text.split(','):
+        field_name, field_type = field.split(':')
+        schema[field_name.strip()] = field_type.strip()
+    return schema
+
+def open_database(path):
+    if path.endswith(JSON_EXTENSIONS):
+        return Database.load_from_file(path)
+    if os.path.isdir(path):
+        return Database.open(path)
+    database = Database(os.path.splitext(os.path.basename(path))[0])
+    database.attach(path)
+    return database
+
+def save_database(database, path):
+    if database.journal:
+        database.checkpoint()
+        database.close()
+    else:
+        database.save_to_file(path)
+
+def serve_command(args):
+    server = DatabaseServer(args.directory, args.storage)
+    address = args.socket or f"{args.host}:{args.port}"
+    print(f"Сервер слухає {address}", file=sys.stderr)
+    try:
+        asyncio.run(server.serve_forever(args.host, args.port, args.socket))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+
+def import_command(args):
+    database = open_database(args.database)
+    if args.schema and args.table not in database.tables:
+        database.create_table(args.table, parse_schema(args.schema))
+    started = time.perf_counter()
+    count = database.import_file(args.table, args.file, args.format, args.chunk_size, args.delimiter, args.header)
+    elapsed = time.perf_counter() - started
+    save_database(database, args.database)
+    print(f"Імпортовано {count} рядків за {elapsed:.2f} с ({count / max(elapsed, 1e-9):.0f} рядків/с)")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Система управління табличною базою даних")
+    parser.add_argument("--metrics", help="записати лічильники у файл (.json або .prom)")
+    parser.add_argument("--profile", help="записати профіль cProfile у файл")
+    parser.add_argument("--memory", help="записати знімок tracemalloc у файл")
+    parser.add_argument("--cache-mb", type=int, help="бюджет пам'яті кешу сторінок сегментів, МБ")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    importer = commands.add_parser("import", help="завантажити рядки з CSV або NDJSON")
+    importer.add_argument("database", help="каталог бази (.db) або JSON-файл")
+    importer.add_argument("table")
+    importer.add_argument("file")
+    importer.add_argument("--format", choices=["csv", "ndjson"])
+    importer.add_argument("--schema", help="створити таблицю, наприклад id:integer,name:string")
+    importer.add_argument("--delimiter", default=',')
+    importer.add_argument("--header", action=argparse.BooleanOptionalAction,
+                          help="перший рядок CSV є заголовком (типово визначається за вмістом)")
+    importer.add_argument("--chunk-size", type=int, default=10000)
+    importer.set_defaults(handler=import_command)
+
+    serve = commands.add_parser("serve", help="запустити сервер баз даних для кількох користувачів")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=7878)
+    serve.add_argument("--socket", help="слухати Unix-сокет замість TCP")
+    serve.add_argument("--directory", default=".", help="каталог з базами")
+    serve.add_argument("--storage", default="rows", choices=list(STORAGE_TYPES))
+    serve.set_defaults(handler=serve_command)
+
+    args = parser.parse_args(argv)
+    if args.cache_mb is not None:
+        page_cache.resize(args.cache_mb * 1024 * 1024)
+    if args.metrics:
+        metrics.enable()
+    if args.memory:
+        metrics.start_tracing()
+    try:
+        if args.profile:
+            with metrics.profile(args.profile):
+                args.handler(args)
+        else:
+            args.handler(args)
+    except (ValueError, OSError) as e:
+        print(f"Помилка: {e}", file=sys.stderr)
+        return 1
+    finally:
+        if args.metrics:
+            metrics.dump(args.metrics)
+        if args.memory:
+            metrics.memory_snapshot(args.memory)
+            metrics.stop_tracing()
+    return 0
 
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        sys.exit(main())
     root = tk.Tk()
     app = DatabaseApp(root)
     root.mainloop()
@@ -0,0 +1,242 @@
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date
+
+try:
+    import resource
+except ImportError:
+    # Windows: модуля resource немає, пікова пам'ять рахується через tracemalloc
+    resource = None
+
+from Lab1 import Database
+
+# Схема з усіма шістьма типами полів, у формі таблиць Base1.json
+SCHEMA = {
+    "id": "integer",
+    "salary": "real",
+    "name": "string",
+    "grade": "char",
+    "worked": "date",
+    "period": "dateInvl",
+}
+NAMES = ["John", "Test", " Doe", "Ann", "Bob", "Eve", "Olena", "Taras"]
+FIRST_DAY = date(1970, 1, 1).toordinal()
+SIZES = {"10k": 10_000, "1M": 1_000_000, "10M": 10_000_000}
+
+
+def make_row(i, rng):
+    start = FIRST_DAY + rng.randrange(20000)
+    return [
+        i,
+        round(rng.uniform(5, 500), 2),
+        rng.choice(NAMES),
+        rng.choice("ABCDEF"),
+        date.fromordinal(FIRST_DAY + rng.randrange(20000)).isoformat(),
+        f"{date.fromordinal(start).isoformat()} - {date.fromordinal(start + rng.randrange(1, 3650)).isoformat()}",
+    ]
+
+def generate_rows(count, seed=1):
+    rng = random.Random(seed)
+    for i in range(count):
+        yield make_row(i, rng)
+
+def generate_database(count, storage="rows", seed=1):
+    database = Database("Bench", storage)
+    database.create_table("Table1", SCHEMA)
+    database.get_table("Table1").add_rows(generate_rows(count, seed), chunk_size=100_000)
+    return database
+
+def write_json(filename, count, seed=1):
+    # Потоковий запис у форматі Base1.json без побудови всієї бази в пам'яті
+    with open(filename, 'w', encoding='utf-8') as f:
+        f.write('{"name": "Bench", "tables": {"Table1": {"schema": ')
+        json.dump(SCHEMA, f)
+        f.write(', "rows": [')
+        for i, row in enumerate(generate_rows(count, seed)):
+            if i:
+                f.write(', ')
+            json.dump(row, f, ensure_ascii=False)
+        f.write(']}}}')
+
+
+def timed(action):
+    started = time.perf_counter()
+    action()
+    return time.perf_counter() - started
+
+def peak_rss_kb():
+    if resource is None:
+        # Лише пам'ять об'єктів Python від запуску трасування, без самого інтерпретатора
+        return tracemalloc.get_traced_memory()[1] // 1024
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS повертає байти, Linux — кілобайти
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+def run_benchmark(count, storage="rows", ops=10_000, seed=1):
+    rng = random.Random(seed + 1)
+    timings = {}
+    with tempfile.TemporaryDirectory() as directory:
+        json_file = os.path.join(directory, "Bench.json")
+        timings["generate"] = timed(lambda: write_json(json_file, count, seed))
+        database = None
+
+        def load():
+            nonlocal database
+            database = Database.load_from_file(json_file, storage)
+        timings["load_from_file"] = timed(load)
+        table = database.get_table("Table1")
+
+        extra = [make_row(count + i, rng) for i in range(ops)]
+        timings["add_row"] = timed(lambda: [table.add_row(row) for row in extra])
+        edits = [(rng.randrange(count), make_row(i, rng)) for i in range(ops)]
+        timings["edit_row"] = timed(lambda: [table.edit_row(index, row) for index, row in edits])
+        timings["search_rows"] = timed(lambda: [table.search_rows(field_name, pattern) for field_name, pattern in
+                                                (("name", "oh"), ("worked", "-12-"), ("period", "1999"), ("id", "77"))])
+        timings["save_to_file"] = timed(lambda: database.save_to_file(json_file))
+        path = os.path.join(directory, "Bench.db")
+        timings["checkpoint"] = timed(lambda: database.attach(path))
+        database.close()
+
+        def reopen():
+            reopened = Database.open(path, storage)
+            reopened.get_table("Table1").rows[count // 2]
+            reopened.close()
+        timings["open"] = timed(reopen)
+    return {
+        "rows": count,
+        "storage": storage,
+        "ops": ops,
+        "timings": timings,
+        "peak_rss_kb": peak_rss_kb(),
+    }
+
+def run_parallel_benchmark(count, storage="columnar", workers=None, repeat=5, seed=1):
+    # Пошук по одній таблиці послідовно і процесами. Перший паралельний пошук кодує колонку
+    # у спільну пам'ять, наступні беруть її з кешу — саме вони показують виграш від процесів
+    workers = workers or os.cpu_count() or 1
+    database = generate_database(count, storage, seed)
+    table = database.get_table("Table1")
+    searches = (("worked", "-12-"), ("id", "77"))
+
+    def search_all():
+        for field_name, pattern in searches:
+            table.search_rows(field_name, pattern)
+    timings = {}
+    table.parallel_workers = 1
+    timings["search_serial"] = min(timed(search_all) for i in range(repeat))
+    table.parallel_workers = workers
+    table.parallel_threshold = 0
+    timings["search_parallel_first"] = timed(search_all)
+    timings["search_parallel"] = min(timed(search_all) for i in range(repeat))
+    database.close()
+    return {
+        "rows": count,
+        "storage": storage,
+        "workers": workers,
+        "timings": timings,
+        "speedup": timings["search_serial"] / timings["search_parallel"],
+    }
+
+
+# Абсолютний запас, щоб шум на дуже коротких вимірах не вважався регресією
+MIN_DELTA = {"peak_rss_kb": 1024}
+MIN_SECONDS = 0.005
+
+def compare_results(results, baseline, tolerance=0.25):
+    # Повертає список регресій: (розмір, сховище, метрика, базове значення, нове значення)
+    previous = {(entry["rows"], entry["storage"]): entry for entry in baseline["results"]}
+    regressions = []
+    for entry in results["results"]:
+        old = previous.get((entry["rows"], entry["storage"]))
+        if old is None:
+            continue
+        metrics = dict(entry["timings"], peak_rss_kb=entry["peak_rss_kb"])
+        old_metrics = dict(old["timings"], peak_rss_kb=old["peak_rss_kb"])
+        for name, value in metrics.items():
+            if name not in old_metrics:
+                continue
+            old_value = old_metrics[name]
+            if value > old_value * (1 + tolerance) and value - old_value > MIN_DELTA.get(name, MIN_SECONDS):
+                regressions.append((entry["rows"], entry["storage"], name, old_value, value))
+    return regressions
+
+def parse_size(text):
+    if text in SIZES:
+        return SIZES[text]
+    return int(text)
+
+def run_isolated(count, storage, ops, seed):
+    # Кожен розмір у власному процесі, щоб пікова пам'ять не накопичувалась
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--single", str(count), "--storage", storage,
+         "--ops", str(ops), "--seed", str(seed)],
+        check=True, capture_output=True, text=True).stdout
+    return json.loads(output)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Бенчмарки Database/Table без графічного інтерфейсу")
+    parser.add_argument("--sizes", default="10k", help="розміри через кому: 10k,1M,10M або числа")
+    parser.add_argument("--storage", default="rows,columnar", help="типи сховища через кому")
+    parser.add_argument("--ops", type=int, default=10_000, help="кількість add_row/edit_row на розмір")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="файл для результатів у JSON")
+    parser.add_argument("--baseline", help="порівняти з попередніми результатами")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="допустиме погіршення, частка")
+    parser.add_argument("--parallel", type=int, metavar="WORKERS",
+                        help="порівняти послідовний і паралельний пошук на WORKERS процесах")
+    parser.add_argument("--single", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.parallel is not None:
+        for size in args.sizes.split(','):
+            for storage in args.storage.split(','):
+                entry = run_parallel_benchmark(parse_size(size), storage, args.parallel, seed=args.seed)
+                print(json.dumps(entry))
+                print(f"{entry['rows']} рядків, {storage}, {entry['workers']} процесів: "
+                      f"прискорення {entry['speedup']:.2f}x", file=sys.stderr)
+        return 0
+
+    if args.single is not None:
+        if resource is None:
+            tracemalloc.start()
+        print(json.dumps(run_benchmark(args.single, args.storage, args.ops, args.seed)))
+        return 0
+
+    results = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": [],
+    }
+    for size in args.sizes.split(','):
+        for storage in args.storage.split(','):
+            entry = run_isolated(parse_size(size), storage, min(args.ops, parse_size(size)), args.seed)
+            results["results"].append(entry)
+            timings = ", ".join(f"{name} {seconds:.3f} с" for name, seconds in entry["timings"].items())
+            print(f"{entry['rows']} рядків, {storage}: {timings}, пам'ять {entry['peak_rss_kb']} КБ", file=sys.stderr)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=4)
+    else:
+        print(json.dumps(results, indent=4))
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            regressions = compare_results(results, json.load(f), args.tolerance)
+        for rows, storage, name, old, new in regressions:
+            print(f"Регресія: {rows} рядків, {storage}, {name}: {old:.3f} -> {new:.3f}", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
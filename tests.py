@@ -1,8 +1,21 @@
+import asyncio
+import json
+import os
+import pstats
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
 import unittest
+import weakref
 from unittest.mock import patch, MagicMock
 from tkinter import Tk
-from Lab1 import DatabaseApp, Database, Table  
+from Lab1 import (DatabaseApp, Database, Table, RowFormatError, RowPager, TaskRunner, main, metrics, page_cache,
+                  DatabaseServer, DatabaseClient, RemoteError, ResultCache,
+                  SharedColumns, PartitionedStore)
 from tkinter import messagebox  
+import benchmarks
 
 class TestDatabaseApp(unittest.TestCase):
     
@@ -45,5 +58,974 @@ class TestDatabaseApp(unittest.TestCase):
         
         mock_showerror.assert_called_once_with("Помилка", "Невірний формат")
 
+    def test_view_keeps_fixed_window(self):
+        """Тест віртуальної прокрутки: у таблиці лише видимі рядки, смуга прокрутки охоплює всі"""
+        table = Table("Test", {'id': 'integer'})
+        table.add_rows([[i] for i in range(1000)])
+        self.app.show_result(table.get_schema(), table.get_rows())
+        self.app.on_scrollbar("moveto", "0.5")
+        self.app.on_scrollbar("scroll", "1", "pages")
+        items = self.app.table_view.get_children()
+        self.assertEqual(len(items), self.app.view_rows)
+        self.assertEqual(self.app.table_view.item(items[0], "values")[0], "510")
+        self.assertAlmostEqual(float(self.app.view_scrollbar.get()[0]), 0.51)
+
+class TestColumnarTable(unittest.TestCase):
+
+    def setUp(self):
+        """Таблиця з колонковим сховищем для всіх типів полів"""
+        self.schema = {'id': 'integer', 'salary': 'real', 'name': 'string',
+                       'grade': 'char', 'worked': 'date', 'period': 'dateInvl'}
+        self.table = Table("Test", self.schema, storage="columnar")
+        self.table.add_row([1, 14.9, "John", "A", "1985-09-08", "2001-01-01 - 2002-01-01"])
+        self.table.add_row([2, 14.0, "Test", "B", "1999-09-03", "2003-05-01 - 2003-06-01"])
+
+    def test_rows_match_row_storage(self):
+        """Тест однаковості рядків у колонковому та рядковому сховищах"""
+        table = Table("Test", self.schema)
+        for row in self.table.get_rows():
+            table.add_row(row)
+        self.assertEqual(list(self.table.get_rows()), table.get_rows())
+        self.assertEqual(self.table.search_rows('worked', '1999'), table.search_rows('worked', '1999'))
+
+    def test_edit_row(self):
+        """Тест редагування рядка в колонковому сховищі"""
+        self.table.edit_row(0, [3, 1.5, "Ann", "C", "2000-01-01", "2000-01-01 - 2000-02-01"])
+        self.assertEqual(self.table.rows[0], [3, 1.5, "Ann", "C", "2000-01-01", "2000-01-01 - 2000-02-01"])
+        with self.assertRaises(ValueError):
+            self.table.edit_row(5, [3, 1.5, "Ann", "C", "2000-01-01", "2000-01-01 - 2000-02-01"])
+
+    def test_invalid_value_keeps_columns_aligned(self):
+        """Тест відкату рядка з невірним значенням"""
+        with self.assertRaises(ValueError):
+            self.table.add_row([3, 1.5, "Ann", "C", "1999-40-40", "2000-01-01 - 2000-02-01"])
+        self.assertEqual(len(self.table.rows), 2)
+        self.assertEqual(self.table.rows[-1][0], 2)
+
+class TestTableIndexes(unittest.TestCase):
+
+    def setUp(self):
+        """Таблиця з індексами на всіх полях"""
+        schema = {'id': 'integer', 'salary': 'real', 'name': 'string', 'worked': 'date'}
+        self.table = Table("Test", schema)
+        self.table.create_index('id', 'hash')
+        self.table.create_index('salary', 'sorted')
+        self.table.create_index('name', 'ngram')
+        self.table.create_index('worked', 'sorted')
+        self.table.add_row([1, 14.9, "John", "1985-09-08"])
+        self.table.add_row([2, 14.0, "Johnny", "1999-09-03"])
+        self.table.add_row([3, 20.5, "Test", "2001-01-01"])
+
+    def test_indexes_follow_edits(self):
+        """Тест підтримки індексів під час редагування рядків"""
+        self.table.edit_row(2, [3, 5.0, "Johanna", "1970-01-01"])
+        self.assertEqual(self.table.search_rows('name', 'Joh'), self.table.rows)
+        self.assertEqual(self.table.search_rows('name', 'ohn'), self.table.rows[:2])
+        self.assertEqual(self.table.find_rows('id', 3), [self.table.rows[2]])
+        self.assertEqual(self.table.range_rows('salary', 1.0, 14.5), [self.table.rows[1], self.table.rows[2]])
+        self.assertEqual(self.table.range_rows('worked', high="1986-01-01"), [self.table.rows[0], self.table.rows[2]])
+
+    def test_hash_index_query_converts_value(self):
+        """Тест однакового результату запиту за рівністю з хеш-індексом і без нього"""
+        table = Table("Test", {'id': 'integer', 'salary': 'real', 'worked': 'date'})
+        table.add_rows([[1, 14.9, "1985-09-08"], [5, 20.0, "1999-09-03"]])
+        queries = [('id', "5"), ('salary', "20"), ('worked', "1999-09-03")]
+        expected = [table.query().where(field_name, '=', value).all() for field_name, value in queries]
+        self.assertEqual(expected[0], [[5, 20.0, "1999-09-03"]])
+        for field_name, value in queries:
+            table.create_index(field_name, 'hash')
+        self.assertEqual([table.query().where(field_name, '=', value).all() for field_name, value in queries], expected)
+
+    def test_sorted_index_bulk_add(self):
+        """Тест пакетного додавання до впорядкованого індексу з однаковими ключами"""
+        self.table.add_rows([[i, float(i % 7), "Name", "1990-01-01"] for i in range(4, 100)])
+        self.table.add_row([100, 3.0, "Name", "1990-01-01"])
+        expected = [row for row in self.table.rows if 2.0 <= row[1] <= 14.5]
+        self.assertEqual(self.table.range_rows('salary', 2.0, 14.5), expected)
+        self.assertEqual(self.table.indexes['salary'].keys, sorted(self.table.indexes['salary'].keys))
+
+    def test_short_pattern_falls_back_to_scan(self):
+        """Тест пошуку за коротким шаблоном без використання індексу"""
+        self.assertEqual(self.table.search_rows('name', 'J'), self.table.rows[:2])
+
+    def test_indexes_are_saved(self):
+        """Тест збереження індексів у файл"""
+        database = Database("Indexed")
+        database.tables["Test"] = self.table
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, "Indexed.json")
+            database.save_to_file(filename)
+            table = Database.load_from_file(filename).get_table("Test")
+        self.assertEqual({name: index.kind for name, index in table.indexes.items()},
+                         {'id': 'hash', 'salary': 'sorted', 'name': 'ngram', 'worked': 'sorted'})
+        self.assertEqual(table.search_rows('name', 'ohn'), self.table.rows[:2])
+
+    def test_interval_index(self):
+        """Тест пошуку інтервалів дат, що перетинають вікно або містять дату"""
+        for storage in ("rows", "columnar"):
+            table = Table("Periods", {'id': 'integer', 'period': 'dateInvl'}, storage)
+            table.add_rows([[1, "2001-01-01 - 2002-01-01"], [2, "1999-05-01 - 1999-06-01"], [3, "2001-06-01 - 2003-01-01"]])
+            expected = {"2001-12-31": [1, 3], "1999-05-15": [2], "2005-01-01": []}
+            for indexed in (False, True):
+                if indexed:
+                    table.create_index('period', 'interval')
+                for day, ids in expected.items():
+                    self.assertEqual([row[0] for row in table.overlap_rows('period', day)], ids)
+                self.assertEqual([row[0] for row in table.overlap_rows('period', "1999-06-01", "2001-01-01")], [1, 2])
+            table.edit_row(1, [2, "2001-12-01 - 2001-12-31"])
+            self.assertEqual(table.query().where('period', 'contains', "2001-12-31").select('id').all(), [[1], [2], [3]])
+            self.assertEqual(table.query().where('period', 'overlaps', ("1999-01-01", "1999-12-31")).all(), [])
+
+    def test_interval_index_concurrent_writes(self):
+        """Тест інтервального індексу під час додавання й зміни рядків з іншого потоку"""
+        table = Table("Periods", {'id': 'integer', 'period': 'dateInvl'})
+        table.create_index('period', 'interval')
+        period = lambda i: f"2001-01-{i % 28 + 1:02d} - 2001-02-{i % 28 + 1:02d}"
+        errors = []
+        # Часте перемикання потоків, щоб запити перетиналися із записами
+        self.addCleanup(sys.setswitchinterval, sys.getswitchinterval())
+        sys.setswitchinterval(1e-6)
+
+        def write():
+            try:
+                for i in range(3000):
+                    table.add_row([i, period(i)])
+                    if i % 3 == 0:
+                        table.edit_row(i // 2, [i // 2, "1999-01-01 - 1999-01-02"])
+            except Exception as error:
+                errors.append(error)
+        writer = threading.Thread(target=write)
+        writer.start()
+        while writer.is_alive():
+            table.overlap_rows('period', "2001-01-15", "2001-01-20")
+        writer.join()
+        self.assertEqual(errors, [])
+        index = table.indexes.pop('period')
+        for low, high in (("2001-01-15", "2001-01-20"), ("1999-01-02", "1999-01-02"), ("2001-02-28", "2002-01-01")):
+            expected = table.overlap_rows('period', low, high)
+            table.indexes['period'] = index
+            self.assertEqual(table.overlap_rows('period', low, high), expected)
+            del table.indexes['period']
+
+    def test_result_cache_follows_writes(self):
+        """Тест кешу результатів пошуку, що оновлюється доданими та зміненими рядками"""
+        cache = ResultCache()
+        self.assertEqual(list(cache.lookup(self.table, 'name', 'ohn')), [0, 1])
+        self.table.add_row([4, 1.0, "Johnson", "2002-01-01"])
+        self.table.edit_row(0, [1, 14.9, "Jack", "1985-09-08"])
+        self.assertEqual(list(cache.lookup(self.table, 'name', 'ohn')), [1, 3])
+        self.assertEqual(list(cache.lookup(self.table, 'worked', "1990-01-01 - 2001-12-31")), [1, 2])
+        self.table.edit_row(2, [3, 20.5, "Test", "1989-01-01"])
+        self.assertEqual(list(cache.lookup(self.table, 'worked', "1990-01-01 - 2001-12-31")), [1])
+        self.assertEqual({key: cache.stats()[key] for key in ("hits", "misses", "updates")},
+                         {"hits": 2, "misses": 2, "updates": 4})
+
+class TestDatabaseStore(unittest.TestCase):
+
+    def setUp(self):
+        """Тимчасовий каталог для бази з журналом"""
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "Test.db")
+        self.database = Database("Test")
+        self.database.create_table("People", {'id': 'integer', 'name': 'string'})
+        self.database.get_table("People").add_row([1, "John"])
+        self.database.attach(self.path)
+
+    def tearDown(self):
+        self.database.close()
+        self.directory.cleanup()
+
+    def test_writes_continue_during_automatic_checkpoint(self):
+        """Тест запису з іншого потоку, поки автоматичний checkpoint пише сегменти"""
+        table = self.database.get_table("People")
+        journal = self.database.journal
+        journal.compact_every = 3
+        writing = threading.Event()
+        release = threading.Event()
+        write_snapshot = journal.write_snapshot
+
+        def slow_write_snapshot(*args):
+            writing.set()
+            release.wait(10)
+            write_snapshot(*args)
+        with patch.object(journal, "write_snapshot", slow_write_snapshot):
+            ingest = threading.Thread(target=lambda: [table.add_row([i + 2, "Ann"]) for i in range(3)])
+            ingest.start()
+            self.assertTrue(writing.wait(5))
+            writer = threading.Thread(target=table.add_row, args=([5, "Bob"],))
+            writer.start()
+            writer.join(2)
+            self.assertFalse(writer.is_alive())
+            release.set()
+            ingest.join()
+            journal.wait()
+        self.database.close()
+        self.assertEqual([row[0] for row in Database.open(self.path).get_table("People").rows], [1, 2, 3, 4, 5])
+
+    def test_log_is_replayed_after_reopen(self):
+        """Тест відновлення змін із журналу без явного збереження"""
+        table = self.database.get_table("People")
+        table.add_row([2, "Ann"])
+        table.edit_row(0, [1, "Johnny"])
+        table.create_index('name', 'ngram')
+        self.database.create_table("Empty", {'id': 'integer'})
+        self.database.close()
+
+        database = Database.open(self.path)
+        self.assertEqual(database.get_table("People").rows, [[1, "Johnny"], [2, "Ann"]])
+        self.assertIn('name', database.get_table("People").indexes)
+        self.assertIn("Empty", database.tables)
+        database.close()
+
+    def test_checkpoint_truncates_log_and_ignores_torn_record(self):
+        """Тест ущільнення журналу та пропуску обірваного запису"""
+        self.database.get_table("People").add_row([2, "Ann"])
+        self.database.checkpoint()
+        self.database.delete_table("People")
+        self.database.close()
+        with open(os.path.join(self.path, "manifest.json"), encoding='utf-8') as f:
+            manifest = json.load(f)
+        with open(os.path.join(self.path, manifest["wal"]), 'a', encoding='utf-8') as f:
+            f.write('{"op": "create_table", "tab')
+
+        database = Database.open(self.path)
+        self.assertEqual(database.tables, {})
+        database.close()
+        self.assertEqual(sorted(os.listdir(self.path)), sorted(["manifest.json", manifest["wal"], "segment.2.0.seg"]))
+
+    def test_writes_after_torn_record_survive_reopen(self):
+        """Тест записів, доданих після відновлення з обірваним записом у журналі"""
+        self.database.close()
+        with open(os.path.join(self.path, "wal.1.log"), 'a', encoding='utf-8') as f:
+            f.write('{"op": "add_row", "table": "Peo')
+        database = Database.open(self.path)
+        database.get_table("People").add_row([2, "Ann"])
+        database.get_table("People").add_row([3, "Bob"])
+        database.close()
+        database = Database.open(self.path)
+        self.assertEqual(database.get_table("People").rows, [[1, "John"], [2, "Ann"], [3, "Bob"]])
+        database.close()
+
+    def test_recovery_keeps_later_log_until_checkpoint(self):
+        """Тест відновлення після збою посеред checkpoint без втрати нового журналу"""
+        self.database.get_table("People").add_row([2, "Ann"])
+        self.database.close()
+        # Збій одразу після перемикання на журнал наступного покоління
+        with open(os.path.join(self.path, "wal.2.log"), 'w', encoding='utf-8') as f:
+            f.write('{"op": "add_row", "table": "People", "index": 2, "row": [3, "Bob"]}\n')
+        with patch('Lab1.atomic_write', side_effect=OSError("диск")):
+            with self.assertRaises(OSError):
+                Database.open(self.path)
+        self.assertTrue(os.path.exists(os.path.join(self.path, "wal.2.log")))
+        database = Database.open(self.path)
+        self.assertEqual(database.get_table("People").rows, [[1, "John"], [2, "Ann"], [3, "Bob"]])
+        database.close()
+        files = os.listdir(self.path)
+        self.assertEqual(sorted(name for name in files if name.startswith("wal.")), ["wal.3.log"])
+        self.assertIn("segment.3.0.seg", files)
+
+    def test_checkpoint_removes_segment_only_after_readers_close(self):
+        """Тест видалення старого сегмента лише після закриття знімка, що його читає"""
+        segments = lambda: sorted(name for name in os.listdir(self.path) if name.endswith(".seg"))
+        table = self.database.get_table("People")
+        rows = table.rows
+        snapshot = self.database.snapshot()
+        old = segments()
+        table.add_row([2, "Ann"])
+        self.database.checkpoint()
+        self.assertEqual(len(segments()), 2)
+        self.assertEqual(snapshot.get_table("People").rows, [[1, "John"]])
+        snapshot.close()
+        del snapshot
+        table.add_row([3, "Bob"])
+        self.database.checkpoint()
+        self.assertEqual(len(segments()), 1)
+        self.assertNotEqual(segments(), old)
+        self.assertEqual(rows, [[1, "John"], [2, "Ann"], [3, "Bob"]])
+
+    def test_tables_open_lazily_from_segments(self):
+        """Тест лінивого відкриття таблиць з бінарних сегментів"""
+        self.database.create_table("Dates", {'worked': 'date', 'period': 'dateInvl', 'salary': 'real'})
+        self.database.get_table("Dates").add_row(["1985-09-08", "2001-01-01 - 2002-01-01", 14.9])
+        self.database.get_table("People").create_index('name', 'hash')
+        self.database.checkpoint()
+        self.database.close()
+
+        database = Database.open(self.path, storage="columnar")
+        people = database.tables["People"]
+        self.assertFalse(people.loaded)
+        database.checkpoint()
+        self.assertFalse(people.loaded)
+        self.assertEqual(database.get_table("Dates").rows, [["1985-09-08", "2001-01-01 - 2002-01-01", 14.9]])
+        self.assertEqual(people.find_rows('name', "John"), [[1, "John"]])
+        self.assertTrue(people.loaded)
+        people.edit_row(0, [1, "Johnny"])
+        people.add_row([2, "Ann"])
+        self.assertEqual(people.search_rows('name', 'n'), [[1, "Johnny"], [2, "Ann"]])
+        with self.assertRaises(ValueError):
+            people.edit_row(0, ["x", "Ann"])
+        database.close()
+
+    def test_partitions_are_pruned_and_saved_separately(self):
+        """Тест розбиття таблиці на частини за діапазонами дат"""
+        self.database.create_table("Dates", {'id': 'integer', 'worked': 'date'})
+        dates = self.database.get_table("Dates")
+        dates.add_rows([[i, f"{1990 + i % 20}-01-01"] for i in range(100)])
+        dates.partition_by('worked', 'range', bounds=["1995-01-01", "2000-01-01", "2005-01-01"])
+        dates.add_row([100, "2009-06-01"])
+        self.assertEqual(dates.rows[100], [100, "2009-06-01"])
+        self.assertEqual([row[0] for row in dates.range_rows('worked', "1991-01-01", "1991-01-01")], [1, 21, 41, 61, 81])
+        with self.assertRaises(ValueError):
+            dates.edit_row(0, [0, "2009-01-01"])
+        self.database.checkpoint()
+        dates.edit_row(1, [1, "1992-01-01"])
+        self.database.close()
+
+        database = Database.open(self.path)
+        dates = database.get_table("Dates")
+        self.assertEqual(dates.partitioning["kind"], "range")
+        self.assertEqual(dates.query().where('worked', '<', "1993-01-01").select('id').limit(3).all(), [[0], [1], [2]])
+        self.assertEqual([partition.loaded for partition in dates.store.partitions], [True, False, False, False])
+        self.assertEqual(len(list(dates.rows)), 101)
+        self.assertEqual(dates.evict_partitions(), 3)
+        self.assertEqual(dates.rows[1], [1, "1992-01-01"])
+        database.close()
+
+    def test_partitioning_arguments_are_checked(self):
+        """Тест відсутніх, невпорядкованих і невірних меж розбиття"""
+        table = Table("Dates", {'id': 'integer', 'worked': 'date'})
+        table.add_row([1, "1999-01-01"])
+        for bounds in (None, [], ["2000-01-01", "1995-01-01"], ["not a date"], "1995-01-01"):
+            with self.assertRaises(ValueError):
+                table.partition_by('worked', 'range', bounds=bounds)
+        with self.assertRaises(ValueError):
+            table.partition_by('id', 'hash', count=None)
+        self.assertNotIsInstance(table.store, PartitionedStore)
+        self.assertEqual(table.rows, [[1, "1999-01-01"]])
+
+    def test_find_rows_converts_value_and_prunes_partitions(self):
+        """Тест пошуку за значенням у розбитій таблиці: рядок запиту приводиться до типу поля"""
+        self.database.create_table("Dates", {'id': 'integer', 'worked': 'date'})
+        dates = self.database.get_table("Dates")
+        dates.add_rows([[i, f"{1990 + i % 20}-01-01"] for i in range(100)])
+        dates.partition_by('worked', 'range', bounds=["1995-01-01", "2000-01-01", "2005-01-01"])
+        self.database.checkpoint()
+        self.database.close()
+
+        database = Database.open(self.path)
+        dates = database.get_table("Dates")
+        self.assertEqual([row[0] for row in dates.find_rows('worked', "1991-01-01")], [1, 21, 41, 61, 81])
+        self.assertEqual([partition.loaded for partition in dates.store.partitions], [True, False, False, False])
+        self.assertEqual(dates.find_rows('id', "21"), [[21, "1991-01-01"]])
+        self.assertEqual(dates.find_rows('id', "x"), [])
+        database.close()
+
+    def test_page_cache_keeps_to_budget(self):
+        """Тест кешу сторінок сегментів з обмеженим бюджетом пам'яті"""
+        table = self.database.get_table("People")
+        table.add_rows([[i, f"Name{i}"] for i in range(2, 3000)])
+        self.database.checkpoint()
+        capacity = page_cache.capacity
+        page_cache.resize(50000)
+        try:
+            before = page_cache.stats()
+            self.assertEqual([table.rows[i] for i in (5, 5, 2500)], [[6, "Name6"], [6, "Name6"], [2501, "Name2501"]])
+            after = page_cache.stats()
+            self.assertEqual((after["hits"] - before["hits"], after["misses"] - before["misses"]), (1, 2))
+            self.assertEqual(len(table.search_rows('name', 'Name2')), 1111)
+            self.assertLessEqual(page_cache.stats()["used"], 50000)
+            # Кеш не тримає замінений після checkpoint сегмент і його відображення файлу
+            segment = weakref.ref(table.store.segment)
+            table.add_row([3000, "Name3000"])
+            self.database.checkpoint()
+            self.assertEqual(table.rows[5], [6, "Name6"])
+            self.assertIsNone(segment())
+            # Без бюджету кешу окремі записи не спричиняють checkpoint, а зміни понад dirty_limit — спричиняють
+            page_cache.resize(0)
+            generation = self.database.journal.generation
+            for i in range(50):
+                table.add_row([i, "x"])
+            self.assertEqual(self.database.journal.generation, generation)
+            self.database.journal.dirty_limit = 50000
+            table.add_rows([[i, "x" * 100] for i in range(1000)])
+            self.database.journal.wait()
+            self.assertGreater(self.database.journal.generation, generation)
+        finally:
+            page_cache.resize(capacity)
+
+    def test_dictionary_encoded_columns(self):
+        """Тест словникового кодування рядків і стиснутого експорту в JSON"""
+        database = Database("Codes", "columnar")
+        database.create_table("Grades", {'id': 'integer', 'grade': 'char', 'name': 'string'})
+        table = database.get_table("Grades")
+        table.add_rows([[1000 + i, "ABC"[i % 3], ["Ann", "Bob"][i % 2]] for i in range(300)])
+        with patch('Lab1.DICTIONARY_LIMIT', 4):
+            table.add_rows([[2000 + i, "D", f"Name{i}"] for i in range(5)])
+        self.assertEqual((len(table.store.columns[1].dictionary), table.store.columns[2].dictionary), (4, None))
+        expected = table.query().where('grade', '=', "B").where('name', '=', "Ann").select('id').all()
+        database.attach(os.path.join(self.directory.name, "Codes.db"))
+        self.addCleanup(database.close)
+        self.assertEqual([column.kind for column in table.store.segment.columns], ["int64", "dict", "text"])
+        self.assertEqual(table.search_rows('grade', 'D'), table.rows[300:])
+        self.assertEqual(table.query().where('grade', '=', "B").where('name', '=', "Ann").select('id').all(), expected)
+        self.assertEqual(len(expected), 50)
+        filename = os.path.join(self.directory.name, "Codes.json.gz")
+        database.save_to_file(filename)
+        self.assertEqual(list(Database.load_from_file(filename).get_table("Grades").rows), list(table.rows))
+
+    def test_json_export_still_available(self):
+        """Тест експорту бази з журналом у JSON"""
+        filename = os.path.join(self.directory.name, "Test.json")
+        self.database.save_to_file(filename)
+        self.assertEqual(Database.load_from_file(filename).get_table("People").rows, [[1, "John"]])
+
+class TestTransactions(unittest.TestCase):
+
+    def setUp(self):
+        """Дві таблиці в базі з журналом"""
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "Bank.db")
+        self.database = Database("Bank", "columnar")
+        for name in ("Accounts", "Audit"):
+            self.database.create_table(name, {'id': 'integer', 'amount': 'real'})
+        self.accounts = self.database.get_table("Accounts")
+        self.accounts.add_rows([[1, 100.0], [2, 50.0]])
+        self.accounts.create_index('amount', 'sorted')
+        self.database.attach(self.path)
+
+    def tearDown(self):
+        self.database.close()
+        self.directory.cleanup()
+
+    def test_commit_and_rollback(self):
+        """Тест атомарного підтвердження та відкату змін у кількох таблицях"""
+        with self.database.begin():
+            self.accounts.edit_row(0, [1, 70.0])
+            self.accounts.edit_row(1, [2, 80.0])
+            self.database.get_table("Audit").add_row([1, 30.0])
+        with self.assertRaises(KeyError):
+            with self.database.begin():
+                self.accounts.edit_row(0, [1, 0.0])
+                self.accounts.add_row([3, 5.0])
+                self.database.delete_table("Audit")
+                raise KeyError("abort")
+        self.assertEqual(self.accounts.rows, [[1, 70.0], [2, 80.0]])
+        self.assertEqual(self.accounts.range_rows('amount', 0.0, 75.0), [[1, 70.0]])
+        self.assertEqual(self.database.get_table("Audit").rows, [[1, 30.0]])
+        self.database.close()
+        database = Database.open(self.path)
+        self.assertEqual(database.get_table("Accounts").rows, [[1, 70.0], [2, 80.0]])
+        self.assertEqual(database.get_table("Audit").rows, [[1, 30.0]])
+        database.close()
+
+    def test_snapshot_ignores_later_and_uncommitted_changes(self):
+        """Тест знімка, який не бачить пізніших і непідтверджених змін"""
+        with self.database.snapshot() as snapshot:
+            transaction = self.database.begin()
+            self.accounts.edit_row(0, [1, 1.0])
+            self.accounts.add_row([3, 3.0])
+            during = self.database.snapshot()
+            transaction.commit()
+            self.accounts.edit_row(1, [2, 2.0])
+            expected = [[1, 100.0], [2, 50.0]]
+            self.assertEqual(snapshot.get_table("Accounts").rows, expected)
+            self.assertEqual(during.get_table("Accounts").rows, expected)
+            self.assertEqual(snapshot.query("Accounts").where('amount', '>', 60).all(), [[1, 100.0]])
+            during.close()
+            with self.assertRaises(ValueError):
+                snapshot.get_table("Accounts").add_row([4, 4.0])
+        self.assertEqual(self.accounts.rows, [[1, 1.0], [2, 2.0], [3, 3.0]])
+        self.assertEqual(self.accounts.history, {})
+
+    def test_checkpoint_while_writing(self):
+        """Тест збереження бази під час додавання рядків в іншому потоці"""
+        def ingest():
+            for i in range(3, 3000):
+                self.accounts.add_row([i, float(i)])
+
+        writer = threading.Thread(target=ingest)
+        writer.start()
+        while writer.is_alive():
+            self.database.checkpoint()
+        writer.join()
+        self.database.close()
+        database = Database.open(self.path)
+        self.assertEqual(len(database.get_table("Accounts").rows), 2999)
+        self.assertEqual(database.get_table("Accounts").rows[-1], [2999, 2999.0])
+        database.close()
+
+class TestRowConverter(unittest.TestCase):
+
+    def setUp(self):
+        """Перетворювач рядків для всіх типів полів"""
+        schema = {'id': 'integer', 'salary': 'real', 'name': 'string', 'worked': 'date', 'period': 'dateInvl'}
+        self.converter = Table("Test", schema).converter
+
+    def test_convert_row(self):
+        """Тест приведення типів одного рядка"""
+        self.assertEqual(self.converter.convert(["1", "5.5", "Name", "1999-9-3", "2001-01-01 - 2002-1-1"]),
+                         [1, 5.5, "Name", "1999-09-03", "2001-01-01 - 2002-01-01"])
+
+    def test_batch_reports_all_bad_cells(self):
+        """Тест повідомлення про всі невірні клітинки пакета"""
+        rows = [["1", "5.5", "A", "1999-09-03", "2001-01-01 - 2002-01-01"],
+                ["x", "5.5", "B", "1999-40-40", "2001-01-01 - 2002-01-01"],
+                ["3", "y", "C", "1999-09-03", "2001-01-01"]]
+        with self.assertRaises(RowFormatError) as context:
+            self.converter.convert_many(rows)
+        self.assertEqual(context.exception.errors,
+                         [(1, 'id', 'x'), (1, 'worked', '1999-40-40'), (2, 'salary', 'y'), (2, 'period', '2001-01-01')])
+        self.assertEqual(self.converter.convert_many(rows[:1]), [[1, 5.5, "A", "1999-09-03", "2001-01-01 - 2002-01-01"]])
+
+class TestBulkImport(unittest.TestCase):
+
+    def setUp(self):
+        """База з порожньою таблицею для імпорту"""
+        self.directory = tempfile.TemporaryDirectory()
+        self.database = Database("Test", storage="columnar")
+        self.database.create_table("People", {'id': 'integer', 'name': 'string', 'worked': 'date'})
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, name, text):
+        filename = os.path.join(self.directory.name, name)
+        with open(filename, 'w', encoding='utf-8') as f:
+            f.write(text)
+        return filename
+
+    def test_add_rows_in_chunks(self):
+        """Тест пакетного додавання з номерами невірних рядків"""
+        table = self.database.get_table("People")
+        table.create_index('id', 'sorted')
+        rows = [[str(i), f"N{i}", "1999-09-03"] for i in range(10)] + [["x", "Bad", "1999-09-03"]]
+        with self.assertRaises(RowFormatError) as context:
+            table.add_rows(rows, chunk_size=4)
+        self.assertEqual(context.exception.errors, [(10, 'id', 'x')])
+        self.assertEqual(len(table.rows), 8)
+        self.assertEqual(table.range_rows('id', 6, 100), [[6, "N6", "1999-09-03"], [7, "N7", "1999-09-03"]])
+
+    def test_import_csv_and_ndjson(self):
+        """Тест імпорту CSV із заголовком та NDJSON"""
+        csv_file = self.write("people.csv", "name,id,worked\nJohn,1,1985-09-08\nAnn,2,1999-9-3\n")
+        ndjson_file = self.write("people.ndjson", '[3, "Bob", "2001-01-01"]\n\n{"id": 4, "name": "Eve", "worked": "2002-02-02"}\n')
+        self.assertEqual(self.database.import_file("People", csv_file), 2)
+        self.assertEqual(self.database.import_file("People", ndjson_file), 2)
+        self.assertEqual(self.database.get_table("People").rows,
+                         [[1, "John", "1985-09-08"], [2, "Ann", "1999-09-03"], [3, "Bob", "2001-01-01"], [4, "Eve", "2002-02-02"]])
+
+    def test_import_reports_missing_fields_and_headers(self):
+        """Тест відсутніх полів NDJSON і заголовка CSV, що не збігається з полями"""
+        ndjson_file = self.write("people.ndjson", '{"id": 1, "name": "Eve", "worked": "2002-02-02"}\n{"id": 2}\n')
+        with self.assertRaises(RowFormatError) as context:
+            self.database.import_file("People", ndjson_file)
+        self.assertEqual(context.exception.errors, [(1, 'name', None), (1, 'worked', None)])
+        table = self.database.get_table("People")
+        self.assertEqual(table.rows, [])
+        csv_file = self.write("people.csv", "ID,Name,Worked\n1,John,1985-09-08\n")
+        with self.assertRaises(ValueError) as context:
+            self.database.import_file("People", csv_file)
+        self.assertIn("ID", str(context.exception))
+        data_file = self.write("data.csv", "1,John,1985-09-08\n2,Ann,1999-09-03\n")
+        self.assertEqual(self.database.import_file("People", data_file), 2)
+        with self.assertRaises(ValueError):
+            self.database.import_file("People", data_file, header=True)
+        self.assertEqual(table.rows, [[1, "John", "1985-09-08"], [2, "Ann", "1999-09-03"]])
+
+    def test_command_line_import(self):
+        """Тест консольного імпорту у каталог бази"""
+        path = os.path.join(self.directory.name, "Cli.db")
+        csv_file = self.write("people.csv", "1;John\n2;Ann\n")
+        with patch('sys.stdout'):
+            self.assertEqual(main(["import", path, "People", csv_file, "--schema", "id:integer,name:string", "--delimiter", ";"]), 0)
+        database = Database.open(path)
+        self.assertEqual(database.get_table("People").rows, [[1, "John"], [2, "Ann"]])
+        database.close()
+
+class TestQuery(unittest.TestCase):
+
+    def setUp(self):
+        """Таблиці з однаковими даними у рядковому та колонковому сховищах"""
+        schema = {'id': 'integer', 'salary': 'real', 'name': 'string', 'worked': 'date', 'period': 'dateInvl'}
+        rows = [[1, 14.9, "John", "1985-09-08", "2001-01-01 - 2002-01-01"],
+                [2, 14.0, "Test", "1999-09-03", "2003-05-01 - 2003-06-01"],
+                [3, 20.5, "John", "2001-01-01", "2001-06-01 - 2001-07-01"],
+                [4, 9.5, "Ann", "1999-12-31", "1990-01-01 - 2010-01-01"]]
+        self.tables = [Table("Test", schema), Table("Test", schema, storage="columnar")]
+        for table in self.tables:
+            table.add_rows(rows)
+
+    def test_filter_sort_limit(self):
+        """Тест фільтрації, сортування та обмеження кількості рядків"""
+        for table in self.tables:
+            query = table.query().where('worked', '>=', "1999-01-01").order_by('salary', descending=True).limit(2)
+            self.assertEqual(query.select('id', 'salary').all(), [[3, 20.5], [2, 14.0]])
+            self.assertEqual(table.query().where('period', 'contains', "2001-06-15").select('id').all(), [[1], [3], [4]])
+            self.assertEqual(table.query().where('period', 'overlaps', ("2002-01-01", "2003-05-01")).select('id').all(),
+                             [[1], [2], [4]])
+            self.assertEqual(table.query().where('name', 'contains', "oh").where('salary', 'between', (10, 15)).select('id').all(),
+                             [[1]])
+
+    def test_group_by_with_aggregates(self):
+        """Тест групування з агрегатними функціями"""
+        for table in self.tables:
+            query = table.query().group_by('name').aggregate(people=("count", "*"), total=("sum", "salary"),
+                                                             first=("min", "worked")).order_by('people', descending=True)
+            self.assertEqual(query.all(), [["John", 2, 35.4, "1985-09-08"], ["Test", 1, 14.0, "1999-09-03"],
+                                           ["Ann", 1, 9.5, "1999-12-31"]])
+            self.assertEqual(table.query().where('id', '>', 10).aggregate(average=("avg", "salary")).all(), [[None]])
+
+    def test_query_uses_indexes(self):
+        """Тест використання індексів під час виконання запиту"""
+        table = self.tables[0]
+        table.create_index('salary', 'sorted')
+        table.create_index('name', 'ngram')
+        self.assertEqual(table.query().where('salary', '<', 14.9).select('id').all(), [[2], [4]])
+        self.assertEqual(table.query().where('name', 'contains', "ohn").where('id', '!=', 1).select('id').all(), [[3]])
+
+class TestRowPager(unittest.TestCase):
+
+    def test_iterator_is_read_window_by_window(self):
+        """Тест читання ітератора результатів лише до кінця запитаного вікна"""
+        consumed = []
+        def rows():
+            for i in range(5):
+                consumed.append(i)
+                yield [i]
+        pager = RowPager(rows(), page_size=2)
+        self.assertEqual(pager.total, 2)
+        self.assertEqual(pager.fetch(0, 2), [[0], [1]])
+        self.assertEqual(consumed, [0, 1])
+        self.assertEqual(pager.total, 4)
+        self.assertEqual(pager.fetch(1, 2), [[1], [2]])
+        self.assertEqual(consumed, [0, 1, 2])
+        self.assertEqual(pager.fetch(3, 10), [[3], [4]])
+        self.assertEqual(pager.total, 5)
+        self.assertEqual(pager.fetch(5, 2), [])
+
+    def test_sequence_is_sliced(self):
+        """Тест вікон рядків таблиці"""
+        table = Table("Test", {'id': 'integer'}, storage="columnar")
+        table.add_rows([[i] for i in range(3)])
+        pager = RowPager(table.get_rows(), page_size=2)
+        self.assertEqual(pager.total, 3)
+        self.assertEqual(pager.fetch(0, 2), [[0], [1]])
+        self.assertEqual(pager.fetch(2, 2), [[2]])
+
+class TestTaskRunner(unittest.TestCase):
+
+    def setUp(self):
+        """Виконавець фонових задач без вікна Tk"""
+        self.runner = TaskRunner(workers=4)
+
+    def tearDown(self):
+        self.runner.shutdown()
+
+    def test_writes_to_same_database_are_serialized(self):
+        """Тест послідовного виконання записів до однієї бази"""
+        database = Database("Test")
+        database.create_table("People", {'id': 'integer'})
+        table = database.get_table("People")
+        running = []
+        overlaps = []
+
+        def write(task, i):
+            running.append(i)
+            overlaps.append(len(running))
+            time.sleep(0.01)
+            table.add_row([i])
+            running.remove(i)
+
+        results = []
+        for i in range(4):
+            self.runner.submit(lambda task, i=i: write(task, i), on_done=results.append, exclusive=database)
+        self.runner.wait()
+        self.assertEqual(max(overlaps), 1)
+        self.assertEqual(len(results), 4)
+        self.assertEqual(sorted(row[0] for row in table.rows), [0, 1, 2, 3])
+
+    def test_search_can_be_cancelled(self):
+        """Тест скасування пошуку та повідомлення про прогрес"""
+        table = Table("Test", {'name': 'string'}, storage="columnar")
+        table.add_rows([["John"]] * 1000)
+        started = threading.Event()
+        done, errors, progress = [], [], []
+
+        def search(task):
+            started.wait()
+            return list(table.iter_search('name', 'x', progress=task.report, progress_step=10))
+
+        task = self.runner.submit(search, done.append, errors.append, lambda *args: progress.append(args))
+        task.cancel()
+        started.set()
+        self.runner.wait()
+        self.assertEqual((done, errors), ([], []))
+
+        task = self.runner.submit(lambda task: list(table.iter_search('name', 'oh', progress=task.report)),
+                                  done.append, errors.append, lambda *args: progress.append(args))
+        self.runner.wait()
+        self.assertEqual(len(done[0]), 1000)
+        self.assertEqual(progress[-1], (0, 1000))
+
+class TestParallelScan(unittest.TestCase):
+
+    def setUp(self):
+        """Таблиці, що скануються кількома процесами навіть при малому розмірі"""
+        schema = {'id': 'integer', 'salary': 'real', 'name': 'string', 'worked': 'date'}
+        rows = [[i, i * 0.5, f"Name{i % 7}", f"1999-09-{i % 28 + 1:02d}"] for i in range(300)]
+        self.tables = []
+        for storage in ("rows", "columnar"):
+            table = Table("Test", schema, storage)
+            table.add_rows(rows)
+            table.parallel_workers = 2
+            table.parallel_threshold = 0
+            self.tables.append(table)
+
+    def serial(self, table, action):
+        table.parallel_workers = 1
+        try:
+            return action()
+        finally:
+            table.parallel_workers = 2
+
+    def test_parallel_results_match_serial(self):
+        """Тест збігу паралельного та послідовного пошуку й агрегатів"""
+        query = lambda table: (table.query().where('salary', '>', 20).group_by('name')
+                               .aggregate(people=("count", "*"), total=("sum", "salary"), last=("max", "worked")).all())
+        for table in self.tables:
+            for field_name, pattern in (('name', 'me3'), ('worked', '-1'), ('salary', '.5'), ('id', '9')):
+                self.assertEqual(table.search_rows(field_name, pattern),
+                                 self.serial(table, lambda: table.search_rows(field_name, pattern)))
+            self.assertEqual(query(table), self.serial(table, lambda: query(table)))
+
+    def test_segment_edits_are_merged(self):
+        """Тест урахування змінених і нових рядків поверх сегмента"""
+        with tempfile.TemporaryDirectory() as directory:
+            database = Database("Test")
+            database.tables["Test"] = table = self.tables[1]
+            database.attach(os.path.join(directory, "Test.db"))
+            table.edit_row(3, [3, 1.0, "Zme3", "1999-09-01"])
+            table.add_row([300, 1.0, "me3", "1999-09-01"])
+            table.edit_row(10, [10, 1.0, "Other", "1999-09-01"])
+            matched = table.search_rows('name', 'me3')
+            self.assertEqual(matched, self.serial(table, lambda: table.search_rows('name', 'me3')))
+            self.assertEqual([row[0] for row in matched[:2]], [3, 17])
+            self.assertEqual(matched[-1][0], 300)
+            database.close()
+
+    def test_shared_columns_reused_between_searches(self):
+        """Тест повторного використання спільної пам'яті колонки між пошуками"""
+        for table in self.tables:
+            table.parallel_threshold = 10
+            first = SharedColumns(table, [2])
+            table.edit_row(5, [5, 1.0, "Zme3", "1999-09-01"])
+            table.add_row([300, 1.0, "me3", "1999-09-01"])
+            second = SharedColumns(table, [2])
+            self.assertEqual(second.specs, first.specs)
+            self.assertEqual((second.skip, second.rest), ([5], [5, 300]))
+            self.assertEqual(table.search_rows('name', 'me3'), self.serial(table, lambda: table.search_rows('name', 'me3')))
+            table.truncate_rows(300)
+            self.assertNotEqual(SharedColumns(table, [2]).specs, first.specs)
+
+    def test_appended_rows_return_to_workers(self):
+        """Тест повторного кодування колонки, коли доданих після кешування рядків стає багато"""
+        for table in self.tables:
+            table.parallel_threshold = 50
+            table.search_rows('id', '33')
+            table.add_rows([[i, 1.0, "me3", "1999-09-01"] for i in range(300, 340)])
+            self.assertEqual(SharedColumns(table, [0]).rest, list(range(300, 340)))
+            table.add_rows([[i, 1.0, "me3", "1999-09-01"] for i in range(340, 360)])
+            # Усі рядки тепер у спільній пам'яті, тож головний процес не сканує жодного окремо
+            shared = SharedColumns(table, [0])
+            self.assertEqual((shared.count, shared.rest), (360, []))
+            matched = table.search_rows('id', '33')
+            self.assertEqual([row[0] for row in matched], [33, 133, 233] + list(range(330, 340)))
+            self.assertEqual(matched, self.serial(table, lambda: table.search_rows('id', '33')))
+
+class TestBenchmarks(unittest.TestCase):
+
+    def test_synthetic_database_and_comparison(self):
+        """Тест генерації синтетичної бази та порівняння з базовими результатами"""
+        database = benchmarks.generate_database(50, storage="columnar")
+        table = database.get_table("Table1")
+        self.assertEqual(len(table.rows), 50)
+        self.assertEqual(table.schema, benchmarks.SCHEMA)
+        baseline = {"results": [{"rows": 50, "storage": "rows", "timings": {"add_row": 1.0, "open": 0.001},
+                                 "peak_rss_kb": 1000}]}
+        results = {"results": [{"rows": 50, "storage": "rows", "timings": {"add_row": 1.5, "open": 0.003},
+                                "peak_rss_kb": 1100}]}
+        self.assertEqual(benchmarks.compare_results(results, baseline), [(50, "rows", "add_row", 1.0, 1.5)])
+
+    def test_peak_memory_without_resource_module(self):
+        """Тест пікової пам'яті на платформі без модуля resource"""
+        with patch('benchmarks.resource', None):
+            tracemalloc.start()
+            try:
+                data = [bytes(1024) for i in range(1024)]
+                self.assertGreaterEqual(benchmarks.peak_rss_kb(), 1024)
+            finally:
+                tracemalloc.stop()
+
+class TestMetrics(unittest.TestCase):
+
+    def setUp(self):
+        metrics.reset()
+        metrics.enable()
+        self.addCleanup(metrics.disable)
+        self.addCleanup(metrics.reset)
+
+    def test_counters_and_export(self):
+        """Тест лічильників операцій, сканування та байтів збереження"""
+        database = Database("TestDB")
+        database.create_table("Table1", {"id": "integer", "name": "string"})
+        table = database.get_table("Table1")
+        for i in range(10):
+            table.add_row([str(i), "John" if i % 2 else "Doe"])
+        self.assertEqual(len(table.search_rows("name", "oh")), 5)
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, "test.json")
+            database.save_to_file(filename)
+            Database.load_from_file(filename)
+            size = os.path.getsize(filename)
+            exported = metrics.to_json()
+            self.assertEqual(exported["counters"]["table.add_row.calls"], 10)
+            self.assertEqual(exported["counters"]["table.search_rows.rows_scanned"], 10)
+            self.assertEqual(exported["counters"]["table.search_rows.rows_returned"], 5)
+            self.assertEqual(exported["counters"]["database.bytes_written"], size)
+            self.assertEqual(exported["counters"]["database.bytes_read"], size)
+            self.assertEqual(exported["histograms"]["table.add_row"]["count"], 10)
+            text = metrics.to_prometheus()
+            self.assertIn("labinform_table_add_row_calls_total 10", text)
+            self.assertIn('labinform_table_add_row_seconds_bucket{le="+Inf"} 10', text)
+
+    def test_disabled_metrics_collect_nothing(self):
+        """Тест вимкнених метрик"""
+        metrics.disable()
+        table = Table("Table1", {"id": "integer"})
+        table.add_row(["1"])
+        table.search_rows("id", "1")
+        self.assertEqual(metrics.to_json(), {"counters": {}, "histograms": {}})
+
+    def test_memory_tracing_and_profiling_on_demand(self):
+        """Тест знімка пам'яті після ввімкнення трасування та профілю фонових задач"""
+        metrics.disable()
+        self.assertRaises(RuntimeError, metrics.memory_snapshot)
+        metrics.enable(trace_memory=True)
+        names = [f"Name{i}" for i in range(20000)]
+        self.assertTrue(any("tests.py" in line for line in metrics.memory_snapshot(limit=5)))
+        runner = TaskRunner()
+        self.addCleanup(runner.shutdown)
+        table = Table("Table1", {"id": "integer", "name": "string"})
+        table.add_rows([[i, name] for i, name in enumerate(names)])
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, "profile.prof")
+            metrics.start_profiling()
+            runner.submit(lambda task: table.search_rows("name", "e19"))
+            runner.wait()
+            metrics.stop_profiling(filename)
+            self.assertFalse(metrics.profiling)
+            functions = {name for file, line, name in pstats.Stats(filename).stats}
+        self.assertIn("search_ids", functions)
+        metrics.disable()
+        self.assertFalse(tracemalloc.is_tracing())
+
+class TestDatabaseServer(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.server = DatabaseServer(directory.name)
+        loop = asyncio.new_event_loop()
+        started = threading.Event()
+
+        def run():
+            loop.run_until_complete(self.server.start("127.0.0.1", 0))
+            started.set()
+            loop.run_forever()
+            loop.run_until_complete(loop.shutdown_asyncgens())
+            loop.close()
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        started.wait()
+        host, port = self.server.address()[:2]
+        self.client = DatabaseClient(f"{host}:{port}")
+
+        def stop():
+            self.client.close()
+            loop.call_soon_threadsafe(self.server.server.close)
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join()
+            self.server.close()
+        self.addCleanup(stop)
+
+    def test_remote_database_roundtrip(self):
+        """Тест операцій над базою через сервер"""
+        database = self.client.create_database("Shared")
+        database.create_table("Table1", {"id": "integer", "name": "string", "worked": "date"})
+        table = database.get_table("Table1")
+        table.add_row(["1", "John", "2020-1-2"])
+        table.add_rows([[2, "Doe", "2021-03-04"], [3, "Ann", "2022-05-06"]])
+        table.edit_row(2, [3, "Anna", "2022-05-06"])
+        self.assertEqual(len(table.rows), 3)
+        self.assertEqual(table.rows[0], [1, "John", "2020-01-02"])
+        self.assertEqual(table.rows[1:], [[2, "Doe", "2021-03-04"], [3, "Anna", "2022-05-06"]])
+        self.assertEqual(table.search_rows("name", "oh"), [[1, "John", "2020-01-02"]])
+        self.assertEqual(table.query().where("id", ">=", 2).order_by("id", descending=True).select("name").all(),
+                         [["Anna"], ["Doe"]])
+        other = DatabaseClient("%s:%d" % self.server.address()[:2])
+        self.addCleanup(other.close)
+        self.assertEqual(other.open_database("Shared").get_table("Table1").rows[2], [3, "Anna", "2022-05-06"])
+        with self.assertRaises(RemoteError):
+            database.get_table("Missing")
+
+    def test_pipeline_and_batch(self):
+        """Тест конвеєрних і пакетних запитів"""
+        self.client.create_database("Shared").create_table("Table1", {"id": "integer"})
+        target = {"database": "Shared", "table": "Table1"}
+        self.client.batch([("add_row", dict(target, row=[i])) for i in range(100)])
+        self.assertEqual(self.client.pipeline([("count", target), ("rows", dict(target, start=98))]),
+                         [100, [[98], [99]]])
+        with self.assertRaises(RemoteError):
+            self.client.batch([("count", target), ("unknown", {})])
+
+    def test_unexpected_errors_are_returned(self):
+        """Тест відповіді на помилку, що не є ValueError, без розриву з'єднання"""
+        def fail(database, table):
+            raise RuntimeError("Збій")
+        with patch.object(self.server, "call_count", fail):
+            with self.assertRaises(RemoteError) as context:
+                self.client.call("count", database="Shared", table="Table1")
+        self.assertEqual((str(context.exception), context.exception.kind), ("Збій", "RuntimeError"))
+        self.assertEqual(self.client.call("ping"), "pong")
+
+    def test_names_and_slow_requests(self):
+        """Тест відхилення шляхів у назвах баз і запитів, що не зупиняють інших клієнтів"""
+        for name in ("../Outside", "a/b", "a\\b", "..", "", "C:Base"):
+            with self.assertRaises(RemoteError):
+                self.client.create_database(name)
+        self.assertEqual(os.listdir(self.server.directory), [])
+        self.client.create_database("Shared")
+        started = threading.Event()
+        release = threading.Event()
+
+        finished = []
+
+        def slow_checkpoint(database):
+            started.set()
+            release.wait(5)
+            finished.append(database)
+        other = DatabaseClient("%s:%d" % self.server.address()[:2])
+        self.addCleanup(other.close)
+        with patch.object(self.server, "call_checkpoint", slow_checkpoint):
+            thread = threading.Thread(target=self.client.call, args=("checkpoint",), kwargs={"database": "Shared"})
+            thread.start()
+            started.wait(5)
+            self.assertEqual(other.call("ping"), "pong")
+            self.assertEqual(finished, [])
+            release.set()
+            thread.join()
+        self.assertEqual(finished, ["Shared"])
+
 if __name__ == '__main__':
     unittest.main()